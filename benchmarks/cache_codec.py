@@ -0,0 +1,58 @@
+"""
+Size and CPU cost of the cache codec on synthetic proposal payloads.
+
+    python -m benchmarks.cache_codec [--count 2000] [--min-bytes 1024]
+
+Reports bytes saved against legacy plain JSON and the per-payload encode
+and decode time for every compression the codec supports here.
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.payloads import corpus
+from src import cache_codec
+
+
+def measure(values, compression: str, min_bytes: int):
+    started = time.perf_counter()
+    encoded = [
+        cache_codec.encode(value, compress_min_bytes=min_bytes, compression=compression)
+        for value in values
+    ]
+    encode_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for value in encoded:
+        cache_codec.decode(value)
+    decode_time = time.perf_counter() - started
+    return sum(map(len, encoded)), encode_time, decode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--min-bytes", type=int, default=1024)
+    args = parser.parse_args()
+
+    values = [json.dumps(payload).encode() for payload in corpus(args.count)]
+    legacy = sum(map(len, values))
+    print(
+        f"{len(values)} payloads, legacy JSON {legacy / 1e6:.2f} MB "
+        f"(avg {legacy / len(values) / 1024:.1f} KiB)"
+    )
+
+    compressions = ["none", "zlib"] + (["zstd"] if cache_codec.zstandard else [])
+    for compression in compressions:
+        size, encode_time, decode_time = measure(values, compression, args.min_bytes)
+        print(
+            f"{compression:>5}: {size / 1e6:7.2f} MB "
+            f"saved {100 * (1 - size / legacy):5.1f}%  "
+            f"encode {encode_time / len(values) * 1e6:7.1f} us  "
+            f"decode {decode_time / len(values) * 1e6:7.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
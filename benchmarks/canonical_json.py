@@ -0,0 +1,72 @@
+"""
+Per-proposal CPU cost of encoding a payload for checksum, Redis and DB.
+
+    python -m benchmarks.canonical_json [--count 2000] [--rounds 3]
+
+"before" is the former path: json.dumps(sort_keys=True) for the checksum,
+json.dumps again for the Redis value and the payload JSONField encoder for
+the DB write. "after" encodes once with canonical_json and reuses the bytes,
+measured with the stdlib backend and, when installed, orjson.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+from benchmarks.payloads import corpus
+from src import canonical_json
+from src.models.proposal import LegislativeProposalDenorm
+
+
+def before(payload, db_encoder):
+    checksum = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    redis_value = json.dumps(payload)
+    db_value = db_encoder(payload)
+    return checksum, redis_value, db_value
+
+
+def after(payload, encode):
+    encoded = encode(payload)
+    return canonical_json.checksum(encoded), encoded, encoded.decode()
+
+
+def best_per_payload(fn, payloads, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.process_time()
+        for payload in payloads:
+            fn(payload)
+        best = min(best, time.process_time() - started)
+    return best / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = corpus(args.count)
+    db_encoder = LegislativeProposalDenorm._meta.fields_map["payload"].encoder
+
+    cases = {
+        "before": lambda p: before(p, db_encoder),
+        "after (json)": lambda p: after(p, canonical_json._dumps_json),
+    }
+    if canonical_json.orjson is not None:
+        cases["after (orjson)"] = lambda p: after(p, canonical_json._dumps_orjson)
+
+    baseline = None
+    print(f"{len(payloads)} payloads, best of {args.rounds} rounds (CPU time)")
+    for name, fn in cases.items():
+        per_payload = best_per_payload(fn, payloads, args.rounds)
+        baseline = baseline or per_payload
+        print(
+            f"{name:>15}: {per_payload * 1e6:8.1f} us/proposal  "
+            f"x{baseline / per_payload:4.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
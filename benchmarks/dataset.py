@@ -0,0 +1,427 @@
+"""
+Seeded synthetic dataset covering every source model in src/models.
+
+    python -m benchmarks.dataset --db-url sqlite:///tmp/atlas-bench.sqlite3 \
+        --proposals 10000 [--seed 42]
+
+The same seed and scale always produce the same rows. Proposals get a
+long-tailed number of procedures (1-120, like benchmarks.payloads), 0-4
+documents per procedure, a mix of government (one initiator, no deputy)
+and parliamentary (1-8 initiators) initiatives, 0-2 summaries whose
+categories follow a skewed popularity, and 1-2 reporting committees.
+Deputies sit on committees and users follow categories and deputies. The
+denorm tables are left empty; the serializer fills them.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from tortoise import Tortoise
+
+from benchmarks.payloads import ACTIONS, _text
+from src.db import placeholders
+from src.models import (
+    CdePCommittee,
+    CommitteeMembership,
+    CustomUser,
+    Deputy,
+    DeputyDenorm,
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeProposalDenorm,
+    LegislativeSummary,
+    PolicyCategory,
+    ProcedureDocument,
+)
+
+PARTIES = ("PSD", "PNL", "USR", "AUR", "UDMR", "Minorități")
+POSITIONS = ("membru", "secretar", "vicepreședinte", "președinte")
+BULK_BATCH_SIZE = 1000
+# Many-to-many fields the generator fills
+M2M_LINKS = (
+    (Deputy, "assigned_committees"),
+    (CustomUser, "followed_categories"),
+    (LegislativeProposal, "report_cttee"),
+    (LegislativeInitiator, "deputies"),
+    (LegislativeSummary, "categories"),
+)
+
+
+@dataclass
+class DatasetSpec:
+    proposals: int = 10000
+    deputies: int = 700
+    categories: int = 60
+    committees: int = 40
+    users: int = 500
+    seed: int = 42
+    # Proposals generated and inserted per round, bounds memory
+    chunk_size: int = 500
+
+
+def _day(rnd: random.Random) -> date:
+    return date(2018, 1, 1) + timedelta(days=rnd.randint(0, 2500))
+
+
+def _moment(rnd: random.Random) -> datetime:
+    return datetime(2018, 1, 1, tzinfo=timezone.utc) + timedelta(
+        seconds=rnd.randint(0, 2500 * 86400)
+    )
+
+
+def _procedure_count(rnd: random.Random) -> int:
+    return max(1, min(int(rnd.paretovariate(1.2) * 4), 120))
+
+
+class _Ids:
+    """Explicit primary keys, so through-table rows need no read back."""
+
+    def __init__(self):
+        self.last: Dict[type, int] = {}
+
+    def next(self, model) -> int:
+        self.last[model] = self.last.get(model, 0) + 1
+        return self.last[model]
+
+
+async def _link(model, field: str, pairs: List[Tuple[int, int]]):
+    """Insert (source id, target id) rows into the through table of a M2M field."""
+    if not pairs:
+        return
+    through = model._meta.fields_map[field]
+    db = model._meta.db
+    sql = (
+        f'INSERT INTO "{through.through}" '
+        f'("{through.backward_key}", "{through.forward_key}") '
+        f"VALUES ({', '.join(placeholders(db, 2))})"
+    )
+    await db.execute_many(sql, [list(pair) for pair in pairs])
+
+
+async def _bulk(model, rows: list):
+    if rows:
+        await model.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+
+
+async def _reference_data(rnd: random.Random, spec: DatasetSpec):
+    committees = [
+        CdePCommittee(
+            id=i,
+            name=f"Comisia pentru {_text(rnd, 3)}",
+            committeeId=f"cdep-{i}",
+            url=f"https://www.cdep.ro/pls/parlam/structura2015.co?idc={i}",
+            chamber=rnd.choice(["CD", "S"]),
+            type="permanenta",
+            legislature="2024",
+        )
+        for i in range(1, spec.committees + 1)
+    ]
+    await _bulk(CdePCommittee, committees)
+
+    await _bulk(
+        PolicyCategory,
+        [
+            PolicyCategory(id=i, category_name=f"{_text(rnd, 2)} {i}")
+            for i in range(1, spec.categories + 1)
+        ],
+    )
+
+    deputies, memberships, assigned = [], [], []
+    membership_id = 0
+    for i in range(1, spec.deputies + 1):
+        name = _text(rnd, 3).title()
+        deputies.append(
+            Deputy(
+                id=i,
+                idm=i,
+                name=name,
+                normalized_name=name.lower(),
+                group=rnd.choice(PARTIES),
+                legislature="2024",
+                circumscription=f"Circumscripția {rnd.randint(1, 43)}",
+                profile_link=f"https://www.cdep.ro/pls/parlam/structura2015.mp?idm={i}",
+                member_from=_day(rnd),
+                member_until=rnd.choice([None, _day(rnd)]),
+                active=rnd.random() < 0.9,
+                chamber=rnd.choice(["CD", "S"]),
+                bio=_text(rnd, 60),
+                birthday=date(1950, 1, 1) + timedelta(days=rnd.randint(0, 15000)),
+            )
+        )
+        for committee_id in rnd.sample(
+            range(1, spec.committees + 1), rnd.randint(1, 3)
+        ):
+            membership_id += 1
+            memberships.append(
+                CommitteeMembership(
+                    id=membership_id,
+                    deputy_id=i,
+                    committee_id=committee_id,
+                    position=rnd.choices(POSITIONS, weights=(20, 3, 2, 1))[0],
+                )
+            )
+            assigned.append((i, committee_id))
+    await _bulk(Deputy, deputies)
+    await _bulk(CommitteeMembership, memberships)
+    await _link(Deputy, "assigned_committees", assigned)
+
+    users, followed_categories = [], []
+    for i in range(1, spec.users + 1):
+        users.append(
+            CustomUser(
+                id=i,
+                email=f"user{i}@example.com",
+                first_name=_text(rnd, 1).title(),
+                last_name=_text(rnd, 1).title(),
+                followed_deputies=rnd.sample(
+                    range(1, spec.deputies + 1), rnd.randint(0, 5)
+                ),
+                notificationPreferences={
+                    "legislativeProposals": rnd.random() < 0.9,
+                    "followedCategories": rnd.random() < 0.8,
+                    "followedDeputies": rnd.random() < 0.8,
+                },
+            )
+        )
+        for category_id in rnd.sample(range(1, spec.categories + 1), rnd.randint(0, 5)):
+            followed_categories.append((i, category_id))
+    await _bulk(CustomUser, users)
+    await _link(CustomUser, "followed_categories", followed_categories)
+
+
+async def _proposals(rnd: random.Random, spec: DatasetSpec, ids: _Ids, count: int):
+    rows: Dict[type, list] = {
+        model: []
+        for model in (
+            LegislativeProposal,
+            LegislativeProcedure,
+            ProcedureDocument,
+            LegislativeInitiator,
+            LegislativeConsult,
+            LegislativeSummary,
+        )
+    }
+    links: Dict[Tuple[type, str], list] = {
+        (LegislativeProposal, "report_cttee"): [],
+        (LegislativeInitiator, "deputies"): [],
+        (LegislativeSummary, "categories"): [],
+    }
+    # Popular categories are attached far more often than the long tail
+    category_weights = [1 / rank for rank in range(1, spec.categories + 1)]
+
+    for _ in range(count):
+        proposal_id = ids.next(LegislativeProposal)
+        government = rnd.random() < 0.4
+        title = _text(rnd, rnd.randint(10, 40))
+        rows[LegislativeProposal].append(
+            LegislativeProposal(
+                id=proposal_id,
+                title=title,
+                normalized_title=title.lower()[:2044],
+                idp=proposal_id,
+                senate_registration_number=f"L{rnd.randint(1, 900)}/{rnd.randint(2018, 2025)}",
+                cdep_registration_number=f"PL-x {rnd.randint(1, 900)}",
+                first_chamber=rnd.choice(["Senat", "Camera Deputatilor"]),
+                initiative="Guvern" if government else "Parlamentari",
+                urgent_procedure=rnd.choice([None, "da"]),
+                status=_text(rnd, 6),
+                status_cdep=_text(rnd, 5),
+                status_senate=_text(rnd, 5),
+                law_character=rnd.choice(["ordinara", "organica"]),
+                year_issue=rnd.randint(2018, 2025),
+                active=rnd.random() < 0.95,
+                published=rnd.random() < 0.5,
+                matching_title=_text(rnd, 20),
+                created_at=_moment(rnd),
+            )
+        )
+        for committee_id in rnd.sample(
+            range(1, spec.committees + 1), rnd.randint(1, 2)
+        ):
+            links[(LegislativeProposal, "report_cttee")].append(
+                (proposal_id, committee_id)
+            )
+
+        for _ in range(_procedure_count(rnd)):
+            procedure_id = ids.next(LegislativeProcedure)
+            rows[LegislativeProcedure].append(
+                LegislativeProcedure(
+                    id=procedure_id,
+                    legislative_proposal_id=proposal_id,
+                    date=None if rnd.random() < 0.03 else _day(rnd),
+                    action=f"{rnd.choice(ACTIONS)} {_text(rnd, 6)}",
+                    short_action=rnd.choice(ACTIONS),
+                    chamber=rnd.choice(["CD", "S"]),
+                    termen=_day(rnd) if rnd.random() < 0.2 else None,
+                )
+            )
+            for _ in range(rnd.choices(range(5), weights=(3, 3, 2, 1, 1))[0]):
+                document_id = ids.next(ProcedureDocument)
+                rows[ProcedureDocument].append(
+                    ProcedureDocument(
+                        id=document_id,
+                        legislative_procedure_id=procedure_id,
+                        name=_text(rnd, 4),
+                        link=f"https://www.cdep.ro/docs/{proposal_id}/{document_id}.pdf",
+                    )
+                )
+
+        initiators = 1 if government else rnd.randint(1, 8)
+        for position in range(initiators):
+            initiator_id = ids.next(LegislativeInitiator)
+            rows[LegislativeInitiator].append(
+                LegislativeInitiator(
+                    id=initiator_id,
+                    legislative_proposal_id=proposal_id,
+                    name="Guvernul României" if government else _text(rnd, 3).title(),
+                    position=None if government else "deputat",
+                    party=None if government else rnd.choice(PARTIES),
+                    photo_url=(
+                        None
+                        if government
+                        else f"https://www.cdep.ro/img/{initiator_id}.jpg"
+                    ),
+                    is_main=position == 0,
+                )
+            )
+            if not government and rnd.random() < 0.95:
+                links[(LegislativeInitiator, "deputies")].append(
+                    (initiator_id, rnd.randint(1, spec.deputies))
+                )
+
+        # A proposal without consults is skipped as missing_data
+        for _ in range(0 if rnd.random() < 0.05 else rnd.randint(1, 4)):
+            consult_id = ids.next(LegislativeConsult)
+            rows[LegislativeConsult].append(
+                LegislativeConsult(
+                    id=consult_id,
+                    legislative_proposal_id=proposal_id,
+                    name=_text(rnd, 8),
+                    link=f"https://www.senat.ro/consult/{consult_id}.pdf",
+                )
+            )
+
+        for _ in range(rnd.choices(range(3), weights=(1, 7, 2))[0]):
+            summary_id = ids.next(LegislativeSummary)
+            rows[LegislativeSummary].append(
+                LegislativeSummary(
+                    id=summary_id,
+                    legislative_proposal_id=proposal_id,
+                    summary=_text(rnd, 120),
+                )
+            )
+            categories = {
+                rnd.choices(range(1, spec.categories + 1), weights=category_weights)[0]
+                for _ in range(rnd.randint(1, 3))
+            }
+            links[(LegislativeSummary, "categories")].extend(
+                (summary_id, category_id) for category_id in sorted(categories)
+            )
+
+    for model, model_rows in rows.items():
+        await _bulk(model, model_rows)
+    for (model, field), pairs in links.items():
+        await _link(model, field, pairs)
+    return {model.__name__: len(model_rows) for model, model_rows in rows.items()}
+
+
+async def generate(spec: DatasetSpec) -> Dict[str, int]:
+    """Populate the (empty) initialised database; returns row counts per model."""
+    rnd = random.Random(spec.seed)
+    await _reference_data(rnd, spec)
+    counts: Dict[str, int] = {}
+    ids = _Ids()
+    for start in range(0, spec.proposals, spec.chunk_size):
+        chunk = await _proposals(
+            rnd, spec, ids, min(spec.chunk_size, spec.proposals - start)
+        )
+        for name, count in chunk.items():
+            counts[name] = counts.get(name, 0) + count
+    return counts
+
+
+async def index_foreign_keys():
+    """
+    Index every foreign key and through-table column, as the Django-managed
+    production schema does (Tortoise's SQLite schema leaves them unindexed).
+    """
+    for app in Tortoise.apps.values():
+        for model in app.values():
+            db = model._meta.db
+            table = model._meta.db_table
+            for field in model._meta.fk_fields | model._meta.o2o_fields:
+                column = model._meta.fields_map[field].source_field
+                await db.execute_script(
+                    f'CREATE INDEX IF NOT EXISTS "bench_{table}_{column}" '
+                    f'ON "{table}" ("{column}")'
+                )
+            for field in model._meta.m2m_fields:
+                m2m = model._meta.fields_map[field]
+                await db.execute_script(
+                    f'CREATE INDEX IF NOT EXISTS "bench_{m2m.through}_{m2m.backward_key}" '
+                    f'ON "{m2m.through}" ("{m2m.backward_key}", "{m2m.forward_key}")'
+                )
+
+
+async def open_dataset(db_url: str, spec: DatasetSpec, regenerate: bool = False):
+    """
+    Initialise Tortoise on ``db_url`` and generate the dataset unless the
+    database already holds proposals (and ``regenerate`` is False).
+    """
+    await Tortoise.init(db_url=db_url, modules={"models": ["src.models"]})
+    await Tortoise.generate_schemas(safe=True)
+    await index_foreign_keys()
+    if await LegislativeProposal.exists() and not regenerate:
+        return None
+    if regenerate:
+        for model, field in M2M_LINKS:
+            through = model._meta.fields_map[field].through
+            await model._meta.db.execute_script(f'DELETE FROM "{through}"')
+        for model in (
+            LegislativeProposalDenorm,
+            DeputyDenorm,
+            ProcedureDocument,
+            LegislativeProcedure,
+            LegislativeInitiator,
+            LegislativeConsult,
+            LegislativeSummary,
+            LegislativeProposal,
+            CommitteeMembership,
+            CustomUser,
+            Deputy,
+            PolicyCategory,
+            CdePCommittee,
+        ):
+            await model.all().delete()
+    return await generate(spec)
+
+
+async def main(args):
+    spec = DatasetSpec(proposals=args.proposals, seed=args.seed)
+    started = time.perf_counter()
+    try:
+        counts = await open_dataset(args.db_url, spec, regenerate=args.regenerate)
+    finally:
+        await Tortoise.close_connections()
+    if counts is None:
+        print(f"{args.db_url} already holds a dataset (use --regenerate)")
+        return
+    print(f"generated in {time.perf_counter() - started:.1f}s")
+    for name, count in counts.items():
+        print(f"{name:>22}: {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db-url", default="sqlite:///tmp/atlas-bench.sqlite3")
+    parser.add_argument("--proposals", type=int, default=DatasetSpec.proposals)
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--regenerate", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Event-loop stalls caused by logging to a slow stdout.
+
+    python -m benchmarks.logging_stall [--messages 5000] [--write-us 200]
+
+A monitor task asks to wake up every millisecond and records how late it
+runs while a worker-like task logs the per-message info events
+(received_proposals, cached_proposal_redis, updated_denorm) for
+``--messages`` messages. stdout is replaced by a stream whose every write
+blocks for ``--write-us`` microseconds, like a full pipe to a log
+collector. Compared: writing on the loop ("stream"), handing records to
+the QueueListener thread ("queue") and the queue with the high-volume
+events sampled to 5% ("queue + sampling").
+"""
+
+import argparse
+import asyncio
+import time
+
+import structlog
+
+from src.middleware import logging as log_setup
+
+HOT_EVENTS = ("received_proposals", "cached_proposal_redis", "updated_denorm")
+MONITOR_INTERVAL = 0.001
+
+
+class SlowStream:
+    """File-like sink whose writes block, counting what it receives."""
+
+    def __init__(self, write_seconds: float):
+        self.write_seconds = write_seconds
+        self.writes = 0
+
+    def write(self, text):
+        time.sleep(self.write_seconds)
+        self.writes += 1
+
+    def flush(self):
+        pass
+
+
+async def monitor(lateness: list, done: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not done.is_set():
+        expected = loop.time() + MONITOR_INTERVAL
+        await asyncio.sleep(MONITOR_INTERVAL)
+        lateness.append(max(0.0, loop.time() - expected))
+
+
+async def workload(logger, messages: int):
+    for proposal_id in range(messages):
+        logger.info(HOT_EVENTS[0], proposal_ids=[proposal_id])
+        logger.info(HOT_EVENTS[1], key=f":1:proposal:{proposal_id}")
+        logger.info(HOT_EVENTS[2], proposal_id=proposal_id)
+        await asyncio.sleep(0)
+
+
+async def measure(messages: int) -> dict:
+    logger = structlog.get_logger("benchmark")
+    lateness = []
+    done = asyncio.Event()
+    watcher = asyncio.create_task(monitor(lateness, done))
+    started = time.perf_counter()
+    await workload(logger, messages)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await watcher
+    lateness.sort()
+    return {
+        "seconds": elapsed,
+        "p50": lateness[len(lateness) // 2],
+        "p99": lateness[int(len(lateness) * 0.99)],
+        "max": lateness[-1],
+        "stalled": sum(lateness),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--write-us", type=float, default=200)
+    args = parser.parse_args()
+
+    cases = {
+        "stream": dict(handler="stream", sample_rates={}),
+        "queue": dict(handler="queue", sample_rates={}),
+        "queue + sampling": dict(
+            handler="queue", sample_rates={event: 0.05 for event in HOT_EVENTS}
+        ),
+    }
+    print(
+        f"{args.messages} messages x {len(HOT_EVENTS)} events, "
+        f"{args.write_us:.0f} us per stdout write, loop lateness in ms"
+    )
+    for name, options in cases.items():
+        stream = SlowStream(args.write_us / 1e6)
+        log_setup.setup_logging(stream=stream, rate_limit=0, **options)
+        result = asyncio.run(measure(args.messages))
+        log_setup.setup_logging(handler="stream")  # drains the queue thread
+        print(
+            f"{name:>16}: workload {result['seconds'] * 1000:7.0f} ms  "
+            f"stalled {result['stalled'] * 1000:7.0f} ms  "
+            f"p50 {result['p50'] * 1000:6.2f}  p99 {result['p99'] * 1000:6.2f}  "
+            f"max {result['max'] * 1000:6.2f}  writes {stream.writes}"
+        )
+
+
+if __name__ == "__main__":
+    main()
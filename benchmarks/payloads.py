@@ -0,0 +1,115 @@
+"""Synthetic SerializedProposal payloads shaped like production data."""
+
+import random
+from datetime import date, timedelta
+
+WORDS = (
+    "lege proiect privind modificarea completarea ordonanței urgență "
+    "guvernului aprobarea codului fiscal procedură penală sănătate "
+    "învățământ administrația publică locală energie mediu transport "
+    "cetățenilor românia senat camera deputaților comisia raport aviz"
+).split()
+
+ACTIONS = (
+    "Înregistrat la Senat pentru dezbatere",
+    "Prezentare în Biroul Permanent",
+    "Trimis pentru aviz la Consiliul Legislativ",
+    "Adoptat de Senat",
+    "Trimis la comisii pentru raport",
+    "Raport favorabil depus la comisie",
+    "Trimis la Președinte pentru promulgare",
+)
+
+
+def _text(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+
+def _day(rnd: random.Random) -> str:
+    return (date(2018, 1, 1) + timedelta(days=rnd.randint(0, 2500))).isoformat()
+
+
+def synthetic_payload(rnd: random.Random, proposal_id: int, procedures: int) -> dict:
+    """One payload with ``procedures`` procedures of 0-4 documents each."""
+    return {
+        "proposal_id": proposal_id,
+        "created_at": _day(rnd),
+        "updated_at": _day(rnd),
+        "proposal": {
+            "title": _text(rnd, 30),
+            "idp": proposal_id,
+            "senate_registration_number": f"L{rnd.randint(1, 900)}/{rnd.randint(2018, 2025)}",
+            "first_senate_registration_number": None,
+            "cdep_registration_number": f"PL-x {rnd.randint(1, 900)}",
+            "government_registration_number": None,
+            "first_chamber": rnd.choice(["Senat", "Camera Deputatilor"]),
+            "initiative": rnd.choice(["Guvern", "Parlamentari"]),
+            "opinion": None,
+            "urgent_procedure": rnd.choice([None, "da"]),
+            "status": _text(rnd, 6),
+            "status_cdep": _text(rnd, 5),
+            "status_senate": _text(rnd, 5),
+            "law_character": "ordinara",
+            "deadline": None,
+            "year_issue": rnd.randint(2018, 2025),
+            "active": True,
+            "published": rnd.random() < 0.5,
+            "senate_active": True,
+            "cdep_active": True,
+            "promulgare": "nu",
+            "matching_title": _text(rnd, 20),
+        },
+        "initiators": [
+            {
+                "id": proposal_id * 100 + i,
+                "name": _text(rnd, 3).title(),
+                "position": "deputat",
+                "party": rnd.choice(["PSD", "PNL", "USR", "AUR", "UDMR"]),
+                "is_main": i == 0,
+                "photo_url": f"https://www.cdep.ro/img/{rnd.randint(1, 9999)}.jpg",
+                "deputy_id": [rnd.randint(1, 700)],
+            }
+            for i in range(rnd.randint(1, 8))
+        ],
+        "consults": [
+            {
+                "id": proposal_id * 10 + i,
+                "name": _text(rnd, 8),
+                "link": f"https://www.senat.ro/consult/{proposal_id}/{i}.pdf",
+            }
+            for i in range(rnd.randint(1, 4))
+        ],
+        "overview": {
+            "id": proposal_id,
+            "summary": _text(rnd, 120),
+            "categories": [_text(rnd, 2) for _ in range(rnd.randint(0, 3))],
+        },
+        "procedures": [
+            {
+                "id": proposal_id * 1000 + i,
+                "date": _day(rnd),
+                "action": rnd.choice(ACTIONS) + " " + _text(rnd, 6),
+                "short_action": rnd.choice(ACTIONS),
+                "chamber": rnd.choice(["CD", "S"]),
+                "termen": rnd.choice([None, _day(rnd)]),
+                "attachment": [
+                    {
+                        "id": proposal_id * 10000 + i * 10 + d,
+                        "name": _text(rnd, 4),
+                        "url": f"https://www.cdep.ro/docs/{proposal_id}/{i}/{d}.pdf",
+                    }
+                    for d in range(rnd.randint(0, 4))
+                ],
+            }
+            for i in range(procedures)
+        ],
+    }
+
+
+def corpus(count: int, seed: int = 42) -> list:
+    """``count`` payloads with a long-tailed number of procedures (1-120)."""
+    rnd = random.Random(seed)
+    return [
+        synthetic_payload(rnd, i + 1, min(int(rnd.paretovariate(1.2) * 4), 120))
+        for i in range(count)
+    ]
@@ -0,0 +1,127 @@
+"""
+Per-key vs pipelined Redis writes for batches of cached proposal payloads.
+
+    python -m benchmarks.redis_pipeline                      # in-process stand-in
+    python -m benchmarks.redis_pipeline --redis-url redis://localhost:6379/15
+
+The stand-in keeps values in a dict and charges ``--rtt-ms`` per round trip
+(one per command, one per pipeline execute), which is what pipelining saves.
+Event-loop timer resolution rounds very small RTTs up to roughly 1 ms.
+Against a real Redis, keys are written under ``:bench:`` and deleted after.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import redis.asyncio as redis
+
+from src.redis import RedisClient
+
+TTL_SECONDS = 60
+
+
+class LatencyRedis:
+    """Minimal in-process stand-in for redis.asyncio.Redis with a fixed RTT."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.data = {}
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(self.rtt)
+        self.data[key] = value
+        return True
+
+    async def mget(self, keys):
+        await asyncio.sleep(self.rtt)
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        await asyncio.sleep(self.rtt)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        return _LatencyPipeline(self)
+
+
+class _LatencyPipeline:
+    def __init__(self, client: LatencyRedis):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+        return self
+
+    async def execute(self):
+        await asyncio.sleep(self.client.rtt)
+        for key, value in self.commands:
+            self.client.data[key] = value
+        results = [True] * len(self.commands)
+        self.commands = []
+        return results
+
+
+def make_payloads(count: int):
+    payload = {
+        "proposal": {"title": "Proiect de lege privind " + "x" * 200},
+        "procedures": [
+            {"id": i, "action": "Prezentare în Biroul Permanent", "attachment": []}
+            for i in range(40)
+        ],
+    }
+    value = json.dumps(payload)
+    return [(f":bench:proposal:{i}", value, TTL_SECONDS) for i in range(count)]
+
+
+async def run(client: RedisClient, sizes):
+    for size in sizes:
+        items = make_payloads(size)
+
+        started = time.perf_counter()
+        for key, value, ex in items:
+            await client.set(key, value, ex=ex)
+        per_key = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await client.set_many(items)
+        pipelined = time.perf_counter() - started
+
+        await client.delete_many([key for key, _, _ in items])
+        print(
+            f"{size:>6} payloads  per-key {per_key * 1000:9.1f} ms  "
+            f"pipelined {pipelined * 1000:8.1f} ms  "
+            f"speedup x{per_key / pipelined:6.1f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--redis-url", help="Benchmark a real Redis instead")
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args()
+
+    client = RedisClient(chunk_size=args.chunk_size)
+    if args.redis_url:
+        client.redis = redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        client.redis = LatencyRedis(args.rtt_ms / 1000)
+
+    print(f"chunk size {args.chunk_size}, backend {args.redis_url or 'stand-in'}")
+    await run(client, args.sizes)
+    if args.redis_url:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
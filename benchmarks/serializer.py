@@ -0,0 +1,189 @@
+"""
+Serializer benchmark suite on a seeded synthetic dataset.
+
+    python -m benchmarks.serializer [--proposals 10000] [--sample 500] \
+        [--backend python --backend sql] [--output benchmark-results.json]
+
+Generates the dataset (benchmarks.dataset) unless ``--db-url`` already
+holds one, then reports per serializer backend:
+
+- latency: serialize_proposals() of one proposal at a time over a sample,
+  as p50/p90/p99/max milliseconds
+- queries per proposal, single and batched, and the time per serializer
+  stage (src.profiling)
+- payload bytes (canonical encoding), mean/p50/p99/max
+- throughput: serialize + bulk DB upsert of every proposal in batches of
+  ``--batch-size`` (Redis is left out, see benchmarks.redis_pipeline)
+
+Results are written as JSON together with the run parameters, so runs on
+different commits can be diffed.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from tortoise import Tortoise
+
+from benchmarks.dataset import DatasetSpec, open_dataset
+from src import canonical_json, profiling
+from src.models import LegislativeProposal
+from src.tasks.denorm_proposal import (
+    RESULT_OK,
+    SERIALIZER_BACKENDS,
+    save_proposals_to_db,
+    serialize_proposals,
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def distribution(values: List[float], digits: int = 3) -> dict:
+    return {
+        "mean": round(sum(values) / len(values), digits) if values else 0.0,
+        "p50": round(percentile(values, 0.50), digits),
+        "p90": round(percentile(values, 0.90), digits),
+        "p99": round(percentile(values, 0.99), digits),
+        "max": round(max(values, default=0.0), digits),
+    }
+
+
+def per_proposal(profile: profiling.Profile, proposals: int) -> dict:
+    stages = {"db": profile.query_seconds, **profile.stage_seconds}
+    return {
+        name: round(seconds * 1000 / proposals, 4) for name, seconds in stages.items()
+    }
+
+
+async def bench_latency(ids: List[int], backend: str) -> dict:
+    latencies, sizes = [], []
+    with profiling.profile("benchmark_single", backend=backend) as profile:
+        for proposal_id in ids:
+            started = time.perf_counter()
+            results = await serialize_proposals([proposal_id], backend=backend)
+            latencies.append((time.perf_counter() - started) * 1000)
+            result = results[proposal_id]
+            if result.status == RESULT_OK:
+                sizes.append(
+                    len(result.encoded or canonical_json.dumps(result.payload))
+                )
+    return {
+        "proposals": len(ids),
+        "latency_ms": distribution(latencies),
+        "queries_per_proposal": round(profile.queries / len(ids), 2),
+        "payload_bytes": distribution(sizes, digits=0),
+        "stages_ms_per_proposal": per_proposal(profile, len(ids)),
+    }
+
+
+async def bench_throughput(ids: List[int], backend: str, batch_size: int) -> dict:
+    persisted = 0
+    started = time.perf_counter()
+    with profiling.profile("benchmark_batched", backend=backend) as profile:
+        for start in range(0, len(ids), batch_size):
+            results = await serialize_proposals(
+                ids[start : start + batch_size], backend=backend
+            )
+            ok = [result for result in results.values() if result.status == RESULT_OK]
+            with profiling.stage("db_upsert"):
+                await save_proposals_to_db(ok)
+            persisted += len(ok)
+    elapsed = time.perf_counter() - started
+    return {
+        "proposals": len(ids),
+        "persisted": persisted,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "proposals_per_second": round(len(ids) / elapsed, 1),
+        "queries_per_proposal": round(profile.queries / len(ids), 3),
+        "stages_ms_per_proposal": per_proposal(profile, len(ids)),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    spec = DatasetSpec(proposals=args.proposals, seed=args.seed)
+    started = time.perf_counter()
+    counts = await open_dataset(args.db_url, spec, regenerate=args.regenerate)
+    generation_seconds = time.perf_counter() - started
+    profiling.install()
+
+    ids = await LegislativeProposal.all().order_by("id").values_list("id", flat=True)
+    sample = sorted(random.Random(args.seed).sample(ids, min(args.sample, len(ids))))
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "db_url": args.db_url,
+        "dataset": {
+            "seed": args.seed,
+            "proposals": len(ids),
+            "generated_rows": counts,
+            "generation_seconds": round(generation_seconds, 1) if counts else None,
+        },
+        "canonical_json_backend": canonical_json.backend(),
+        "backends": {},
+    }
+    for backend in args.backend or ["python"]:
+        # One warm-up call, so the first sample does not pay for imports
+        await serialize_proposals(sample[:1], backend=backend)
+        single = await bench_latency(sample, backend)
+        throughput = await bench_throughput(ids, backend, args.batch_size)
+        report["backends"][backend] = {"single": single, "batched": throughput}
+        print(
+            f"{backend:>6}: p50 {single['latency_ms']['p50']:.2f} ms  "
+            f"p99 {single['latency_ms']['p99']:.2f} ms  "
+            f"{single['queries_per_proposal']} queries/proposal  "
+            f"{single['payload_bytes']['mean']:.0f} B/payload  "
+            f"{throughput['proposals_per_second']} proposals/s batched"
+        )
+    return report
+
+
+async def main(args):
+    try:
+        report = await run(args)
+    finally:
+        profiling.uninstall()
+        await Tortoise.close_connections()
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db-url", default="sqlite:///tmp/atlas-bench.sqlite3")
+    parser.add_argument("--proposals", type=int, default=DatasetSpec.proposals)
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument(
+        "--backend", action="append", choices=SERIALIZER_BACKENDS, default=None
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+
+from src.db import init_db, close_db
+from src.redis import redis_client
+from src.middleware.logging import setup_logging
+from src.tasks.denorm_deputy import DEPUTY_REBUILD_CHUNK_SIZE, rebuild_deputies
+from src.tasks.invalidate_dependents import (
+    DEPENDENCIES,
+    INVALIDATION_BATCH_SIZE,
+    INVALIDATION_PAUSE_SECONDS,
+    invalidate_dependents,
+)
+from src.tasks.proposal_sql import check_sql_parity
+from src.tasks.rebuild_proposals import (
+    REBUILD_CHUNK_SIZE,
+    REBUILD_WORKERS,
+    rebuild_proposals,
+)
+from src.tasks.rehash_proposals import REHASH_CHUNK_SIZE, rehash_proposals
+
+
+logger = setup_logging()
+
+
+async def cmd_rebuild_proposals(args):
+    await rebuild_proposals(
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        resume=not args.restart,
+        force=args.force,
+    )
+
+
+async def cmd_rehash_proposals(args):
+    await rehash_proposals(chunk_size=args.chunk_size)
+
+
+async def cmd_rebuild_deputies(args):
+    await rebuild_deputies(chunk_size=args.chunk_size, force=args.force)
+
+
+async def cmd_invalidate(args):
+    await invalidate_dependents(
+        args.entity,
+        args.ids,
+        batch_size=args.batch_size,
+        pause=args.pause_ms / 1000,
+    )
+
+
+async def cmd_check_sql_parity(args):
+    report = await check_sql_parity(args.ids or None, chunk_size=args.chunk_size)
+    if report["mismatched"]:
+        raise SystemExit(f"{len(report['mismatched'])} proposals differ")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Atlas denorm maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-proposals",
+        help="Rebuild the denorm rows of all active proposals (resumable)",
+    )
+    rebuild.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    rebuild.add_argument("--workers", type=int, default=REBUILD_WORKERS)
+    rebuild.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the saved checkpoint and start from the first proposal",
+    )
+    rebuild.add_argument(
+        "--force",
+        action="store_true",
+        help="Rewrite payloads even when their cached checksum is unchanged",
+    )
+    rebuild.set_defaults(handler=cmd_rebuild_proposals)
+
+    rehash = commands.add_parser(
+        "rehash-proposals",
+        help="Rewrite stored checksums after a payload encoding change, "
+        "keeping the notified flags",
+    )
+    rehash.add_argument("--chunk-size", type=int, default=REHASH_CHUNK_SIZE)
+    rehash.set_defaults(handler=cmd_rehash_proposals)
+
+    deputies = commands.add_parser(
+        "rebuild-deputies", help="Rebuild the denorm snapshot of every deputy"
+    )
+    deputies.add_argument("--chunk-size", type=int, default=DEPUTY_REBUILD_CHUNK_SIZE)
+    deputies.add_argument(
+        "--force",
+        action="store_true",
+        help="Rewrite snapshots even when their cached checksum is unchanged",
+    )
+    deputies.set_defaults(handler=cmd_rebuild_deputies)
+
+    invalidate = commands.add_parser(
+        "invalidate",
+        help="Rebuild the proposals that embed changed categories",
+    )
+    invalidate.add_argument("entity", choices=sorted(DEPENDENCIES))
+    invalidate.add_argument("ids", type=int, nargs="+")
+    invalidate.add_argument("--batch-size", type=int, default=INVALIDATION_BATCH_SIZE)
+    invalidate.add_argument(
+        "--pause-ms",
+        type=float,
+        default=INVALIDATION_PAUSE_SECONDS * 1000,
+        help="Pause between batches, to throttle the load on the database",
+    )
+    invalidate.set_defaults(handler=cmd_invalidate)
+
+    parity = commands.add_parser(
+        "check-sql-parity",
+        help="Check that the sql serializer backend builds the same payloads "
+        "as the python one",
+    )
+    parity.add_argument("ids", type=int, nargs="*")
+    parity.add_argument("--chunk-size", type=int, default=200)
+    parity.set_defaults(handler=cmd_check_sql_parity)
+
+    return parser
+
+
+async def main(args):
+    await init_db()
+    logger.info("database_initialized", status="ok")
+    await redis_client.connect()
+    logger.info("redis_initialized", status="ok")
+
+    try:
+        await args.handler(args)
+    finally:
+        await close_db()
+        logger.info("database_closed", status="ok")
+        await redis_client.close()
+        logger.info("redis_closed", status="ok")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
@@ -1,35 +1,127 @@
+import argparse
 import asyncio
+import os
 import signal
+from typing import List, Optional
 
+from src import metrics, profiling
 from src.db import init_db, close_db
 from src.redis import redis_client
-from src.workers.update_proposal import process_messages as process_proposal_messages
+from src.supervisor import (
+    DB_POOL_BUDGET,
+    REDIS_POOL_BUDGET,
+    SUPERVISOR_HEARTBEAT_SECONDS,
+    pool_share,
+    send_heartbeat,
+    supervise,
+)
+from src.metrics_server import (
+    METRICS_ENABLED,
+    METRICS_PORT,
+    run_metrics_server,
+    sample_queue_stats,
+)
+from src.workers.update_proposal import (
+    SQS_QUEUE_URL,
+    process_messages as process_proposal_messages,
+    sqs,
+)
+from src.workers.change_capture import CHANGE_CAPTURE_ENABLED, run_change_capture
+from src.workers.notify_followers import (
+    NOTIFICATION_QUEUE_URL,
+    NOTIFY_FOLLOWERS_ENABLED,
+    run_notifier,
+)
 from src.middleware.logging import setup_logging
 
 
 logger = setup_logging()
 shutdown_event = asyncio.Event()
 
+# Seconds the worker gets to finish in-flight messages after a shutdown signal
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", 30))
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 1))
 
-async def main():
-    await init_db()
+
+async def heartbeat(health_queue, index: int):
+    while not shutdown_event.is_set():
+        send_heartbeat(health_queue, index, metrics.snapshot())
+        try:
+            await asyncio.wait_for(
+                shutdown_event.wait(), timeout=SUPERVISOR_HEARTBEAT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+async def drain(tasks: List[asyncio.Task], timeout: float):
+    """Wait for ``tasks`` until a single deadline, then cancel the rest."""
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    for task, result in zip(
+        tasks, await asyncio.gather(*tasks, return_exceptions=True)
+    ):
+        if isinstance(result, Exception):
+            logger.error(
+                "shutdown_task_failed", task=task.get_coro().__name__, error=str(result)
+            )
+
+
+async def main(
+    db_pool_size: Optional[int] = None,
+    redis_pool_size: int = 100,
+    run_background_jobs: bool = True,
+    health_queue=None,
+    index: int = 0,
+):
+    await init_db(pool_size=db_pool_size)
     logger.info("database_initialized", status="ok")
-    await redis_client.connect()
+    if profiling.PROFILING_ENABLED:
+        profiling.install()
+    await redis_client.connect(max_connections=redis_pool_size)
     logger.info("redis_initialized", status="ok")
 
     # Start the SQS worker as a task
     worker_task = asyncio.create_task(process_proposal_messages(shutdown_event))
 
+    background = []
+    if health_queue is not None:
+        background.append(asyncio.create_task(heartbeat(health_queue, index)))
+
+    # /metrics, /healthz and /ready; supervised processes serve on port + index
+    if METRICS_ENABLED:
+        background.append(
+            asyncio.create_task(
+                run_metrics_server(shutdown_event, port=METRICS_PORT + index)
+            )
+        )
+        if run_background_jobs and SQS_QUEUE_URL:
+            background.append(
+                asyncio.create_task(
+                    sample_queue_stats(shutdown_event, sqs, SQS_QUEUE_URL)
+                )
+            )
+
+    # Poll source tables for changes the scraper did not announce over SQS.
+    # Enable it on one replica only, watermarks are shared through Redis.
+    if CHANGE_CAPTURE_ENABLED and run_background_jobs:
+        background.append(asyncio.create_task(run_change_capture(shutdown_event)))
+
+    # Match un-notified proposals to their followers (one replica only)
+    if NOTIFY_FOLLOWERS_ENABLED and NOTIFICATION_QUEUE_URL and run_background_jobs:
+        background.append(asyncio.create_task(run_notifier(shutdown_event)))
+    elif NOTIFY_FOLLOWERS_ENABLED and run_background_jobs:
+        logger.warning("notifier_disabled", reason="NOTIFICATION_QUEUE_URL not set")
+
     # Wait until shutdown signal is set
     await shutdown_event.wait()
 
-    # Cancel the worker gracefully
-    worker_task.cancel()
-    try:
-        await worker_task
-    except asyncio.CancelledError:
-        pass
+    # Let in-flight work finish within one grace period shared by all the
+    # tasks, then cancel whatever is still running
+    await drain([worker_task, *background], SHUTDOWN_GRACE_SECONDS)
 
+    profiling.uninstall()
     await close_db()
     logger.info("database_closed", status="ok")
 
@@ -42,7 +134,35 @@ def handle_shutdown(*_):
     shutdown_event.set()
 
 
-if __name__ == "__main__":
+def run_worker_process(index: int, processes: int, health_queue):
+    """Entry point of a supervised worker process."""
     signal.signal(signal.SIGINT, handle_shutdown)
     signal.signal(signal.SIGTERM, handle_shutdown)
-    asyncio.run(main())
+    asyncio.run(
+        main(
+            db_pool_size=pool_share(DB_POOL_BUDGET, processes),
+            redis_pool_size=pool_share(REDIS_POOL_BUDGET, processes),
+            # Single-replica jobs run in the first process only
+            run_background_jobs=index == 0,
+            health_queue=health_queue,
+            index=index,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atlas SQS worker")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=WORKER_PROCESSES,
+        help="Run N supervised worker processes (default: one, unsupervised)",
+    )
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        supervise(run_worker_process, args.processes, SHUTDOWN_GRACE_SECONDS)
+    else:
+        signal.signal(signal.SIGINT, handle_shutdown)
+        signal.signal(signal.SIGTERM, handle_shutdown)
+        asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Versioned encoding of cached payloads.
+
+Encoded values start with a one-byte header naming the format of the rest:
+
+    0x01  JSON, uncompressed (values under CACHE_COMPRESS_MIN_BYTES)
+    0x02  zlib-compressed JSON
+    0x03  zstd-compressed JSON (needs the optional ``zstandard`` package)
+
+Legacy values are plain JSON text and start with ``{``; decode() accepts
+both, so readers can be switched before writers.
+"""
+
+import json
+import os
+import zlib
+from typing import Union
+
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+load_dotenv()
+
+CODEC_RAW = 0x01
+CODEC_ZLIB = 0x02
+CODEC_ZSTD = 0x03
+
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024))
+# "auto" (zstd when installed, else zlib), "zstd", "zlib" or "none"
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto")
+CACHE_ZLIB_LEVEL = int(os.getenv("CACHE_ZLIB_LEVEL", 6))
+CACHE_ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", 3))
+
+_LEGACY_PREFIXES = (ord("{"), ord("["))
+
+
+class CacheCodecError(ValueError):
+    """Raised for values this codec cannot decode."""
+
+
+def _algorithm(compression: str) -> int:
+    if compression == "none":
+        return CODEC_RAW
+    if compression == "zstd" or (compression == "auto" and zstandard is not None):
+        if zstandard is None:
+            raise CacheCodecError("zstd compression requires the zstandard package")
+        return CODEC_ZSTD
+    return CODEC_ZLIB
+
+
+def encode(
+    data: bytes,
+    compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES,
+    compression: str = CACHE_COMPRESSION,
+) -> bytes:
+    """Encode JSON bytes, compressing them when they reach the threshold."""
+    codec = CODEC_RAW if len(data) < compress_min_bytes else _algorithm(compression)
+    if codec == CODEC_ZSTD:
+        data = zstandard.ZstdCompressor(level=CACHE_ZSTD_LEVEL).compress(data)
+    elif codec == CODEC_ZLIB:
+        data = zlib.compress(data, CACHE_ZLIB_LEVEL)
+    return bytes((codec,)) + data
+
+
+def decode(value: Union[bytes, str]) -> bytes:
+    """Return the JSON bytes of an encoded or legacy plain-JSON value."""
+    if isinstance(value, str):
+        return value.encode()
+    if not value:
+        raise CacheCodecError("empty cache value")
+
+    codec = value[0]
+    if codec in _LEGACY_PREFIXES:
+        return value
+    if codec == CODEC_RAW:
+        return value[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value[1:])
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise CacheCodecError("zstd value found but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(value[1:])
+    raise CacheCodecError(f"unknown cache codec header 0x{codec:02x}")
+
+
+def loads(value: Union[bytes, str]):
+    """Decode a cached value straight to Python objects."""
+    return json.loads(decode(value))
@@ -0,0 +1,54 @@
+"""
+Canonical JSON encoding of denormalized payloads.
+
+A payload is encoded once, as compact sorted-key UTF-8 JSON, and the same
+bytes are hashed for its checksum, cached in Redis and written to the
+payload column. ``orjson`` is used when installed; the stdlib fallback
+produces the same bytes.
+"""
+
+import hashlib
+import json
+import os
+
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+load_dotenv()
+
+# "auto" (orjson when installed, else json) or "json"
+CANONICAL_JSON_BACKEND = os.getenv("CANONICAL_JSON_BACKEND", "auto")
+
+
+def backend() -> str:
+    """Name of the encoder dumps() uses."""
+    if orjson is not None and CANONICAL_JSON_BACKEND != "json":
+        return "orjson"
+    return "json"
+
+
+def _dumps_json(value) -> bytes:
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def _dumps_orjson(value) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+
+_encode = _dumps_orjson if backend() == "orjson" else _dumps_json
+
+
+def dumps(value) -> bytes:
+    """Compact, sorted-key UTF-8 JSON bytes of ``value``."""
+    return _encode(value)
+
+
+def checksum(encoded: bytes) -> str:
+    """SHA-256 hex digest of canonical JSON bytes."""
+    return hashlib.sha256(encoded).hexdigest()
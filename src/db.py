@@ -1,17 +1,194 @@
 import os
-from tortoise import Tortoise
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from tortoise import Tortoise, timezone
 from dotenv import load_dotenv
 
 load_dotenv()
 DB_URL = os.getenv("DB_URL")
 
 
-async def init_db():
+def with_pool_size(db_url: str, pool_size: Optional[int]) -> str:
+    """Cap the connection pool of a Postgres URL at ``pool_size``."""
+    if not pool_size or not db_url or not db_url.startswith(("postgres", "asyncpg")):
+        return db_url
+    parts = urlsplit(db_url)
+    query = dict(parse_qsl(parts.query))
+    query.update(minsize="1", maxsize=str(pool_size))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def init_db(pool_size: Optional[int] = None):
     await Tortoise.init(
-        db_url=DB_URL,
+        db_url=with_pool_size(DB_URL, pool_size),
         modules={"models": ["src.models"]},
     )
 
 
 async def close_db():
     await Tortoise.close_connections()
+
+
+def pool_stats() -> Optional[Dict[str, int]]:
+    """
+    Connections in use and idle in the default connection's pool, and its
+    cap. None without a pool (SQLite) or before the pool is created.
+    """
+    if not Tortoise._inited:
+        return None
+    pool = getattr(Tortoise.get_connection("default"), "_pool", None)
+    if pool is None:
+        return None
+    idle = pool.get_idle_size()
+    return {"in_use": pool.get_size() - idle, "idle": idle, "max": pool.get_max_size()}
+
+
+# Outcomes reported by upsert_rows()
+UPSERT_CREATED = "created"
+UPSERT_UPDATED = "updated"
+UPSERT_UNCHANGED = "unchanged"
+
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", 500))
+
+
+class RawJSON(str):
+    """
+    An already encoded JSON document. upsert_rows() hands it to the driver
+    as is instead of letting the JSONField validate and re-encode it.
+    """
+
+
+def placeholders(db, count: int, start: int = 1) -> List[str]:
+    """Bind parameter markers for raw SQL: $n on Postgres, ? elsewhere."""
+    if db.capabilities.dialect == "postgres":
+        return [f"${index}" for index in range(start, start + count)]
+    return ["?"] * count
+
+
+def _upsert_sql(model, conflict_column: str, columns: List[str], rows: int) -> str:
+    db = model._meta.db
+    table = model._meta.db_table
+    postgres = db.capabilities.dialect == "postgres"
+
+    width = len(columns)
+    markers = placeholders(db, width * rows)
+    values = ",".join(
+        "(" + ",".join(markers[row * width : (row + 1) * width]) + ")"
+        for row in range(rows)
+    )
+
+    assignments = ",".join(
+        f'"{column}"=EXCLUDED."{column}"'
+        for column in columns
+        if column not in (conflict_column, "created_at")
+    )
+    distinct = "IS DISTINCT FROM" if postgres else "IS NOT"
+    quoted = ",".join(f'"{column}"' for column in columns)
+    # created_at only equals updated_at on rows this statement inserted
+    return (
+        f'INSERT INTO "{table}" ({quoted}) VALUES {values} '
+        f'ON CONFLICT ("{conflict_column}") DO UPDATE SET {assignments} '
+        f'WHERE "{table}"."checksum" {distinct} EXCLUDED."checksum" '
+        f'RETURNING "{conflict_column}", "created_at" = "updated_at" AS "inserted"'
+    )
+
+
+async def upsert_rows(
+    model,
+    conflict_column: str,
+    rows: List[dict],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> Dict[Any, str]:
+    """
+    Insert or update checksummed rows with one
+    ``INSERT ... ON CONFLICT DO UPDATE ... WHERE checksum IS DISTINCT FROM``
+    statement per ``chunk_size`` rows (Postgres and SQLite).
+
+    ``rows`` are dicts of db column -> python value and must include
+    ``conflict_column`` and ``checksum``; ``created_at``/``updated_at`` are
+    set here. A row whose stored checksum already matches is left untouched.
+    Returns the UPSERT_* outcome per conflict key.
+    """
+    if not rows:
+        return {}
+
+    # A statement may not touch the same row twice: keep the last one per key
+    rows = list({row[conflict_column]: row for row in rows}.values())
+    now = timezone.now()
+    columns = list(rows[0]) + ["created_at", "updated_at"]
+    fields = model._meta.fields_map
+    db = model._meta.db
+
+    outcomes = {row[conflict_column]: UPSERT_UNCHANGED for row in rows}
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        values = []
+        for row in chunk:
+            row = {**row, "created_at": now, "updated_at": now}
+            values.extend(
+                (
+                    row[column]
+                    if isinstance(row[column], RawJSON)
+                    else fields[column].to_db_value(row[column], model)
+                )
+                for column in columns
+            )
+        returned = await db.execute_query_dict(
+            _upsert_sql(model, conflict_column, columns, len(chunk)), values
+        )
+        for record in returned:
+            outcomes[record[conflict_column]] = (
+                UPSERT_CREATED if record["inserted"] else UPSERT_UPDATED
+            )
+    return outcomes
+
+
+def _update_column_sql(model, key_column: str, column: str, rows: int) -> str:
+    db = model._meta.db
+    table = model._meta.db_table
+    markers = placeholders(db, 3 * rows)
+    value = "{}"
+    if db.capabilities.dialect == "postgres":
+        # CASE hides the column type from parameter inference
+        sql_type = model._meta.fields_map[column].get_for_dialect(
+            "postgres", "SQL_TYPE"
+        )
+        value = f"CAST({{}} AS {sql_type})"
+    cases = " ".join(
+        f"WHEN {markers[2 * row]} THEN {value.format(markers[2 * row + 1])}"
+        for row in range(rows)
+    )
+    keys = ",".join(markers[2 * rows :])
+    return (
+        f'UPDATE "{table}" SET "{column}" = CASE "{key_column}" {cases} END '
+        f'WHERE "{key_column}" IN ({keys})'
+    )
+
+
+async def update_column(
+    model,
+    key_column: str,
+    column: str,
+    values: Dict[Any, Any],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+):
+    """
+    Set ``column`` to a value per row, for rows keyed by ``key_column``
+    (``values`` maps key -> python value), with one
+    ``UPDATE ... SET column = CASE key WHEN ... END`` statement per
+    ``chunk_size`` rows. Like QuerySet.update(), timestamps are left alone.
+    """
+    items = list(values.items())
+    fields = model._meta.fields_map
+    db = model._meta.db
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start : start + chunk_size]
+        params = []
+        for key, value in chunk:
+            params.append(fields[key_column].to_db_value(key, model))
+            params.append(fields[column].to_db_value(value, model))
+        params.extend(fields[key_column].to_db_value(key, model) for key, _ in chunk)
+        await db.execute_query(
+            _update_column_sql(model, key_column, column, len(chunk)), params
+        )
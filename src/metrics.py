@@ -0,0 +1,288 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Counter:
+    """
+    Process-wide monotonically increasing counter, optionally split by the
+    values of a single label.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label: Optional[str] = None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.values: Dict[Optional[str], int] = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount: int = 1, label_value: Optional[str] = None):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    @property
+    def value(self) -> int:
+        return sum(self.values.values())
+
+    def get(self, label_value: Optional[str] = None) -> int:
+        return self.values.get(label_value, 0)
+
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        return [
+            (self.name, {self.label: v} if self.label else {}, value)
+            for v, value in self.values.items()
+        ]
+
+
+class Gauge:
+    """
+    Value that goes up and down, set by the code that owns it or, with
+    ``collect``, read from a callback (a number, or {label value: number})
+    when the metrics are rendered.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label: Optional[str] = None,
+        collect: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.collect = collect
+        self.values: Dict[Optional[str], float] = {}
+        REGISTRY.append(self)
+
+    def set(self, value: float, label_value: Optional[str] = None):
+        self.values[label_value] = value
+
+    def inc(self, amount: float = 1, label_value: Optional[str] = None):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def dec(self, amount: float = 1, label_value: Optional[str] = None):
+        self.inc(-amount, label_value)
+
+    def get(self, label_value: Optional[str] = None) -> Optional[float]:
+        return self.values.get(label_value)
+
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        values = self.values
+        if self.collect is not None:
+            collected = self.collect()
+            if collected is None:
+                return []
+            values = collected if isinstance(collected, dict) else {None: collected}
+        return [
+            (self.name, {self.label: v} if self.label else {}, value)
+            for v, value in values.items()
+            if value is not None
+        ]
+
+
+# Seconds; from a cache hit to a slow full batch
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets. observe() only bumps list
+    slots and a float, so it allocates nothing per observation.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        REGISTRY.append(self)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> List[Tuple[str, dict, float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            samples.append((f"{self.name}_bucket", {"le": le}, cumulative))
+        samples.append((f"{self.name}_sum", {}, self.sum))
+        samples.append((f"{self.name}_count", {}, self.count))
+        return samples
+
+
+REGISTRY: List = []
+
+
+def snapshot() -> Dict[str, int]:
+    """Current value of every registered counter, keyed by name (and label)."""
+    values = {}
+    for counter in REGISTRY:
+        if not isinstance(counter, Counter):
+            continue
+        if counter.label is None:
+            values[counter.name] = counter.value
+            continue
+        for label_value, value in counter.values.items():
+            values[f'{counter.name}{{{counter.label}="{label_value}"}}'] = value
+    return values
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        try:
+            samples = metric.samples()
+        except Exception:
+            # A failing collect callback must not break the whole scrape
+            continue
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------
+# Proposal worker
+# ------------------------
+
+batched_messages = Counter(
+    "atlas_batched_messages_total",
+    "SQS messages with a valid proposal_id collected into serialization batches",
+)
+batched_proposals = Counter(
+    "atlas_batched_proposals_total",
+    "Unique proposal IDs serialized from those batches",
+)
+
+
+messages_received = Counter(
+    "atlas_messages_received_total", "SQS messages received by the pollers"
+)
+messages_processed = Counter(
+    "atlas_messages_processed_total",
+    "Received SQS messages by result: succeeded (acknowledged) or failed "
+    "(left on the queue for a retry)",
+    label="result",
+)
+batch_seconds = Histogram(
+    "atlas_batch_handler_seconds", "Time to handle one micro-batch of messages"
+)
+refresh_seconds = Histogram(
+    "atlas_proposal_refresh_seconds",
+    "Time to serialize and persist the unique proposals of one micro-batch",
+)
+batches_in_flight = Gauge(
+    "atlas_batches_in_flight", "Micro-batches being handled right now"
+)
+batch_capacity = Gauge(
+    "atlas_batches_max_concurrent",
+    "Micro-batches that may run at once (MAX_CONCURRENT_BATCHES)",
+)
+last_poll_timestamp = Gauge(
+    "atlas_sqs_last_poll_timestamp_seconds",
+    "Unix time of the last successful SQS receive",
+)
+poll_blocked = Gauge(
+    "atlas_sqs_poll_blocked",
+    "Pollers waiting for room in the full batch queue",
+)
+sqs_oldest_message_age = Gauge(
+    "atlas_sqs_oldest_message_age_seconds",
+    "ApproximateAgeOfOldestMessage of the queue, sampled from CloudWatch",
+)
+sqs_queue_messages = Gauge(
+    "atlas_sqs_queue_messages",
+    "Approximate queue depth by state (visible, in_flight, delayed)",
+    label="state",
+)
+
+
+def dedup_ratio() -> float:
+    """Share of batched messages that were collapsed into another message."""
+    if not batched_messages.value:
+        return 0.0
+    return 1 - batched_proposals.value / batched_messages.value
+
+
+# ------------------------
+# Denorm writes
+# ------------------------
+
+denorm_outcomes = Counter(
+    "atlas_denorm_outcomes_total",
+    "Persisted proposal payloads by outcome (created, updated, unchanged)",
+    label="outcome",
+)
+
+payload_validations = Counter(
+    "atlas_payload_validations_total",
+    "Proposal payloads checked against SerializedProposal, by result",
+    label="result",
+)
+
+deputy_denorm_outcomes = Counter(
+    "atlas_deputy_denorm_outcomes_total",
+    "Persisted deputy snapshots by outcome (created, updated, unchanged)",
+    label="outcome",
+)
+
+
+# ------------------------
+# Change capture
+# ------------------------
+
+change_capture_proposals = Counter(
+    "atlas_change_capture_proposals_total",
+    "Proposals refreshed because a source row changed since the last watermark",
+)
+
+
+# ------------------------
+# Proposal reader
+# ------------------------
+
+reader_lookups = Counter(
+    "atlas_proposal_reader_lookups_total",
+    "Proposal reads by the tier that answered them "
+    "(memory, coalesced, redis, db, serialized, miss)",
+    label="tier",
+)
+
+
+# ------------------------
+# Logging
+# ------------------------
+
+dropped_log_events = Counter(
+    "atlas_log_events_dropped_total",
+    "Info log events dropped by sampling or rate limiting, by event, or "
+    "because the log queue was full (queue_full)",
+    label="event",
+)
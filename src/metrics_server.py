@@ -0,0 +1,236 @@
+"""
+Prometheus metrics and probes over a minimal asyncio HTTP server.
+
+    GET /metrics   src.metrics in the Prometheus text format
+    GET /healthz   liveness, 200 while the event loop answers
+    GET /ready     readiness, 200 when the database and Redis answer and SQS
+                   was polled recently (or the poller waits on a full batch
+                   queue), else 503 with the failing checks
+
+Every worker process serves on METRICS_PORT + its index. Queue depth and
+ApproximateAgeOfOldestMessage are sampled every SQS_STATS_INTERVAL_SECONDS
+by one process (sample_queue_stats); the age is a CloudWatch metric, the
+SQS API does not return it.
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+import boto3
+import structlog
+from dotenv import load_dotenv
+from tortoise import Tortoise
+
+from src import metrics
+from src.db import pool_stats as db_pool_stats
+from src.redis import redis_client
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+# Not ready when the last successful SQS receive is older than this
+READY_MAX_POLL_AGE_SECONDS = float(os.getenv("READY_MAX_POLL_AGE_SECONDS", 60))
+READY_CHECK_TIMEOUT_SECONDS = float(os.getenv("READY_CHECK_TIMEOUT_SECONDS", 2))
+SQS_STATS_INTERVAL_SECONDS = float(os.getenv("SQS_STATS_INTERVAL_SECONDS", 60))
+
+REQUEST_TIMEOUT_SECONDS = 5
+
+_started_at = time.time()
+
+
+def _seconds_since_last_poll() -> Optional[float]:
+    last_poll = metrics.last_poll_timestamp.get()
+    return None if last_poll is None else round(time.time() - last_poll, 3)
+
+
+# Read from the pools and the clock when /metrics is scraped
+metrics.Gauge(
+    "atlas_sqs_seconds_since_last_poll",
+    "Seconds since the last successful SQS receive",
+    collect=_seconds_since_last_poll,
+)
+metrics.Gauge(
+    "atlas_db_pool_connections",
+    "Database pool connections by state (in_use, idle, max)",
+    label="state",
+    collect=db_pool_stats,
+)
+metrics.Gauge(
+    "atlas_redis_pool_connections",
+    "Redis pool connections by state (in_use, idle, max)",
+    label="state",
+    collect=redis_client.pool_stats,
+)
+
+
+async def readiness(shutdown_event: asyncio.Event) -> dict:
+    """Name of every readiness check mapped to None (passed) or its failure."""
+    checks = {}
+    checks["shutdown"] = "shutting down" if shutdown_event.is_set() else None
+
+    try:
+        await asyncio.wait_for(
+            Tortoise.get_connection("default").execute_query("SELECT 1"),
+            READY_CHECK_TIMEOUT_SECONDS,
+        )
+        checks["database"] = None
+    except Exception as e:
+        checks["database"] = str(e) or type(e).__name__
+
+    try:
+        await asyncio.wait_for(redis_client.ping(), READY_CHECK_TIMEOUT_SECONDS)
+        checks["redis"] = None
+    except Exception as e:
+        checks["redis"] = str(e) or type(e).__name__
+
+    # Before the first receive, allow the same grace from process start.
+    # A poller waiting for room in the full batch queue is busy, not stuck.
+    last_poll = metrics.last_poll_timestamp.get() or _started_at
+    age = time.time() - last_poll
+    checks["sqs_poll"] = (
+        f"last successful poll {age:.0f}s ago"
+        if age > READY_MAX_POLL_AGE_SECONDS and not metrics.poll_blocked.get()
+        else None
+    )
+    return checks
+
+
+async def _route(path: str, shutdown_event: asyncio.Event) -> Tuple[int, str, str]:
+    if path == "/metrics":
+        return 200, "text/plain; version=0.0.4; charset=utf-8", metrics.render()
+    if path == "/healthz":
+        return 200, "text/plain", "ok\n"
+    if path == "/ready":
+        checks = await readiness(shutdown_event)
+        failing = {name: error for name, error in checks.items() if error}
+        body = json.dumps({"ready": not failing, "failing": failing}) + "\n"
+        return (503 if failing else 200), "application/json", body
+    return 404, "text/plain", "not found\n"
+
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Unavailable"}
+
+
+async def _serve(reader, writer, shutdown_event: asyncio.Event):
+    try:
+        request_line = await asyncio.wait_for(
+            reader.readline(), REQUEST_TIMEOUT_SECONDS
+        )
+        # Headers are not needed; read past them
+        while True:
+            line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT_SECONDS)
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) < 2 or parts[0] not in ("GET", "HEAD"):
+            status, content_type, body = 405, "text/plain", "method not allowed\n"
+        else:
+            path = parts[1].split("?", 1)[0]
+            status, content_type, body = await _route(path, shutdown_event)
+
+        encoded = body.encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(encoded)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+        )
+        if parts and parts[0] != "HEAD":
+            writer.write(encoded)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    except Exception as e:
+        logger.exception("metrics_request_failed", error=str(e))
+    finally:
+        writer.close()
+
+
+async def run_metrics_server(
+    shutdown_event: asyncio.Event, host: str = METRICS_HOST, port: int = METRICS_PORT
+):
+    """Serve /metrics, /healthz and /ready until shutdown."""
+    try:
+        server = await asyncio.start_server(
+            lambda reader, writer: _serve(reader, writer, shutdown_event), host, port
+        )
+    except OSError as e:
+        logger.error("metrics_server_failed", host=host, port=port, error=str(e))
+        return
+    logger.info("metrics_server_started", host=host, port=port)
+    async with server:
+        await shutdown_event.wait()
+
+
+# ------------------------
+# SQS queue lag
+# ------------------------
+
+
+def _queue_stats(sqs, cloudwatch, queue_url: str) -> Tuple[dict, Optional[float]]:
+    attributes = sqs.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=[
+            "ApproximateNumberOfMessages",
+            "ApproximateNumberOfMessagesNotVisible",
+            "ApproximateNumberOfMessagesDelayed",
+        ],
+    )["Attributes"]
+    depth = {
+        "visible": int(attributes.get("ApproximateNumberOfMessages", 0)),
+        "in_flight": int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0)),
+        "delayed": int(attributes.get("ApproximateNumberOfMessagesDelayed", 0)),
+    }
+
+    now = datetime.now(timezone.utc)
+    datapoints = cloudwatch.get_metric_statistics(
+        Namespace="AWS/SQS",
+        MetricName="ApproximateAgeOfOldestMessage",
+        Dimensions=[
+            {"Name": "QueueName", "Value": queue_url.rstrip("/").split("/")[-1]}
+        ],
+        StartTime=now - timedelta(minutes=5),
+        EndTime=now,
+        Period=60,
+        Statistics=["Maximum"],
+    )["Datapoints"]
+    latest = max(datapoints, key=lambda point: point["Timestamp"], default=None)
+    return depth, None if latest is None else latest["Maximum"]
+
+
+async def sample_queue_stats(shutdown_event: asyncio.Event, sqs, queue_url: str):
+    """Refresh the queue depth and oldest-message age gauges periodically."""
+    cloudwatch = boto3.client(
+        "cloudwatch",
+        region_name=os.getenv("AWS_REGION"),
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+    )
+    while not shutdown_event.is_set():
+        try:
+            depth, oldest_age = await asyncio.to_thread(
+                _queue_stats, sqs, cloudwatch, queue_url
+            )
+            for state, count in depth.items():
+                metrics.sqs_queue_messages.set(count, label_value=state)
+            if oldest_age is not None:
+                metrics.sqs_oldest_message_age.set(oldest_age)
+        except Exception as e:
+            logger.warning("sqs_stats_failed", error=str(e))
+        try:
+            await asyncio.wait_for(
+                shutdown_event.wait(), timeout=SQS_STATS_INTERVAL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
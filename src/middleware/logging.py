@@ -1,18 +1,146 @@
+import atexit
 import logging
-import structlog
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import time
+from typing import Dict, List, Optional
+
+import structlog
+from dotenv import load_dotenv
+
+from src import metrics
+
+load_dotenv()
+
+# "queue" hands records to a background thread that writes them, "stream"
+# writes them on the calling thread (inside the event loop)
+LOG_HANDLER = os.getenv("LOG_HANDLER", "queue")
+# Share of some info events to keep,
+# e.g. "cached_proposal_redis=0.01,no_change_detected=0.1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Info events of one type logged per second at most (0: unlimited)
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", 200))
+# Records waiting for the writer thread; once full, debug and info records
+# are dropped (counted as event="queue_full") rather than queued
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
 
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """``"event=rate,event=rate"`` as a dict."""
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
 
-def setup_logging():
+
+class EventSampler:
+    """
+    structlog processor that drops part of the high-volume info events:
+    a fixed share of the events listed in ``rates``, and any event type
+    logged more than ``per_second`` times a second (token bucket, bursts
+    of up to one second). Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float], per_second: float):
+        self.rates = rates
+        self.per_second = per_second
+        # event -> [tokens, last refill]
+        self.buckets: Dict[str, List[float]] = {}
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if method_name not in ("debug", "info"):
+            return event_dict
+        event = event_dict.get("event")
+        rate = self.rates.get(event)
+        if rate is not None and random.random() >= rate:
+            self._drop(event)
+        if self.per_second > 0:
+            now = time.monotonic()
+            bucket = self.buckets.get(event)
+            if bucket is None:
+                bucket = self.buckets[event] = [self.per_second, now]
+            bucket[0] = min(
+                self.per_second, bucket[0] + (now - bucket[1]) * self.per_second
+            )
+            bucket[1] = now
+            if bucket[0] < 1:
+                self._drop(event)
+            bucket[0] -= 1
+        return event_dict
+
+    def _drop(self, event):
+        metrics.dropped_log_events.inc(label_value=event)
+        raise structlog.DropEvent
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a bounded queue: debug and info records that do not
+    fit are dropped and counted, warnings and errors wait for room.
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.dropped_log_events.inc(label_value="queue_full")
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing on a full queue
+        self.queue.put(self._sentinel)
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # writes out every queued record
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(
+    handler: str = LOG_HANDLER,
+    stream=None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    rate_limit: float = LOG_RATE_LIMIT_PER_SECOND,
+    queue_size: int = LOG_QUEUE_SIZE,
+):
     """
     Configure structured logging for the worker.
     Outputs JSON logs with context (timestamp, event, level, etc.).
+
+    With ``handler="queue"`` the event loop only puts records on a queue
+    of ``queue_size`` records; a QueueListener thread writes them to
+    ``stream`` (stdout), so a slow log sink cannot stall the loop or grow
+    the queue without bound. When the queue is full, debug and info
+    records are dropped, warnings and errors wait for room. Info events
+    are sampled and rate limited per event type.
     """
+    global _listener
+    stream = stream or sys.stdout
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
 
     timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
 
     structlog.configure(
         processors=[
+            # Before anything is rendered, so dropped events cost little
+            EventSampler(sample_rates, rate_limit),
             structlog.contextvars.merge_contextvars,  # Support async contexts
             timestamper,
             structlog.stdlib.add_log_level,
@@ -27,10 +155,16 @@ def setup_logging():
         cache_logger_on_first_use=True,
     )
 
+    _stop_listener()
+    output = logging.StreamHandler(stream)
+    if handler == "queue":
+        records: queue.Queue = queue.Queue(maxsize=queue_size)
+        _listener = _Listener(records, output)
+        _listener.start()
+        output = BoundedQueueHandler(records)
+
     logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
+        format="%(message)s", handlers=[output], level=logging.INFO, force=True
     )
 
     return structlog.get_logger()
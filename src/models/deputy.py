@@ -1,6 +1,8 @@
 from tortoise import fields
 from tortoise.models import Model
 
+from src.models.timestamp import TimeStampedMixin
+
 
 class Deputy(Model):
     id = fields.IntField(pk=True)
@@ -38,3 +40,31 @@ class Deputy(Model):
 
     class Meta:
         table = "deputies_list"
+
+
+class DeputyDenorm(Model, TimeStampedMixin):
+    id = fields.IntField(pk=True)
+    deputy = fields.OneToOneField(
+        "models.Deputy",
+        related_name="denorm",
+        on_delete=fields.CASCADE,
+        index=True,
+        description="Reference to the original deputy",
+    )
+
+    payload = fields.JSONField(
+        description="Serialized JSON snapshot of the deputy profile page"
+    )
+
+    checksum = fields.CharField(
+        max_length=64,
+        null=True,
+        description="Optional hash to detect changes in payload",
+    )
+
+    class Meta:
+        table = "deputy_denorm"
+        table_description = "Deputy profile (Denormalized JSON)"
+
+    def __str__(self):
+        return f"Denorm for Deputy ID {self.deputy_id}"
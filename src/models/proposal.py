@@ -45,6 +45,8 @@ class LegislativeProposal(Model, TimeStampedMixin):
 
     class Meta:
         table = "legislative_proposal"
+        # Serves the keyset scans of src/workers/change_capture.py
+        indexes = (("updated_at", "id"),)
 
 
 class LegislativeInitiator(Model, TimeStampedMixin):
@@ -68,6 +70,7 @@ class LegislativeInitiator(Model, TimeStampedMixin):
 
     class Meta:
         table = "scrape_legislative_legislativeinitiator"
+        indexes = (("updated_at", "id"),)
 
 
 class LegislativeConsult(Model, TimeStampedMixin):
@@ -85,6 +88,7 @@ class LegislativeConsult(Model, TimeStampedMixin):
 
     class Meta:
         table = "scrape_legislative_legislativeconsult"
+        indexes = (("updated_at", "id"),)
 
 
 class LegislativeSummary(Model, TimeStampedMixin):
@@ -103,6 +107,7 @@ class LegislativeSummary(Model, TimeStampedMixin):
 
     class Meta:
         table = "scrape_legislative_legislativesummary"
+        indexes = (("updated_at", "id"),)
 
 
 class LegislativeProcedure(Model, TimeStampedMixin):
@@ -122,6 +127,7 @@ class LegislativeProcedure(Model, TimeStampedMixin):
 
     class Meta:
         table = "scrape_legislative_legislativeprocedure"
+        indexes = (("updated_at", "id"),)
 
 
 class ProcedureDocument(Model, TimeStampedMixin):
@@ -139,6 +145,7 @@ class ProcedureDocument(Model, TimeStampedMixin):
 
     class Meta:
         table = "scrape_legislative_proceduredocument"
+        indexes = (("updated_at", "id"),)
 
 
 class LegislativeProposalDenorm(Model, TimeStampedMixin):
@@ -166,6 +173,11 @@ class LegislativeProposalDenorm(Model, TimeStampedMixin):
         description=("Whether users have been notified about this proposal update"),
     )
 
+    sections = fields.JSONField(
+        null=True,
+        description="Checksum and source-row watermark of each payload section",
+    )
+
     class Meta:
         table = "legislative_proposal_denorm"
         table_description = "Legislative Proposal (Denormalized JSON)"
@@ -0,0 +1,217 @@
+"""
+Opt-in per-message query and stage profiling (PROFILING_ENABLED=1).
+
+install() hooks the execute methods of the Tortoise client class, so every
+SQL statement is counted and timed. Inside ``with profile("event", ...)``
+the statements and the ``stage()`` blocks of the serializer (watermarks,
+prefetch, build, encode, validate, cache_check, db_upsert, redis_write)
+are added up and logged as one summary event when the block exits. The
+profile is carried by a ContextVar, so tasks spawned inside the block
+report into it, and its fields are bound to the structlog context for
+every event logged meanwhile.
+
+Independently of profiles, the slowest PROFILING_SLOW_STATEMENTS
+statements of every PROFILING_INTERVAL_SECONDS are logged as one
+``slow_statements`` event.
+"""
+
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from dotenv import load_dotenv
+from tortoise import Tortoise
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PROFILING_SLOW_STATEMENTS = int(os.getenv("PROFILING_SLOW_STATEMENTS", 5))
+PROFILING_INTERVAL_SECONDS = float(os.getenv("PROFILING_INTERVAL_SECONDS", 60))
+# Longer statements are truncated in slow_statements events
+PROFILING_SQL_MAX_LENGTH = 500
+
+_QUERY_METHODS = (
+    "execute_query",
+    "execute_query_dict",
+    "execute_insert",
+    "execute_many",
+    "execute_script",
+)
+
+_NOT_PROFILING = nullcontext()
+
+
+class Profile:
+    """Query and stage timings of one unit of work."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_queries: Dict[str, int] = {}
+
+    def add_query(self, stage: Optional[str], seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+        if stage:
+            self.stage_queries[stage] = self.stage_queries.get(stage, 0) + 1
+
+    def add_stage(self, name: str, seconds: float):
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+
+    def summary(self) -> dict:
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "db_queries": self.queries,
+            "db_ms": round(self.query_seconds * 1000, 2),
+            "stages_ms": {
+                name: round(seconds * 1000, 2)
+                for name, seconds in self.stage_seconds.items()
+            },
+            "stage_queries": dict(self.stage_queries),
+        }
+
+
+class SlowStatementSampler:
+    """Keeps the ``size`` slowest statements seen during each interval."""
+
+    def __init__(
+        self,
+        size: int = PROFILING_SLOW_STATEMENTS,
+        interval: float = PROFILING_INTERVAL_SECONDS,
+    ):
+        self.size = size
+        self.interval = interval
+        self.statements: List[Tuple[float, int, str, Optional[str]]] = []
+        self.seen = 0
+        self.interval_started = time.monotonic()
+        self._order = itertools.count()
+
+    def record(self, sql: str, seconds: float, stage: Optional[str] = None):
+        self.seen += 1
+        entry = (seconds, next(self._order), sql, stage)
+        if len(self.statements) < self.size:
+            heapq.heappush(self.statements, entry)
+        elif seconds > self.statements[0][0]:
+            heapq.heapreplace(self.statements, entry)
+        if time.monotonic() - self.interval_started >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.statements:
+            logger.info(
+                "slow_statements",
+                interval_seconds=round(time.monotonic() - self.interval_started, 1),
+                statements_seen=self.seen,
+                slowest=[
+                    {
+                        "ms": round(seconds * 1000, 2),
+                        "stage": stage,
+                        "sql": " ".join(sql.split())[:PROFILING_SQL_MAX_LENGTH],
+                    }
+                    for seconds, _, sql, stage in sorted(self.statements, reverse=True)
+                ],
+            )
+        self.statements = []
+        self.seen = 0
+        self.interval_started = time.monotonic()
+
+
+_profile: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+_stage: ContextVar[Optional[str]] = ContextVar("profile_stage", default=None)
+sampler = SlowStatementSampler()
+_installed: List[Tuple[type, str, object]] = []
+
+
+def _timed(original):
+    async def execute(self, query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original(self, query, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            stage = _stage.get()
+            current = _profile.get()
+            if current is not None:
+                current.add_query(stage, seconds)
+            sampler.record(query, seconds, stage)
+
+    return execute
+
+
+def install(connection: str = "default"):
+    """
+    Time every statement sent through the client class of ``connection``
+    (and its transaction wrappers). Call after init_db(); idempotent.
+    """
+    if _installed:
+        return
+    client = type(Tortoise.get_connection(connection))
+    for cls in (client, *client.__subclasses__()):
+        for name in _QUERY_METHODS:
+            if name in vars(cls):
+                original = vars(cls)[name]
+                _installed.append((cls, name, original))
+                setattr(cls, name, _timed(original))
+
+
+def uninstall():
+    """Restore the original client methods and log pending slow statements."""
+    while _installed:
+        cls, name, original = _installed.pop()
+        setattr(cls, name, original)
+    sampler.flush()
+
+
+def current() -> Optional[Profile]:
+    return _profile.get()
+
+
+@contextmanager
+def profile(event: str, **context):
+    """
+    Profile the block and log ``event`` with its summary on exit.
+    A no-op unless PROFILING_ENABLED or install() was called explicitly.
+    """
+    if not _installed:
+        yield None
+        return
+    current_profile = Profile()
+    token = _profile.set(current_profile)
+    try:
+        with structlog.contextvars.bound_contextvars(**context):
+            yield current_profile
+    finally:
+        _profile.reset(token)
+        logger.info(event, **context, **current_profile.summary())
+
+
+@contextmanager
+def _timed_stage(name: str, current_profile: Profile):
+    token = _stage.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current_profile.add_stage(name, time.perf_counter() - started)
+        _stage.reset(token)
+
+
+def stage(name: str):
+    """Time a serializer stage into the current profile, if there is one."""
+    current_profile = _profile.get()
+    if current_profile is None:
+        return _NOT_PROFILING
+    return _timed_stage(name, current_profile)
@@ -0,0 +1,270 @@
+"""
+Read-through access to serialized proposals for other services.
+
+Lookups go through four tiers, each only asked for what the previous one
+missed:
+
+    memory      bounded in-process LRU with a TTL
+    redis       one pipelined GET of :1:proposal:{id} (cache_codec aware)
+    db          LegislativeProposalDenorm rows, copied back into Redis
+    serialized  on-demand serialize_proposals() + persist_proposals(), under
+                the proposal leases; a proposal leased by a worker is
+                served without being persisted
+
+Concurrent misses for the same ID share a single load: if it fails, every
+caller waiting on it gets the error, and if the caller that owns it is
+cancelled, the waiters load the ID again themselves. IDs that do not
+resolve to a payload are cached as misses for PROPOSAL_READER_NEGATIVE_TTL
+seconds. Returned payloads are shared between callers: treat them as
+read-only.
+
+    from src.proposal_reader import get_proposal, get_proposals
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from src import cache_codec, canonical_json, metrics
+from src.models.proposal import LegislativeProposalDenorm
+from src.redis import redis_client
+from src.tasks.denorm_proposal import (
+    REDIS_TTL_SECONDS,
+    ProposalResult,
+    encode_cached_proposal,
+    persist_proposals,
+    proposal_cache_key,
+    proposal_checksum_key,
+    serialize_proposals,
+)
+from src.tasks.proposal_lease import RESULT_DEFERRED, run_exclusive
+
+logger = structlog.get_logger()
+
+PROPOSAL_READER_MAX_SIZE = int(os.getenv("PROPOSAL_READER_MAX_SIZE", 1000))
+PROPOSAL_READER_TTL = float(os.getenv("PROPOSAL_READER_TTL", 60))
+PROPOSAL_READER_NEGATIVE_TTL = float(os.getenv("PROPOSAL_READER_NEGATIVE_TTL", 5))
+
+TIER_MEMORY = "memory"
+TIER_REDIS = "redis"
+TIER_DB = "db"
+TIER_SERIALIZED = "serialized"
+TIER_COALESCED = "coalesced"
+TIER_MISS = "miss"
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used key, with per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[int, Tuple[float, Optional[dict]]]" = OrderedDict()
+
+    def get(self, key):
+        """Return the cached value (None for a cached miss) or _MISSING."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return _MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class ProposalReader:
+    """Tiered, coalescing proposal reader; see the module docstring."""
+
+    def __init__(
+        self,
+        max_size: int = PROPOSAL_READER_MAX_SIZE,
+        ttl: float = PROPOSAL_READER_TTL,
+        negative_ttl: float = PROPOSAL_READER_NEGATIVE_TTL,
+    ):
+        self.cache = LRUCache(max_size, ttl)
+        self.negative_ttl = negative_ttl
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def get_proposal(self, proposal_id: int) -> Optional[dict]:
+        """Payload of one proposal, or None if it has none."""
+        return (await self.get_proposals([proposal_id]))[proposal_id]
+
+    async def get_proposals(self, ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+        """Payloads of several proposals, keyed by ID (None where missing)."""
+        unique_ids = list(dict.fromkeys(ids))
+        found: Dict[int, Optional[dict]] = {}
+        waiting: Dict[int, asyncio.Future] = {}
+        owned: List[int] = []
+        for proposal_id in unique_ids:
+            value = self.cache.get(proposal_id)
+            if value is not _MISSING:
+                found[proposal_id] = value
+                metrics.reader_lookups.inc(label_value=TIER_MEMORY)
+            elif proposal_id in self._inflight:
+                waiting[proposal_id] = self._inflight[proposal_id]
+                metrics.reader_lookups.inc(label_value=TIER_COALESCED)
+            else:
+                owned.append(proposal_id)
+
+        if owned:
+            loop = asyncio.get_running_loop()
+            futures = {proposal_id: loop.create_future() for proposal_id in owned}
+            self._inflight.update(futures)
+            try:
+                loaded = await self._load(owned)
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    # Mark it retrieved, a failure nobody waited on is fine
+                    future.exception()
+                raise
+            else:
+                for proposal_id, future in futures.items():
+                    future.set_result(loaded.get(proposal_id))
+            finally:
+                for proposal_id, future in futures.items():
+                    self._inflight.pop(proposal_id, None)
+                    if not future.done():
+                        future.cancel()
+            for proposal_id in owned:
+                found[proposal_id] = loaded.get(proposal_id)
+
+        for proposal_id, future in waiting.items():
+            try:
+                # Shielded: a cancelled waiter must not cancel the shared load
+                found[proposal_id] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller that owned the load was cancelled; load it here
+                found[proposal_id] = await self.get_proposal(proposal_id)
+
+        return {proposal_id: found[proposal_id] for proposal_id in unique_ids}
+
+    def invalidate(self, proposal_id: int):
+        """Drop a proposal from the in-process tier."""
+        self.cache.discard(proposal_id)
+
+    async def _serialize(self, ids: List[int]) -> Dict[int, ProposalResult]:
+        results = await serialize_proposals(ids)
+        try:
+            await persist_proposals([r for r in results.values() if r.ok])
+        except Exception as e:
+            # The payloads are still good to serve
+            logger.warning("proposal_reader_persist_failed", error=str(e))
+        return results
+
+    async def _load(self, ids: List[int]) -> Dict[int, Optional[dict]]:
+        loaded: Dict[int, Optional[dict]] = {}
+
+        values = await redis_client.get_many(
+            [proposal_cache_key(proposal_id) for proposal_id in ids], raw=True
+        )
+        for proposal_id, value in zip(ids, values):
+            if value is None:
+                continue
+            try:
+                loaded[proposal_id] = cache_codec.loads(value)
+                metrics.reader_lookups.inc(label_value=TIER_REDIS)
+            except (cache_codec.CacheCodecError, ValueError) as e:
+                logger.warning(
+                    "proposal_cache_undecodable", proposal_id=proposal_id, error=str(e)
+                )
+
+        missing = [proposal_id for proposal_id in ids if proposal_id not in loaded]
+        if missing:
+            rows = await LegislativeProposalDenorm.filter(
+                proposal_id__in=missing
+            ).values("proposal_id", "payload", "checksum")
+            for row in rows:
+                loaded[row["proposal_id"]] = row["payload"]
+                metrics.reader_lookups.inc(label_value=TIER_DB)
+            await self._backfill_redis(rows)
+
+        missing = [proposal_id for proposal_id in ids if proposal_id not in loaded]
+        if missing:
+            results = await run_exclusive(missing, self._serialize)
+            deferred = [
+                proposal_id
+                for proposal_id, result in results.items()
+                if result.status == RESULT_DEFERRED
+            ]
+            if deferred:
+                # The lease holder writes these; serve them without persisting
+                results.update(await serialize_proposals(deferred))
+            ready = [result for result in results.values() if result.ok]
+            for result in ready:
+                loaded[result.proposal_id] = result.payload
+                metrics.reader_lookups.inc(label_value=TIER_SERIALIZED)
+
+        for proposal_id in ids:
+            payload = loaded.get(proposal_id)
+            if payload is None:
+                metrics.reader_lookups.inc(label_value=TIER_MISS)
+                self.cache.set(proposal_id, None, ttl=self.negative_ttl)
+            else:
+                self.cache.set(proposal_id, payload)
+        return loaded
+
+    async def _backfill_redis(self, rows: List[dict]):
+        """Copy denorm rows back into Redis, e.g. after a flush."""
+        if not rows:
+            return
+        try:
+            await redis_client.set_many_with_checksum(
+                [
+                    (
+                        proposal_cache_key(row["proposal_id"]),
+                        encode_cached_proposal(canonical_json.dumps(row["payload"])),
+                        proposal_checksum_key(row["proposal_id"]),
+                        row["checksum"],
+                    )
+                    for row in rows
+                    if row["checksum"]
+                ],
+                REDIS_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.warning("proposal_cache_backfill_failed", error=str(e))
+
+
+def hit_ratios() -> Dict[str, float]:
+    """Share of lookups answered by each tier since the process started."""
+    total = metrics.reader_lookups.value
+    if not total:
+        return {}
+    return {
+        tier: round(count / total, 4)
+        for tier, count in metrics.reader_lookups.values.items()
+    }
+
+
+proposal_reader = ProposalReader()
+
+
+async def get_proposal(proposal_id: int) -> Optional[dict]:
+    return await proposal_reader.get_proposal(proposal_id)
+
+
+async def get_proposals(ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+    return await proposal_reader.get_proposals(ids)
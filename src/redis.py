@@ -1,4 +1,6 @@
 import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
 import redis.asyncio as redis
 from dotenv import load_dotenv
 
@@ -6,27 +8,118 @@ load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+# Max commands per pipeline in the batch operations
+REDIS_BATCH_CHUNK_SIZE = int(os.getenv("REDIS_BATCH_CHUNK_SIZE", 500))
+# Part of connect()'s max_connections given to the undecoded client, which
+# only serves the proposal reader's MGETs
+REDIS_RAW_POOL_FRACTION = float(os.getenv("REDIS_RAW_POOL_FRACTION", 0.25))
+
+# Refresh the TTL of a value and its checksum key when the stored checksum
+# matches; returns 1 if refreshed, 0 if the value must be rewritten.
+# KEYS: value key, checksum key. ARGV: checksum, TTL in seconds.
+REFRESH_IF_CHECKSUM_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Take a lease (SET NX PX) or, when someone else holds it and ARGV[3] is
+# "1", flag the key for a re-run by the holder; returns 1 if acquired.
+# Atomic with the release script, so a flag can never land between a
+# holder's release and check.
+# KEYS: lease key, re-run flag key. ARGV: token, lease TTL in ms, flag.
+ACQUIRE_LEASE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if ARGV[3] == '1' then
+    redis.call('SET', KEYS[2], '1', 'PX', ARGV[2])
+end
+return 0
+"""
+
+# Extend a lease and its re-run flag only if ``token`` still holds the
+# lease, so a flag lives as long as the lease; returns 1 if extended.
+# KEYS: lease key, re-run flag key. ARGV: token, lease TTL in ms.
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+redis.call('PEXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+# Release a lease only if ``token`` still holds it, consuming its re-run
+# flag; returns 0 if not held by token, 1 if released, 2 if released and a
+# re-run was requested meanwhile.
+# KEYS: lease key, re-run flag key. ARGV: token.
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return 1 + redis.call('DEL', KEYS[2])
+"""
 
 
 class RedisClient:
     """Handles Redis connection."""
 
-    def __init__(self):
+    def __init__(self, chunk_size: int = REDIS_BATCH_CHUNK_SIZE):
         self.redis = None
+        # Same server without response decoding, for binary (encoded) values
+        self.raw = None
+        self.chunk_size = chunk_size
+        self._scripts: Dict[str, object] = {}
 
-    async def connect(self):
-        """Establish Redis connection"""
+    async def connect(self, max_connections: int = 100):
+        """
+        Establish Redis connection. ``max_connections`` is split between the
+        decoded and the raw client's pools (REDIS_RAW_POOL_FRACTION), each
+        keeping at least one connection.
+        """
+        raw_connections = max(1, round(max_connections * REDIS_RAW_POOL_FRACTION))
         self.redis = await redis.from_url(
             REDIS_URL,
             password=REDIS_PASSWORD,
             decode_responses=True,
-            max_connections=100,
+            max_connections=max(1, max_connections - raw_connections),
         )
+        self.raw = await redis.from_url(
+            REDIS_URL,
+            password=REDIS_PASSWORD,
+            decode_responses=False,
+            max_connections=raw_connections,
+        )
+        self._scripts = {}
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Connections in use and idle across both clients' pools, and their cap."""
+        stats = {"in_use": 0, "idle": 0, "max": 0}
+        for client in (self.redis, self.raw):
+            if client is None:
+                continue
+            pool = client.connection_pool
+            stats["in_use"] += len(pool._in_use_connections)
+            stats["idle"] += len(pool._available_connections)
+            stats["max"] += pool.max_connections
+        return stats
+
+    async def ping(self) -> bool:
+        if self.redis is None:
+            return False
+        return bool(await self.redis.ping())
 
     async def close(self):
         """Close Redis connection"""
         if self.redis:
             await self.redis.close()
+        if self.raw:
+            await self.raw.close()
 
     # ------------------------
     # Basic key-value ops
@@ -77,5 +170,230 @@ class RedisClient:
             )
         return await self.redis.expire(key, time)
 
+    # ------------------------
+    # Set ops
+    # ------------------------
+    async def sadd(self, key: str, *members):
+        """Add members to a set"""
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        return await self.redis.sadd(key, *members)
+
+    async def spop(self, key: str, count: int) -> List[str]:
+        """Remove and return up to ``count`` members of a set"""
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        return await self.redis.spop(key, count) or []
+
+    # ------------------------
+    # Checksum-guarded values
+    # ------------------------
+
+    async def refresh_if_checksum(
+        self, key: str, checksum_key: str, checksum: str, ex: int
+    ) -> bool:
+        """
+        In one round trip, refresh the TTL of ``key`` and ``checksum_key`` if
+        the stored checksum equals ``checksum``. Returns False when the value
+        is missing or stale and has to be rewritten.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        refreshed = await self._checksum_script()(
+            keys=[key, checksum_key], args=[checksum, ex]
+        )
+        return bool(refreshed)
+
+    def _script(self, source: str):
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+    def _checksum_script(self):
+        return self._script(REFRESH_IF_CHECKSUM_SCRIPT)
+
+    async def set_with_checksum(
+        self, key: str, value: str, checksum_key: str, checksum: str, ex: int
+    ):
+        """Atomically write a value and its checksum key with the same TTL."""
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, ex=ex)
+            pipe.set(checksum_key, checksum, ex=ex)
+            return await pipe.execute()
+
+    # ------------------------
+    # Batch ops (pipelined, chunked)
+    # ------------------------
+
+    def _chunks(self, items: Sequence) -> Iterable[Sequence]:
+        for start in range(0, len(items), self.chunk_size):
+            yield items[start : start + self.chunk_size]
+
+    async def set_many(self, items: Iterable[Tuple[str, str, Optional[int]]]):
+        """Set (key, value, TTL in seconds or None) triples, pipelined."""
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value, ex in chunk:
+                    pipe.set(key, value, ex=ex)
+                await pipe.execute()
+
+    async def get_many(self, keys: Sequence[str], raw: bool = False) -> List:
+        """
+        Get several keys, one MGET per chunk; missing keys are None.
+        ``raw`` returns undecoded bytes, for values written by cache_codec.
+        """
+        client = self.raw if raw else self.redis
+        if client is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        values = []
+        for chunk in self._chunks(list(keys)):
+            values.extend(await client.mget(chunk))
+        return values
+
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        """Delete several keys, one DEL per chunk. Returns how many existed."""
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        deleted = 0
+        for chunk in self._chunks(list(keys)):
+            deleted += await self.redis.delete(*chunk)
+        return deleted
+
+    async def refresh_many_if_checksum(
+        self, items: Sequence[Tuple[str, str, str]], ex: int
+    ) -> List[bool]:
+        """
+        Batch form of refresh_if_checksum for (key, checksum key, checksum)
+        triples, with the script calls pipelined per chunk.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        script = self._checksum_script()
+        refreshed = []
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, checksum_key, checksum in chunk:
+                    await script(
+                        keys=[key, checksum_key], args=[checksum, ex], client=pipe
+                    )
+                refreshed.extend(bool(value) for value in await pipe.execute())
+        return refreshed
+
+    async def set_many_with_checksum(
+        self, items: Sequence[Tuple[str, str, str, str]], ex: int
+    ):
+        """
+        Batch form of set_with_checksum for (key, value, checksum key,
+        checksum) tuples. Each chunk is one MULTI, so a value and its
+        checksum are always written together.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for key, value, checksum_key, checksum in chunk:
+                    pipe.set(key, value, ex=ex)
+                    pipe.set(checksum_key, checksum, ex=ex)
+                await pipe.execute()
+
+    # ------------------------
+    # Leases
+    # ------------------------
+
+    async def acquire_leases(
+        self,
+        items: Sequence[Tuple[str, str]],
+        token: str,
+        ttl_ms: int,
+        flag_rerun: bool = True,
+    ) -> List[bool]:
+        """
+        Try to take the lease of every (lease key, re-run flag key) pair for
+        ``token``, pipelined per chunk. A lease held by someone else gets its
+        re-run flag set instead, unless ``flag_rerun`` is False. Returns True
+        where the lease was acquired.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        script = self._script(ACQUIRE_LEASE_SCRIPT)
+        acquired = []
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for lease_key, rerun_key in chunk:
+                    await script(
+                        keys=[lease_key, rerun_key],
+                        args=[token, ttl_ms, "1" if flag_rerun else "0"],
+                        client=pipe,
+                    )
+                acquired.extend(bool(value) for value in await pipe.execute())
+        return acquired
+
+    async def renew_leases(
+        self, items: Sequence[Tuple[str, str]], token: str, ttl_ms: int
+    ) -> List[bool]:
+        """
+        Extend the (lease key, re-run flag key) pairs whose lease ``token``
+        still holds to ``ttl_ms`` from now, pipelined per chunk. Returns
+        False where the lease was lost.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        script = self._script(RENEW_LEASE_SCRIPT)
+        renewed = []
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for lease_key, rerun_key in chunk:
+                    await script(
+                        keys=[lease_key, rerun_key], args=[token, ttl_ms], client=pipe
+                    )
+                renewed.extend(bool(value) for value in await pipe.execute())
+        return renewed
+
+    async def release_leases(
+        self, items: Sequence[Tuple[str, str]], token: str
+    ) -> List[int]:
+        """
+        Release the leases ``token`` still holds, see RELEASE_LEASE_SCRIPT
+        for the returned codes. Leases that expired are left alone.
+        """
+        if self.redis is None:
+            raise RuntimeError(
+                "Redis connection not established. Call connect() first."
+            )
+        script = self._script(RELEASE_LEASE_SCRIPT)
+        released = []
+        for chunk in self._chunks(list(items)):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for lease_key, rerun_key in chunk:
+                    await script(keys=[lease_key, rerun_key], args=[token], client=pipe)
+                released.extend(int(value) for value in await pipe.execute())
+        return released
+
 
 redis_client = RedisClient()
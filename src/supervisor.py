@@ -0,0 +1,193 @@
+"""
+Multi-process mode of the worker (``python main.py --processes N``).
+
+Serializing, encoding and hashing payloads is CPU-bound, so one event loop
+tops out at one core. The supervisor spawns N worker processes, each with
+its own event loop and its share of the DB and Redis connection budgets,
+forwards SIGTERM/SIGINT to them for a graceful shutdown, restarts children
+that exit with exponential backoff and logs their aggregated health.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+import structlog
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+# Connections shared by all worker processes
+DB_POOL_BUDGET = int(os.getenv("DB_POOL_BUDGET", 20))
+REDIS_POOL_BUDGET = int(os.getenv("REDIS_POOL_BUDGET", 100))
+
+SUPERVISOR_HEARTBEAT_SECONDS = float(os.getenv("SUPERVISOR_HEARTBEAT_SECONDS", 10))
+SUPERVISOR_BACKOFF_SECONDS = float(os.getenv("SUPERVISOR_BACKOFF_SECONDS", 1))
+SUPERVISOR_MAX_BACKOFF_SECONDS = float(os.getenv("SUPERVISOR_MAX_BACKOFF_SECONDS", 60))
+# A child that ran this long before exiting restarts without backoff
+SUPERVISOR_STABLE_SECONDS = float(os.getenv("SUPERVISOR_STABLE_SECONDS", 60))
+
+
+def pool_share(budget: int, processes: int) -> int:
+    """Per-process share of a connection budget (at least one)."""
+    return max(1, budget // max(1, processes))
+
+
+def send_heartbeat(health_queue, index: int, snapshot: dict):
+    """Report a child's liveness and counters to the supervisor."""
+    try:
+        health_queue.put_nowait(
+            {"index": index, "pid": os.getpid(), "at": time.time(), "metrics": snapshot}
+        )
+    except Exception as e:
+        logger.warning("heartbeat_failed", error=str(e))
+
+
+def restart_delay(failures: int) -> float:
+    """Backoff before the ``failures``-th consecutive restart of a child."""
+    if failures <= 0:
+        return 0.0
+    return min(
+        SUPERVISOR_BACKOFF_SECONDS * 2 ** (failures - 1),
+        SUPERVISOR_MAX_BACKOFF_SECONDS,
+    )
+
+
+class Supervisor:
+    """
+    Runs ``target(index, processes, health_queue)`` in ``processes`` child
+    processes until SIGTERM/SIGINT, then gives them ``grace_seconds`` to
+    exit before killing them.
+    """
+
+    def __init__(self, target: Callable, processes: int, grace_seconds: float):
+        self.target = target
+        self.processes = processes
+        self.grace_seconds = grace_seconds
+        # spawn: children start from a clean interpreter, with no inherited
+        # event loop, connection pools or boto3 client state
+        self.context = multiprocessing.get_context("spawn")
+        self.health_queue = self.context.Queue()
+        self.children: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.heartbeats: Dict[int, dict] = {}
+        self.restarts = 0
+        self.stopping = False
+
+    def start_child(self, index: int):
+        process = self.context.Process(
+            target=self.target,
+            args=(index, self.processes, self.health_queue),
+            name=f"atlas-worker-{index}",
+        )
+        process.start()
+        self.children[index] = process
+        self.started_at[index] = time.monotonic()
+        self.restart_at.pop(index, None)
+        logger.info("worker_process_started", index=index, pid=process.pid)
+
+    def stop(self, *_):
+        if not self.stopping:
+            logger.info("supervisor_shutdown_signal_received")
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.processes):
+            self.start_child(index)
+
+        next_report = time.monotonic() + SUPERVISOR_HEARTBEAT_SECONDS
+        while not self.stopping:
+            self._drain_heartbeats(timeout=0.5)
+            self._reap()
+            if time.monotonic() >= next_report:
+                logger.info("supervisor_health", **self.health())
+                next_report = time.monotonic() + SUPERVISOR_HEARTBEAT_SECONDS
+
+        self._shutdown()
+
+    def _drain_heartbeats(self, timeout: float):
+        try:
+            beat = self.health_queue.get(timeout=timeout)
+            while True:
+                self.heartbeats[beat["index"]] = beat
+                beat = self.health_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _reap(self):
+        now = time.monotonic()
+        for index, process in list(self.children.items()):
+            if process.is_alive():
+                continue
+            if index in self.restart_at:
+                if now >= self.restart_at[index]:
+                    self.restarts += 1
+                    self.start_child(index)
+                continue
+
+            uptime = now - self.started_at[index]
+            if uptime >= SUPERVISOR_STABLE_SECONDS:
+                self.failures[index] = 0
+            self.failures[index] = self.failures.get(index, 0) + 1
+            delay = restart_delay(self.failures[index])
+            self.restart_at[index] = now + delay
+            self.heartbeats.pop(index, None)
+            logger.warning(
+                "worker_process_exited",
+                index=index,
+                pid=process.pid,
+                exitcode=process.exitcode,
+                uptime_seconds=round(uptime, 1),
+                restart_in_seconds=delay,
+            )
+
+    def _shutdown(self):
+        for process in self.children.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM: the child drains and exits
+
+        deadline = time.monotonic() + self.grace_seconds + 5
+        for process in self.children.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+        for index, process in self.children.items():
+            if process.is_alive():
+                logger.warning("worker_process_killed", index=index, pid=process.pid)
+                process.kill()
+                process.join()
+        logger.info("supervisor_stopped", restarts=self.restarts)
+
+    def health(self) -> dict:
+        """Liveness of every child and the sum of their counters."""
+        now = time.time()
+        stale_after = SUPERVISOR_HEARTBEAT_SECONDS * 3
+        alive = [i for i, p in self.children.items() if p.is_alive()]
+        stale = [
+            index
+            for index in alive
+            if now - self.heartbeats.get(index, {}).get("at", 0) > stale_after
+            and time.monotonic() - self.started_at[index] > stale_after
+        ]
+        totals: Dict[str, int] = {}
+        for beat in self.heartbeats.values():
+            for name, value in beat["metrics"].items():
+                totals[name] = totals.get(name, 0) + value
+        return {
+            "processes": self.processes,
+            "alive": len(alive),
+            "stale": stale,
+            "restarts": self.restarts,
+            "metrics": totals,
+        }
+
+
+def supervise(target: Callable, processes: int, grace_seconds: Optional[float] = 30):
+    Supervisor(target, processes, grace_seconds).run()
@@ -0,0 +1,26 @@
+import json
+from typing import Optional
+
+from src.redis import redis_client
+
+CHECKPOINT_KEY_PREFIX = ":1:denorm:checkpoint"
+
+
+def checkpoint_key(name: str) -> str:
+    return f"{CHECKPOINT_KEY_PREFIX}:{name}"
+
+
+async def load_checkpoint(name: str) -> Optional[dict]:
+    """Return the persisted checkpoint for ``name``, or None if there is none."""
+    value = await redis_client.get(checkpoint_key(name))
+    return json.loads(value) if value else None
+
+
+async def save_checkpoint(name: str, state: dict):
+    """Persist a checkpoint (no TTL, it lives until cleared)."""
+    await redis_client.set(checkpoint_key(name), json.dumps(state))
+
+
+async def clear_checkpoint(name: str):
+    """Forget a checkpoint so the next run starts from scratch."""
+    await redis_client.delete(checkpoint_key(name))
@@ -0,0 +1,305 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import structlog
+from tortoise.transactions import in_transaction
+
+from src import canonical_json, metrics
+from src.db import RawJSON, upsert_rows
+from src.redis import redis_client
+from src.models.committee import CommitteeMembership
+from src.models.deputy import Deputy, DeputyDenorm
+from src.models.proposal import LegislativeInitiator
+from src.tasks.denorm_proposal import (
+    DENORM_UNCHANGED,
+    REDIS_TTL_SECONDS,
+    RESULT_ERROR,
+    RESULT_NOT_FOUND,
+    RESULT_OK,
+)
+
+logger = structlog.get_logger()
+
+# Initiated proposal ids per page of the deputy snapshot
+DEPUTY_PROPOSALS_PAGE_SIZE = int(os.getenv("DEPUTY_PROPOSALS_PAGE_SIZE", 50))
+DEPUTY_REBUILD_CHUNK_SIZE = int(os.getenv("DEPUTY_REBUILD_CHUNK_SIZE", 200))
+
+# Bucket of proposals without a status / year in the snapshot counts
+UNKNOWN = "unknown"
+
+
+@dataclass
+class DeputyResult:
+    """Outcome of serializing one deputy of a batch."""
+
+    deputy_id: int
+    status: str
+    payload: Optional[dict] = None
+    checksum: Optional[str] = None
+    error: Optional[str] = None
+    # Canonical JSON bytes of ``payload``
+    encoded: Optional[bytes] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == RESULT_OK
+
+
+def deputy_cache_key(deputy_id: int) -> str:
+    return f":1:deputy:{deputy_id}"
+
+
+def deputy_checksum_key(deputy_id: int) -> str:
+    return f":1:deputy:{deputy_id}:sha"
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def build_deputy_payload(
+    deputy: Deputy, memberships: List[dict], proposals: List[dict]
+) -> dict:
+    """
+    Assemble the deputy snapshot from the deputy, its committee membership
+    rows and the (deduplicated) proposals it initiated. Performs no queries.
+    """
+    ids = sorted((p["proposal_id"] for p in proposals), reverse=True)
+    by_status: Dict[str, int] = {}
+    by_year: Dict[str, int] = {}
+    for proposal in proposals:
+        status = proposal["status"] or UNKNOWN
+        year = str(proposal["year_issue"]) if proposal["year_issue"] else UNKNOWN
+        by_status[status] = by_status.get(status, 0) + 1
+        by_year[year] = by_year.get(year, 0) + 1
+
+    return {
+        "deputy_id": deputy.id,
+        "idm": deputy.idm,
+        "name": deputy.name,
+        "group": deputy.group,
+        "legislature": deputy.legislature,
+        "circumscription": deputy.circumscription,
+        "chamber": deputy.chamber,
+        "profile_link": deputy.profile_link,
+        "member_from": _iso(deputy.member_from),
+        "member_until": _iso(deputy.member_until),
+        "standing_bureau": deputy.standing_bureau,
+        "birthday": _iso(deputy.birthday),
+        "bio": deputy.bio,
+        "profile": deputy.profile,
+        "active": deputy.active,
+        "committees": [
+            {
+                "id": membership["committee_id"],
+                "committee_id": membership["committee__committeeId"],
+                "name": membership["committee__name"],
+                "chamber": membership["committee__chamber"],
+                "type": membership["committee__type"],
+                "legislature": membership["committee__legislature"],
+                "position": membership["position"],
+            }
+            for membership in sorted(
+                memberships, key=lambda m: (m["committee_id"], m["id"])
+            )
+        ],
+        "initiated_proposals": {
+            "total": len(ids),
+            "page_size": DEPUTY_PROPOSALS_PAGE_SIZE,
+            "pages": [
+                ids[start : start + DEPUTY_PROPOSALS_PAGE_SIZE]
+                for start in range(0, len(ids), DEPUTY_PROPOSALS_PAGE_SIZE)
+            ],
+            "by_status": by_status,
+            "by_year": by_year,
+        },
+    }
+
+
+async def serialize_deputies(ids: Iterable[int]) -> Dict[int, DeputyResult]:
+    """
+    Serialize several deputies with three set-based queries (deputies,
+    committee memberships joined to their committee, initiated proposals
+    joined through the initiator M2M), whatever the number of IDs.
+    Returns a DeputyResult per unique ID, in input order.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+
+    async with in_transaction():
+        deputies = await Deputy.filter(id__in=unique_ids)
+        memberships = await CommitteeMembership.filter(deputy_id__in=unique_ids).values(
+            "id",
+            "deputy_id",
+            "committee_id",
+            "position",
+            "committee__committeeId",
+            "committee__name",
+            "committee__chamber",
+            "committee__type",
+            "committee__legislature",
+        )
+        initiated = (
+            await LegislativeInitiator.filter(deputies__id__in=unique_ids)
+            .distinct()
+            .values(
+                deputy_id="deputies__id",
+                proposal_id="legislative_proposal_id",
+                status="legislative_proposal__status",
+                year_issue="legislative_proposal__year_issue",
+            )
+        )
+
+    memberships_by_deputy: Dict[int, List[dict]] = {}
+    for membership in memberships:
+        memberships_by_deputy.setdefault(membership["deputy_id"], []).append(membership)
+    # A deputy can sit on several initiator rows of the same proposal
+    proposals_by_deputy: Dict[int, Dict[int, dict]] = {}
+    for row in initiated:
+        proposals_by_deputy.setdefault(row["deputy_id"], {})[row["proposal_id"]] = row
+
+    deputies_by_id = {deputy.id: deputy for deputy in deputies}
+    results: Dict[int, DeputyResult] = {}
+    for deputy_id in unique_ids:
+        deputy = deputies_by_id.get(deputy_id)
+        if deputy is None:
+            results[deputy_id] = DeputyResult(deputy_id, RESULT_NOT_FOUND)
+            continue
+        try:
+            payload = build_deputy_payload(
+                deputy,
+                memberships_by_deputy.get(deputy_id, []),
+                list(proposals_by_deputy.get(deputy_id, {}).values()),
+            )
+            encoded = canonical_json.dumps(payload)
+            results[deputy_id] = DeputyResult(
+                deputy_id,
+                RESULT_OK,
+                payload,
+                canonical_json.checksum(encoded),
+                encoded=encoded,
+            )
+        except Exception as e:
+            logger.exception(
+                "deputy_serialization_failed", deputy_id=deputy_id, error=str(e)
+            )
+            results[deputy_id] = DeputyResult(deputy_id, RESULT_ERROR, error=str(e))
+    return results
+
+
+async def persist_deputies(
+    results: List[DeputyResult], force: bool = False
+) -> Dict[int, str]:
+    """
+    Persist successful DeputyResults in DeputyDenorm and cache them in Redis
+    under deputy:{id}, skipping payloads whose cached checksum is unchanged
+    (see persist_proposals()). Returns the DENORM_* outcome per ID.
+    """
+    outcomes: Dict[int, str] = {}
+    if force:
+        changed = list(results)
+    else:
+        refreshed = await redis_client.refresh_many_if_checksum(
+            [
+                (
+                    deputy_cache_key(result.deputy_id),
+                    deputy_checksum_key(result.deputy_id),
+                    result.checksum,
+                )
+                for result in results
+            ],
+            REDIS_TTL_SECONDS,
+        )
+        changed = []
+        for result, unchanged in zip(results, refreshed):
+            if unchanged:
+                outcomes[result.deputy_id] = DENORM_UNCHANGED
+            else:
+                changed.append(result)
+
+    db_outcomes = await upsert_rows(
+        DeputyDenorm,
+        "deputy_id",
+        [
+            {
+                "deputy_id": result.deputy_id,
+                "payload": RawJSON(result.encoded.decode()),
+                "checksum": result.checksum,
+            }
+            for result in changed
+        ],
+    )
+    for deputy_id, outcome in db_outcomes.items():
+        logger.info("deputy_denorm_saved", deputy_id=deputy_id, outcome=outcome)
+    outcomes.update(db_outcomes)
+
+    if changed:
+        await redis_client.set_many_with_checksum(
+            [
+                (
+                    deputy_cache_key(result.deputy_id),
+                    result.encoded,
+                    deputy_checksum_key(result.deputy_id),
+                    result.checksum,
+                )
+                for result in changed
+            ],
+            REDIS_TTL_SECONDS,
+        )
+
+    for outcome in outcomes.values():
+        metrics.deputy_denorm_outcomes.inc(label_value=outcome)
+    return outcomes
+
+
+async def refresh_deputies(
+    ids: Iterable[int], force: bool = False
+) -> Dict[int, DeputyResult]:
+    """
+    Serialize a batch of deputies and persist every one that built.
+    A failed write is recorded on the results of that write.
+    """
+    results = await serialize_deputies(ids)
+    ready = [result for result in results.values() if result.ok]
+    try:
+        await persist_deputies(ready, force=force)
+    except Exception as e:
+        logger.exception(
+            "deputy_persist_failed",
+            deputy_ids=[result.deputy_id for result in ready],
+            error=str(e),
+        )
+        for result in ready:
+            result.status = RESULT_ERROR
+            result.error = str(e)
+    return results
+
+
+async def rebuild_deputies(
+    chunk_size: int = DEPUTY_REBUILD_CHUNK_SIZE, force: bool = False
+) -> dict:
+    """
+    Rebuild the snapshot of every deputy, walking them by id in chunks of
+    ``chunk_size``: one id query, three serialize queries and one upsert
+    per chunk.
+    """
+    summary = {"processed": 0, "failed": 0}
+    cursor = 0
+    while True:
+        ids = (
+            await Deputy.filter(id__gt=cursor)
+            .order_by("id")
+            .limit(chunk_size)
+            .values_list("id", flat=True)
+        )
+        if not ids:
+            break
+        cursor = ids[-1]
+        results = await refresh_deputies(ids, force=force)
+        summary["processed"] += len(ids)
+        summary["failed"] += sum(1 for result in results.values() if not result.ok)
+        logger.info("deputy_rebuild_progress", last_id=cursor, **summary)
+    logger.info("deputy_rebuild_completed", **summary)
+    return summary
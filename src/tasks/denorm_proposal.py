@@ -1,213 +1,479 @@
-import json
-import hashlib
-from typing import Optional, List
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, List
 from tortoise.transactions import in_transaction
 
+from src import cache_codec, canonical_json, metrics, profiling
+from src.db import (
+    UPSERT_CREATED,
+    UPSERT_UNCHANGED,
+    UPSERT_UPDATED,
+    RawJSON,
+    update_column,
+    upsert_rows,
+)
 from src.redis import redis_client
 from src.models.proposal import LegislativeProposal, LegislativeProposalDenorm
 from src.schemas.proposal import SerializedProposal
+from src.tasks.payload_validation import validate_payload
+from src.tasks.proposal_sections import (
+    SECTION_BUILDERS,
+    SECTION_PREFETCH,
+    SECTIONS,
+    assemble_payload,
+    has_required_rows,
+    load_watermarks,
+    section_checksum,
+)
 import structlog
 
 logger = structlog.get_logger()
 
 REDIS_TTL_SECONDS = 60 * 60 * 24 * 30  # 30 days
+# "json" writes legacy plain JSON, "v1" the compact cache_codec encoding.
+# Switch to "v1" once every reader decodes through cache_codec.
+PROPOSAL_CACHE_FORMAT = os.getenv("PROPOSAL_CACHE_FORMAT", "json")
+# "python" builds payloads from ORM rows, "sql" inside the database
+# (see proposal_sql)
+SERIALIZER_BACKEND = os.getenv("SERIALIZER_BACKEND", "python")
+SERIALIZER_BACKENDS = ("python", "sql")
 
 
-async def save_proposal_to_db(proposal, proposal_data: dict, checksum: str):
+# Per-ID outcomes of serialize_proposals()
+RESULT_OK = "ok"
+RESULT_NOT_FOUND = "not_found"
+RESULT_MISSING_DATA = "missing_data"
+RESULT_ERROR = "error"
+
+# Outcomes of persisting a payload
+DENORM_CREATED = UPSERT_CREATED
+DENORM_UPDATED = UPSERT_UPDATED
+DENORM_UNCHANGED = UPSERT_UNCHANGED
+
+_DENORM_LOG_EVENTS = {
+    DENORM_CREATED: "created_denorm",
+    DENORM_UPDATED: "updated_denorm",
+    DENORM_UNCHANGED: "no_change_detected",
+}
+
+
+@dataclass
+class ProposalResult:
+    """Outcome of serializing one proposal of a batch."""
+
+    proposal_id: int
+    status: str
+    payload: Optional[dict] = None
+    checksum: Optional[str] = None
+    error: Optional[str] = None
+    # Per-section checksums and watermarks, stored in the denorm row
+    sections: Optional[dict] = None
+    rebuilt_sections: Optional[List[str]] = None
+    # Stored section metadata is outdated (known in incremental mode only)
+    sections_dirty: bool = False
+    # Canonical JSON bytes of ``payload``, encoded once and reused
+    encoded: Optional[bytes] = None
+    # SerializedProposal validation outcome, None when not checked
+    valid: Optional[bool] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == RESULT_OK
+
+    def encoded_payload(self) -> bytes:
+        if self.encoded is None:
+            self.encoded = canonical_json.dumps(self.payload)
+        return self.encoded
+
+
+def compute_checksum(proposal_data: dict) -> str:
+    """SHA-256 of the canonical JSON encoding of a payload."""
+    return canonical_json.checksum(canonical_json.dumps(proposal_data))
+
+
+def proposal_cache_key(proposal_id: int) -> str:
+    return f":1:proposal:{proposal_id}"
+
+
+def proposal_checksum_key(proposal_id: int) -> str:
+    return f":1:proposal:{proposal_id}:sha"
+
+
+async def save_proposals_to_db(results: List["ProposalResult"]) -> Dict[int, str]:
     """
-    Upsert the serialized proposal into LegislativeProposalDenorm.
-    Only updates if checksum differs.
+    Bulk upsert serialized proposals into LegislativeProposalDenorm with a
+    single INSERT ... ON CONFLICT statement per chunk of rows.
+    Rows whose checksum is unchanged are not rewritten; changed rows get
+    ``notified`` reset. Returns the DENORM_* outcome per proposal ID.
     """
-    denorm = await LegislativeProposalDenorm.filter(proposal=proposal).first()
+    outcomes = await upsert_rows(
+        LegislativeProposalDenorm,
+        "proposal_id",
+        [
+            {
+                "proposal_id": result.proposal_id,
+                "payload": RawJSON(result.encoded_payload().decode()),
+                "checksum": result.checksum,
+                "notified": False,
+                "sections": result.sections,
+            }
+            for result in results
+        ],
+    )
+    for proposal_id, outcome in outcomes.items():
+        logger.info(_DENORM_LOG_EVENTS[outcome], proposal_id=proposal_id)
+    return outcomes
 
-    if not denorm:
-        await LegislativeProposalDenorm.create(
-            proposal=proposal,
-            payload=proposal_data,
-            checksum=checksum,
-            notified=False,
-        )
-        logger.info("created_denorm", proposal_id=proposal.id)
 
-    elif denorm.checksum != checksum:
-        denorm.payload = proposal_data
-        denorm.checksum = checksum
-        denorm.notified = False
-        await denorm.save(update_fields=["payload", "checksum", "notified"])
-        logger.info("updated_denorm", proposal_id=proposal.id)
+async def save_proposal_to_db(
+    proposal_id: int, proposal_data: dict, checksum: str
+) -> str:
+    """
+    Upsert the serialized proposal into LegislativeProposalDenorm.
+    Only updates if checksum differs. Returns the DENORM_* outcome.
+    """
+    result = ProposalResult(proposal_id, RESULT_OK, proposal_data, checksum)
+    outcomes = await save_proposals_to_db([result])
+    return outcomes[proposal_id]
 
-    else:
-        logger.info("no_change_detected", proposal_id=proposal.id)
 
+def encode_cached_proposal(encoded: bytes) -> bytes:
+    """
+    Redis value of a canonically encoded payload in the configured
+    PROPOSAL_CACHE_FORMAT.
+    """
+    if PROPOSAL_CACHE_FORMAT == "v1":
+        return cache_codec.encode(encoded)
+    return encoded
 
-async def save_proposal_to_redis(proposal_id: int, proposal_data: dict):
+
+async def save_proposal_to_redis(proposal_id: int, proposal_data: dict, checksum: str):
     """
-    Cache the serialized proposal into Redis under key proposal:{id}
+    Cache the serialized proposal into Redis under key proposal:{id}, with
+    its checksum under proposal:{id}:sha
     """
-    key = f":1:proposal:{proposal_id}"
-    value = json.dumps(proposal_data)
-    await redis_client.set(key, value, ex=REDIS_TTL_SECONDS)
+    key = proposal_cache_key(proposal_id)
+    value = encode_cached_proposal(canonical_json.dumps(proposal_data))
+    await redis_client.set_with_checksum(
+        key, value, proposal_checksum_key(proposal_id), checksum, REDIS_TTL_SECONDS
+    )
     logger.info("cached_proposal_redis", key=key)
 
 
-async def serialized_proposal(
-    proposal_id: Optional[int] = None,
-) -> Optional[SerializedProposal]:
+async def save_proposals_to_redis(results: List["ProposalResult"]):
+    """Cache several serialized proposals and their checksums, pipelined."""
+    if not results:
+        return
+    await redis_client.set_many_with_checksum(
+        [
+            (
+                proposal_cache_key(result.proposal_id),
+                encode_cached_proposal(result.encoded_payload()),
+                proposal_checksum_key(result.proposal_id),
+                result.checksum,
+            )
+            for result in results
+        ],
+        REDIS_TTL_SECONDS,
+    )
+    for result in results:
+        logger.info("cached_proposal_redis", key=proposal_cache_key(result.proposal_id))
+
+
+PROPOSAL_PREFETCH = tuple(
+    relation for section in SECTIONS for relation in SECTION_PREFETCH[section]
+)
+
+
+def build_proposal_payload(proposal: LegislativeProposal) -> Optional[dict]:
     """
-    Serialize a LegislativeProposal into structured JSON and persist it into
-    LegislativeProposalDenorm.
-    Only updates the record if the checksum (SHA256) changes.
+    Assemble the SerializedProposal dict from an already prefetched proposal.
+    Performs no queries: relations must be loaded with PROPOSAL_PREFETCH.
+    Returns None when the proposal has no procedures or no consults.
     """
-    async with in_transaction():
-        if proposal_id:
-            proposal = (
-                await LegislativeProposal.filter(id=proposal_id)
-                .prefetch_related(
-                    "procedures__documents",
-                    "consults",
-                    "initiators__deputies",
-                    "overview__categories",
-                )
-                .first()
-            )
-            if not proposal:
-                raise Exception(f"No LegislativeProposal found with ID {proposal_id}.")
-            proposals = [proposal]
-        else:
-            proposals = (
-                await LegislativeProposal.filter(active=True)
-                .prefetch_related(
-                    "procedures__documents",
-                    "consults",
-                    "initiators__deputies",
-                    "overview__categories",
-                )
-                .order_by("-updated_at")
-            )
+    if not list(proposal.procedures) or not list(proposal.consults):
+        return None
+    sections = {name: SECTION_BUILDERS[name](proposal) for name in SECTIONS}
+    return assemble_payload(proposal, sections)
 
-        for proposal in proposals:
-            has_procedures = await proposal.procedures.all().count()
-            has_consults = await proposal.consults.all().count()
-            if not has_procedures or not has_consults:
-                logger.info("skip_proposal_missing_data", proposal_id=proposal.id)
-                continue
-
-            initiators: List[dict] = [
-                {
-                    "id": initiator.id,
-                    "name": initiator.name,
-                    "position": initiator.position,
-                    "party": initiator.party,
-                    "is_main": initiator.is_main,
-                    "photo_url": initiator.photo_url,
-                    "deputy_id": [
-                        deputy.id async for deputy in initiator.deputies.all()
-                    ],
-                }
-                async for initiator in proposal.initiators.all()
-            ]
-
-            consults: List[dict] = [
-                {
-                    "id": consult.id,
-                    "name": consult.name,
-                    "link": consult.link,
+
+def _sections_to_rebuild(
+    watermarks: Dict[str, list], stored: Optional[LegislativeProposalDenorm]
+) -> List[str]:
+    stored_sections = (stored.sections if stored else None) or {}
+    return [
+        name
+        for name in SECTIONS
+        if name not in stored_sections
+        or stored_sections[name].get("watermark") != watermarks[name]
+    ]
+
+
+def _build_result(
+    proposal: LegislativeProposal,
+    watermarks: Dict[str, list],
+    rebuild: List[str],
+    stored: Optional[LegislativeProposalDenorm],
+) -> ProposalResult:
+    """
+    Build the payload of one proposal, re-encoding only the sections in
+    ``rebuild`` and splicing the others in from the stored denorm row.
+    """
+    sections = {}
+    meta = {}
+    changed = False
+    with profiling.stage("build"):
+        for name in SECTIONS:
+            if name in rebuild:
+                value = SECTION_BUILDERS[name](proposal)
+                checksum = section_checksum(value)
+                previous = (stored.sections or {}).get(name) if stored else None
+                changed = changed or not previous or previous["checksum"] != checksum
+            else:
+                value = stored.payload[name]
+                checksum = stored.sections[name]["checksum"]
+            sections[name] = value
+            meta[name] = {"checksum": checksum, "watermark": watermarks[name]}
+
+    if stored is not None and not changed:
+        # Watermarks moved but no section content did: the stored payload
+        # is still current, skip encoding it again.
+        payload, checksum = stored.payload, stored.checksum
+        encoded = valid = None
+    else:
+        with profiling.stage("encode"):
+            payload = assemble_payload(proposal, sections)
+            encoded = canonical_json.dumps(payload)
+            checksum = canonical_json.checksum(encoded)
+        with profiling.stage("validate"):
+            valid = validate_payload(proposal.id, encoded)
+
+    return ProposalResult(
+        proposal.id,
+        RESULT_OK,
+        payload=payload,
+        checksum=checksum,
+        sections=meta,
+        rebuilt_sections=rebuild,
+        sections_dirty=stored is not None and stored.sections != meta,
+        encoded=encoded,
+        valid=valid,
+    )
+
+
+async def serialize_proposals(
+    ids: Iterable[int], incremental: bool = False, backend: Optional[str] = None
+) -> Dict[int, ProposalResult]:
+    """
+    Serialize several proposals with one set of ``IN (...)`` queries.
+
+    The query count is the same for one or hundreds of IDs. Returns a
+    ProposalResult per unique ID (in input order); a proposal that fails to
+    build is reported on its own result instead of failing the batch.
+    Nothing is persisted, see persist_proposal().
+
+    With ``incremental``, only the sections whose source rows changed since
+    the stored denorm row (per their watermarks) are queried and rebuilt;
+    the others are spliced in from the stored payload. The result is the
+    same payload a full build produces.
+
+    ``backend`` (default SERIALIZER_BACKEND) "sql" has the database
+    assemble the payloads instead; it always does a full build.
+    """
+    backend = backend or SERIALIZER_BACKEND
+    if backend == "sql":
+        from src.tasks.proposal_sql import serialize_proposals_sql
+
+        return await serialize_proposals_sql(ids)
+    if backend != "python":
+        raise ValueError(f"Unknown serializer backend: {backend}")
+
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+
+    async with in_transaction():
+        with profiling.stage("watermarks"):
+            watermarks = await load_watermarks(unique_ids)
+            stored: Dict[int, LegislativeProposalDenorm] = {}
+            if incremental:
+                stored = {
+                    denorm.proposal_id: denorm
+                    for denorm in await LegislativeProposalDenorm.filter(
+                        proposal_id__in=list(watermarks)
+                    )
                 }
-                async for consult in proposal.consults.all()
-            ]
-
-            procedures: List[dict] = []
-            async for procedure in proposal.procedures.all().order_by("-date"):
-                documents = [
-                    {
-                        "id": doc.id,
-                        "name": doc.name,
-                        "url": doc.link,
-                    }
-                    async for doc in procedure.documents.all()
-                ]
-                procedures.append(
-                    {
-                        "id": procedure.id,
-                        "date": procedure.date.isoformat() if procedure.date else None,
-                        "action": procedure.action,
-                        "short_action": procedure.short_action,
-                        "chamber": procedure.chamber,
-                        "termen": (
-                            procedure.termen.isoformat() if procedure.termen else None
-                        ),
-                        "attachment": documents,
-                    }
+
+        plans: Dict[int, List[str]] = {}
+        for proposal_id, proposal_watermarks in watermarks.items():
+            if has_required_rows(proposal_watermarks):
+                plans[proposal_id] = _sections_to_rebuild(
+                    proposal_watermarks, stored.get(proposal_id)
                 )
 
-            latest_overview = (
-                await proposal.overview.all().order_by("-created_at").first()
+        with profiling.stage("prefetch"):
+            proposals = await LegislativeProposal.filter(id__in=list(plans))
+            for section in SECTIONS:
+                needed = [p for p in proposals if section in plans[p.id]]
+                if needed and SECTION_PREFETCH[section]:
+                    await LegislativeProposal.fetch_for_list(
+                        needed, *SECTION_PREFETCH[section]
+                    )
+    proposals_by_id = {proposal.id: proposal for proposal in proposals}
+
+    results: Dict[int, ProposalResult] = {}
+    for proposal_id in unique_ids:
+        if proposal_id not in watermarks:
+            results[proposal_id] = ProposalResult(proposal_id, RESULT_NOT_FOUND)
+            continue
+        if proposal_id not in plans:
+            results[proposal_id] = ProposalResult(proposal_id, RESULT_MISSING_DATA)
+            continue
+
+        try:
+            results[proposal_id] = _build_result(
+                proposals_by_id[proposal_id],
+                watermarks[proposal_id],
+                plans[proposal_id],
+                stored.get(proposal_id),
             )
-            overview: dict = (
-                {
-                    "id": latest_overview.id,
-                    "summary": latest_overview.summary,
-                    "categories": [
-                        cat.category_name
-                        async for cat in latest_overview.categories.all()
-                    ],
-                }
-                if latest_overview
-                else {"id": 0, "summary": "", "categories": []}
+        except Exception as e:
+            logger.exception(
+                "proposal_serialization_failed", proposal_id=proposal_id, error=str(e)
             )
+            results[proposal_id] = ProposalResult(
+                proposal_id, RESULT_ERROR, error=str(e)
+            )
+
+    return results
 
-            oldest_procedure = await proposal.procedures.all().order_by("date").first()
-            latest_procedure = await proposal.procedures.all().order_by("-date").first()
 
-            created_at = (
-                oldest_procedure.date.isoformat()
-                if oldest_procedure
-                else proposal.created_at.isoformat()
+async def persist_proposals(
+    results: List[ProposalResult], force: bool = False
+) -> Dict[int, str]:
+    """
+    Persist successful ProposalResults in the DB and cache them in Redis.
+
+    Cached checksums are compared in one pipelined round trip; unchanged
+    payloads only get their cache TTL refreshed and are not rewritten in
+    Redis or the DB. Changed payloads are written with one bulk DB upsert
+    and one Redis pipeline.
+    ``force`` skips the cache check. Returns the DENORM_* outcome per ID.
+    """
+    outcomes: Dict[int, str] = {}
+    if force:
+        changed = list(results)
+    else:
+        with profiling.stage("cache_check"):
+            refreshed = await redis_client.refresh_many_if_checksum(
+                [
+                    (
+                        proposal_cache_key(result.proposal_id),
+                        proposal_checksum_key(result.proposal_id),
+                        result.checksum,
+                    )
+                    for result in results
+                ],
+                REDIS_TTL_SECONDS,
             )
-            latest_action_date = (
-                latest_procedure.date.isoformat() if latest_procedure else None
+        changed = []
+        for result, unchanged in zip(results, refreshed):
+            if unchanged:
+                logger.info("no_change_detected", proposal_id=result.proposal_id)
+                outcomes[result.proposal_id] = DENORM_UNCHANGED
+            else:
+                changed.append(result)
+
+    with profiling.stage("db_upsert"):
+        outcomes.update(await save_proposals_to_db(changed))
+    with profiling.stage("redis_write"):
+        await save_proposals_to_redis(changed)
+
+    # Unchanged payloads whose section watermarks moved (e.g. a touched row)
+    # still need the new watermarks, or the sections are rebuilt every time.
+    stale_sections = {
+        result.proposal_id: result.sections
+        for result in results
+        if result.sections_dirty and outcomes[result.proposal_id] == DENORM_UNCHANGED
+    }
+    if stale_sections:
+        with profiling.stage("db_upsert"):
+            await update_column(
+                LegislativeProposalDenorm, "proposal_id", "sections", stale_sections
             )
 
-            proposal_data: dict = {
-                "proposal_id": proposal.id,
-                "created_at": created_at,
-                "updated_at": latest_action_date,
-                "proposal": {
-                    "title": proposal.title,
-                    "idp": proposal.idp,
-                    "senate_registration_number": proposal.senate_registration_number,
-                    "first_senate_registration_number": proposal.first_senate_registration_number,
-                    "cdep_registration_number": proposal.cdep_registration_number,
-                    "government_registration_number": proposal.government_registration_number,
-                    "first_chamber": proposal.first_chamber,
-                    "initiative": proposal.initiative,
-                    "opinion": proposal.opinion,
-                    "urgent_procedure": proposal.urgent_procedure,
-                    "status": proposal.status,
-                    "status_cdep": proposal.status_cdep,
-                    "status_senate": proposal.status_senate,
-                    "law_character": proposal.law_character,
-                    "deadline": proposal.deadline,
-                    "year_issue": proposal.year_issue,
-                    "active": proposal.active,
-                    "published": proposal.published,
-                    "senate_active": proposal.senate_active,
-                    "cdep_active": proposal.cdep_active,
-                    "promulgare": proposal.promulgare,
-                    "matching_title": proposal.matching_title,
-                },
-                "initiators": initiators,
-                "consults": consults,
-                "overview": overview,
-                "procedures": procedures,
-            }
+    for outcome in outcomes.values():
+        metrics.denorm_outcomes.inc(label_value=outcome)
+    return outcomes
+
+
+async def persist_proposal(result: ProposalResult, force: bool = False) -> str:
+    """Persist a single ProposalResult, see persist_proposals()."""
+    outcomes = await persist_proposals([result], force=force)
+    return outcomes[result.proposal_id]
+
+
+async def refresh_proposals(
+    ids: Iterable[int], force: bool = False, incremental: Optional[bool] = None
+) -> Dict[int, ProposalResult]:
+    """
+    Serialize a batch of proposals and persist every one that built.
+    Only changed sections are rebuilt when ``incremental`` (by default
+    unless ``force``); ``force`` also rewrites unchanged payloads. A failed
+    write is recorded on the results of that write only.
+    """
+    if incremental is None:
+        incremental = not force
+    results = await serialize_proposals(ids, incremental=incremental)
+    ready = []
+    for result in results.values():
+        if result.status == RESULT_MISSING_DATA:
+            logger.info("skip_proposal_missing_data", proposal_id=result.proposal_id)
+        if result.ok:
+            ready.append(result)
+
+    try:
+        await persist_proposals(ready, force=force)
+    except Exception as e:
+        logger.exception(
+            "proposal_persist_failed",
+            proposal_ids=[result.proposal_id for result in ready],
+            error=str(e),
+        )
+        for result in ready:
+            result.status = RESULT_ERROR
+            result.error = str(e)
+    return results
+
+
+async def serialized_proposal(
+    proposal_id: Optional[int] = None,
+) -> Optional[SerializedProposal]:
+    """
+    Serialize a LegislativeProposal into structured JSON and persist it into
+    LegislativeProposalDenorm.
+    Only updates the record if the checksum (SHA256) changes.
+
+    The payload is built from a fixed set of prefetch queries (one per
+    relation), so the query count does not grow with the proposal size.
+    Called without an ID, it runs a full rebuild (see rebuild_proposals).
+    """
+    if proposal_id:
+        result = (await serialize_proposals([proposal_id]))[proposal_id]
+        if result.status == RESULT_NOT_FOUND:
+            raise Exception(f"No LegislativeProposal found with ID {proposal_id}.")
+        if result.status == RESULT_ERROR:
+            raise Exception(result.error)
+        if result.status == RESULT_MISSING_DATA:
+            logger.info("skip_proposal_missing_data", proposal_id=proposal_id)
+            return None
 
-            # Compute checksum
-            payload_json = json.dumps(proposal_data, sort_keys=True)
-            checksum = hashlib.sha256(payload_json.encode()).hexdigest()
+        await persist_proposal(result)
+        return result.payload
 
-            # Persist in DB and cache in Redis
-            await save_proposal_to_db(proposal, proposal_data, checksum)
-            await save_proposal_to_redis(proposal.id, proposal_data)
+    # Without an ID, rebuild every active proposal through the chunked,
+    # resumable backfill engine.
+    from src.tasks.rebuild_proposals import rebuild_proposals
 
-            return proposal_data
+    await rebuild_proposals()
+    return None
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List
+
+import structlog
+
+from src.models.proposal import LegislativeSummary
+from src.tasks.denorm_proposal import (
+    DENORM_UNCHANGED,
+    RESULT_MISSING_DATA,
+    ProposalResult,
+    persist_proposals,
+    serialize_proposals,
+)
+from src.tasks.proposal_lease import run_exclusive
+
+logger = structlog.get_logger()
+
+INVALIDATION_BATCH_SIZE = int(os.getenv("INVALIDATION_BATCH_SIZE", 100))
+INVALIDATION_PAUSE_SECONDS = float(os.getenv("INVALIDATION_PAUSE_MS", 100)) / 1000
+
+# Entity -> (model holding the link, lookup on the changed ids, proposal id field).
+# Only entities whose own columns are copied into the payload belong here:
+# categories are embedded by name. Initiators only carry deputy ids, which
+# the section watermarks already cover, and committees are not embedded.
+DEPENDENCIES = {
+    "category": (
+        LegislativeSummary,
+        "categories__id__in",
+        "legislative_proposal_id",
+    ),
+}
+
+
+async def affected_proposal_ids(entity: str, ids: Iterable[int]) -> List[int]:
+    """
+    Return the ids of the proposals whose payload embeds one of the given
+    DEPENDENCIES rows, resolved with a single join query.
+    """
+    if entity not in DEPENDENCIES:
+        raise ValueError(f"Unknown dependency entity: {entity}")
+    ids = list(ids)
+    if not ids:
+        return []
+    model, lookup, proposal_field = DEPENDENCIES[entity]
+    proposal_ids = (
+        await model.filter(**{lookup: ids})
+        .distinct()
+        .values_list(proposal_field, flat=True)
+    )
+    return sorted(set(proposal_ids))
+
+
+async def invalidate_dependents(
+    entity: str,
+    ids: Iterable[int],
+    batch_size: int = INVALIDATION_BATCH_SIZE,
+    pause: float = INVALIDATION_PAUSE_SECONDS,
+) -> dict:
+    """
+    Rebuild every proposal that depends on the changed ``entity`` rows.
+
+    Affected proposals are fully re-serialized (section watermarks do not
+    move when a category is renamed) in batches of ``batch_size``, sleeping
+    ``pause`` seconds between batches so a large invalidation does not
+    starve the SQS worker of connections. Payloads whose checksum did not
+    change are not rewritten. Proposals are written under their leases
+    (see run_exclusive()), waiting for a replica that holds one, since its
+    incremental re-run would not pick up the change. Returns a report of
+    the run.
+    """
+    started = time.monotonic()
+    ids = list(ids)
+    proposal_ids = await affected_proposal_ids(entity, ids)
+
+    report = {
+        "entity": entity,
+        "ids": ids,
+        "proposals": len(proposal_ids),
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+    outcomes: Dict[int, str] = {}
+
+    async def rebuild(batch: List[int]) -> Dict[int, ProposalResult]:
+        results = await serialize_proposals(batch)
+        ready = [result for result in results.values() if result.ok]
+        outcomes.update(await persist_proposals(ready))
+        return results
+
+    for start in range(0, len(proposal_ids), batch_size):
+        if start:
+            await asyncio.sleep(pause)
+        batch = proposal_ids[start : start + batch_size]
+        results = await run_exclusive(batch, rebuild, wait=True)
+        for result in results.values():
+            if result.status == RESULT_MISSING_DATA:
+                report["skipped"] += 1
+            elif not result.ok:
+                report["failed"] += 1
+            elif outcomes.get(result.proposal_id) == DENORM_UNCHANGED:
+                report["unchanged"] += 1
+            else:
+                report["updated"] += 1
+
+    report["duration_seconds"] = round(time.monotonic() - started, 3)
+    logger.info("invalidation_completed", **report)
+    return report
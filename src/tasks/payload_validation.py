@@ -0,0 +1,77 @@
+"""
+Optional validation of proposal payloads against SerializedProposal.
+
+Payloads are built as plain dicts and encoded by canonical_json; this
+module checks the encoded bytes with a precompiled pydantic TypeAdapter
+(parsed and validated in pydantic-core, no intermediate dicts). Failures are
+counted and logged, never raised, so one malformed row does not fail its
+batch. The canonical bytes stay what is stored: dumping the validated model
+would normalise URLs and reorder keys, changing every checksum.
+
+    PAYLOAD_VALIDATION=off|sampled|full
+    PAYLOAD_VALIDATION_SAMPLE_RATE=0.05   (share validated in sampled mode)
+"""
+
+import os
+import random
+from typing import Optional
+
+import structlog
+from dotenv import load_dotenv
+from pydantic import TypeAdapter, ValidationError
+
+from src import metrics
+from src.schemas.proposal import SerializedProposal
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+VALIDATION_OFF = "off"
+VALIDATION_SAMPLED = "sampled"
+VALIDATION_FULL = "full"
+
+PAYLOAD_VALIDATION = os.getenv("PAYLOAD_VALIDATION", VALIDATION_OFF)
+PAYLOAD_VALIDATION_SAMPLE_RATE = float(
+    os.getenv("PAYLOAD_VALIDATION_SAMPLE_RATE", 0.05)
+)
+
+SERIALIZED_PROPOSAL = TypeAdapter(SerializedProposal)
+
+
+def should_validate(
+    mode: str = PAYLOAD_VALIDATION, rate: float = PAYLOAD_VALIDATION_SAMPLE_RATE
+) -> bool:
+    if mode == VALIDATION_FULL:
+        return True
+    if mode == VALIDATION_SAMPLED:
+        return random.random() < rate
+    return False
+
+
+def validate_payload(
+    proposal_id: int, encoded: bytes, mode: Optional[str] = None
+) -> Optional[bool]:
+    """
+    Validate the canonical JSON of a payload when ``mode`` (default
+    PAYLOAD_VALIDATION) selects it. Returns None if it was not checked,
+    else whether it is valid.
+    """
+    if not should_validate(mode or PAYLOAD_VALIDATION):
+        return None
+    try:
+        SERIALIZED_PROPOSAL.validate_json(encoded)
+    except ValidationError as e:
+        metrics.payload_validations.inc(label_value="invalid")
+        logger.warning(
+            "proposal_payload_invalid",
+            proposal_id=proposal_id,
+            error_count=e.error_count(),
+            errors=[
+                {"loc": ".".join(map(str, error["loc"])), "type": error["type"]}
+                for error in e.errors()[:5]
+            ],
+        )
+        return False
+    metrics.payload_validations.inc(label_value="valid")
+    return True
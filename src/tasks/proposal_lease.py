@@ -0,0 +1,122 @@
+import asyncio
+import os
+import uuid
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from src.redis import redis_client
+from src.tasks.denorm_proposal import ProposalResult, refresh_proposals
+
+logger = structlog.get_logger()
+
+# A crashed holder's leases expire after this long; a live holder renews
+# its leases every third of it for as long as its batch runs.
+PROPOSAL_LEASE_TTL_MS = int(os.getenv("PROPOSAL_LEASE_TTL_MS", 60_000))
+# How often run_exclusive(wait=True) retries leases held by someone else
+PROPOSAL_LEASE_RETRY_SECONDS = float(os.getenv("PROPOSAL_LEASE_RETRY_SECONDS", 1))
+
+# Status of a proposal left to the replica holding its lease
+RESULT_DEFERRED = "deferred"
+
+Work = Callable[[List[int]], Awaitable[Dict[int, ProposalResult]]]
+
+
+def proposal_lease_key(proposal_id: int) -> str:
+    return f":1:proposal:{proposal_id}:lease"
+
+
+def proposal_rerun_key(proposal_id: int) -> str:
+    return f":1:proposal:{proposal_id}:rerun"
+
+
+def _lease_keys(ids: Iterable[int]) -> List[Tuple[str, str]]:
+    return [
+        (proposal_lease_key(proposal_id), proposal_rerun_key(proposal_id))
+        for proposal_id in ids
+    ]
+
+
+async def _renew_leases(ids: List[int], token: str, ttl_ms: int):
+    """Keep the leases of ``ids`` alive until cancelled."""
+    keys = _lease_keys(ids)
+    while True:
+        await asyncio.sleep(ttl_ms / 3000)
+        try:
+            renewed = await redis_client.renew_leases(keys, token, ttl_ms)
+        except Exception as e:
+            logger.warning("proposal_lease_renew_failed", error=str(e))
+            continue
+        lost = [pid for pid, ok in zip(ids, renewed) if not ok]
+        if lost:
+            logger.warning("proposal_lease_lost", proposal_ids=lost)
+
+
+async def run_exclusive(
+    ids: Iterable[int],
+    work: Work,
+    ttl_ms: int = PROPOSAL_LEASE_TTL_MS,
+    wait: bool = False,
+) -> Dict[int, ProposalResult]:
+    """
+    Run ``work`` on the proposals of ``ids`` under a per-proposal Redis
+    lease, so replicas never write the same proposal at the same time.
+    Leases are renewed while ``work`` runs.
+
+    Proposals leased by another replica are flagged for a re-run and
+    reported as RESULT_DEFERRED. When a holder releases a lease that was
+    flagged meanwhile, it runs its ``work`` on that proposal once more, so
+    the last write always reflects the latest change.
+
+    With ``wait``, proposals leased by another replica are not flagged but
+    retried every PROPOSAL_LEASE_RETRY_SECONDS until this call has run
+    ``work`` on them itself, for work the holder's re-run would not cover.
+    """
+    token = uuid.uuid4().hex
+    results: Dict[int, ProposalResult] = {}
+    pending = list(dict.fromkeys(ids))
+    while pending:
+        acquired_flags = await redis_client.acquire_leases(
+            _lease_keys(pending), token, ttl_ms, flag_rerun=not wait
+        )
+        acquired = [pid for pid, ok in zip(pending, acquired_flags) if ok]
+        held = [pid for pid, ok in zip(pending, acquired_flags) if not ok]
+        if not wait:
+            for proposal_id in held:
+                results.setdefault(
+                    proposal_id, ProposalResult(proposal_id, RESULT_DEFERRED)
+                )
+        if not acquired:
+            if not wait:
+                break
+            await asyncio.sleep(PROPOSAL_LEASE_RETRY_SECONDS)
+            continue
+
+        renewer = asyncio.create_task(_renew_leases(acquired, token, ttl_ms))
+        try:
+            results.update(await work(acquired))
+        finally:
+            renewer.cancel()
+            released = await redis_client.release_leases(_lease_keys(acquired), token)
+
+        for proposal_id, code in zip(acquired, released):
+            if code == 0:
+                logger.warning("proposal_lease_expired", proposal_id=proposal_id)
+        pending = [pid for pid, code in zip(acquired, released) if code == 2]
+        if pending:
+            logger.info("proposal_rerun", proposal_ids=pending)
+        if wait:
+            pending += held
+    return results
+
+
+async def refresh_proposals_exclusive(
+    ids: Iterable[int],
+    force: bool = False,
+    ttl_ms: int = PROPOSAL_LEASE_TTL_MS,
+    incremental: Optional[bool] = None,
+) -> Dict[int, ProposalResult]:
+    """refresh_proposals() under per-proposal leases, see run_exclusive()."""
+    work = partial(refresh_proposals, force=force, incremental=incremental)
+    return await run_exclusive(ids, work, ttl_ms)
@@ -0,0 +1,306 @@
+"""
+Section-level building blocks of the proposal payload.
+
+A payload is made of five sections, each built from its own source rows:
+
+    proposal    LegislativeProposal
+    initiators  LegislativeInitiator + initiator deputies (M2M)
+    consults    LegislativeConsult
+    overview    LegislativeSummary + summary categories (M2M)
+    procedures  LegislativeProcedure + ProcedureDocument
+
+The watermark of a section (row counts, latest ``updated_at`` and a
+fingerprint of the M2M links) changes whenever its source rows are added,
+edited or removed, which tells an incremental refresh which sections to
+rebuild. The link fingerprint is the count of links, the sum of their
+target ids and the sum of owner id * target id, so a link that moves to
+another initiator or summary, or two owners swapping their links, moves
+it as well. Bulk ``QuerySet.update()`` writes do not move a watermark,
+so only change capture refreshes incrementally; proposals named in SQS
+messages are always rebuilt in full. Category renames are picked up by
+src/tasks/invalidate_dependents.py.
+"""
+
+from typing import Dict, List, Optional
+
+from src import canonical_json
+from src.db import placeholders
+from src.models.proposal import (
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    ProcedureDocument,
+)
+
+SECTIONS = ("proposal", "initiators", "consults", "overview", "procedures")
+
+# Relations a section needs prefetched on the proposal
+SECTION_PREFETCH = {
+    "proposal": (),
+    "initiators": ("initiators__deputies",),
+    "consults": ("consults",),
+    "overview": ("overview__categories",),
+    "procedures": ("procedures__documents",),
+}
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _procedure_sort_key(procedure):
+    # Newest first with undated procedures on top, matching Postgres'
+    # ``ORDER BY date DESC`` (NULLS FIRST); id keeps ties deterministic.
+    if procedure.date is None:
+        return (0, 0, procedure.id)
+    return (1, -procedure.date.toordinal(), procedure.id)
+
+
+def proposal_section(proposal: LegislativeProposal) -> dict:
+    return {
+        "title": proposal.title,
+        "idp": proposal.idp,
+        "senate_registration_number": proposal.senate_registration_number,
+        "first_senate_registration_number": proposal.first_senate_registration_number,
+        "cdep_registration_number": proposal.cdep_registration_number,
+        "government_registration_number": proposal.government_registration_number,
+        "first_chamber": proposal.first_chamber,
+        "initiative": proposal.initiative,
+        "opinion": proposal.opinion,
+        "urgent_procedure": proposal.urgent_procedure,
+        "status": proposal.status,
+        "status_cdep": proposal.status_cdep,
+        "status_senate": proposal.status_senate,
+        "law_character": proposal.law_character,
+        "deadline": proposal.deadline,
+        "year_issue": proposal.year_issue,
+        "active": proposal.active,
+        "published": proposal.published,
+        "senate_active": proposal.senate_active,
+        "cdep_active": proposal.cdep_active,
+        "promulgare": proposal.promulgare,
+        "matching_title": proposal.matching_title,
+    }
+
+
+def initiators_section(proposal: LegislativeProposal) -> List[dict]:
+    return [
+        {
+            "id": initiator.id,
+            "name": initiator.name,
+            "position": initiator.position,
+            "party": initiator.party,
+            "is_main": initiator.is_main,
+            "photo_url": initiator.photo_url,
+            "deputy_id": sorted(deputy.id for deputy in initiator.deputies),
+        }
+        for initiator in sorted(proposal.initiators, key=lambda i: i.id)
+    ]
+
+
+def consults_section(proposal: LegislativeProposal) -> List[dict]:
+    return [
+        {
+            "id": consult.id,
+            "name": consult.name,
+            "link": consult.link,
+        }
+        for consult in sorted(proposal.consults, key=lambda c: c.id)
+    ]
+
+
+def overview_section(proposal: LegislativeProposal) -> dict:
+    latest_overview = max(
+        proposal.overview, key=lambda o: (o.created_at, o.id), default=None
+    )
+    if not latest_overview:
+        return {"id": 0, "summary": "", "categories": []}
+    return {
+        "id": latest_overview.id,
+        "summary": latest_overview.summary,
+        "categories": [
+            cat.category_name
+            for cat in sorted(latest_overview.categories, key=lambda c: c.id)
+        ],
+    }
+
+
+def procedures_section(proposal: LegislativeProposal) -> List[dict]:
+    return [
+        {
+            "id": procedure.id,
+            "date": _iso(procedure.date),
+            "action": procedure.action,
+            "short_action": procedure.short_action,
+            "chamber": procedure.chamber,
+            "termen": _iso(procedure.termen),
+            "attachment": [
+                {
+                    "id": doc.id,
+                    "name": doc.name,
+                    "url": doc.link,
+                }
+                for doc in sorted(procedure.documents, key=lambda d: d.id)
+            ],
+        }
+        for procedure in sorted(proposal.procedures, key=_procedure_sort_key)
+    ]
+
+
+SECTION_BUILDERS = {
+    "proposal": proposal_section,
+    "initiators": initiators_section,
+    "consults": consults_section,
+    "overview": overview_section,
+    "procedures": procedures_section,
+}
+
+
+def section_checksum(value) -> str:
+    """SHA-256 of the canonical JSON encoding of one section."""
+    return canonical_json.checksum(canonical_json.dumps(value))
+
+
+def assemble_payload(proposal: LegislativeProposal, sections: Dict) -> dict:
+    """
+    Build the SerializedProposal dict from its sections. The top-level dates
+    are the oldest and latest procedure dates (ISO strings sort by date),
+    falling back to the proposal creation time.
+    """
+    procedure_dates = [p["date"] for p in sections["procedures"] if p["date"]]
+    return {
+        "proposal_id": proposal.id,
+        "created_at": (
+            min(procedure_dates) if procedure_dates else proposal.created_at.isoformat()
+        ),
+        "updated_at": max(procedure_dates, default=None),
+        "proposal": sections["proposal"],
+        "initiators": sections["initiators"],
+        "consults": sections["consults"],
+        "overview": sections["overview"],
+        "procedures": sections["procedures"],
+    }
+
+
+# ------------------------
+# Watermarks
+# ------------------------
+
+# Watermark columns of each section, in the order they are stored
+_WATERMARK_COLUMNS = {
+    "proposal": ("proposal_updated_at",),
+    "initiators": (
+        "initiators_count",
+        "initiators_updated_at",
+        "initiator_deputies_count",
+        "initiator_deputies_sum",
+        "initiator_deputies_pairs",
+    ),
+    "consults": ("consults_count", "consults_updated_at"),
+    "overview": (
+        "summaries_count",
+        "summaries_updated_at",
+        "summary_categories_count",
+        "summary_categories_sum",
+        "summary_categories_pairs",
+    ),
+    "procedures": (
+        "procedures_count",
+        "procedures_updated_at",
+        "documents_count",
+        "documents_updated_at",
+    ),
+}
+
+
+def _through(model, field: str):
+    relation = model._meta.fields_map[field]
+    return relation.through, relation.backward_key, relation.forward_key
+
+
+def _watermark_sql(db, count: int) -> str:
+    proposals = LegislativeProposal._meta.db_table
+    procedures = LegislativeProcedure._meta.db_table
+    documents = ProcedureDocument._meta.db_table
+    initiators = LegislativeInitiator._meta.db_table
+    consults = LegislativeConsult._meta.db_table
+    summaries = LegislativeSummary._meta.db_table
+    deputies, deputies_initiator, deputies_deputy = _through(
+        LegislativeInitiator, "deputies"
+    )
+    categories, categories_summary, categories_category = _through(
+        LegislativeSummary, "categories"
+    )
+
+    def rows(table: str, expression: str) -> str:
+        return (
+            f'(SELECT {expression} FROM "{table}" x '
+            f'WHERE x."legislative_proposal_id" = p."id")'
+        )
+
+    def linked(table: str, owner: str, owner_key: str, expression: str) -> str:
+        return (
+            f'(SELECT {expression} FROM "{table}" l JOIN "{owner}" x '
+            f'ON l."{owner_key}" = x."id" WHERE x."legislative_proposal_id" = p."id")'
+        )
+
+    def pairs(owner_key: str, target_key: str) -> str:
+        # BIGINT: the product of two int4 ids overflows on Postgres
+        return f'SUM(CAST(l."{owner_key}" AS BIGINT) * l."{target_key}")'
+
+    return f"""
+        SELECT p."id" AS "proposal_id",
+            p."updated_at" AS "proposal_updated_at",
+            {rows(initiators, "COUNT(*)")} AS "initiators_count",
+            {rows(initiators, 'MAX(x."updated_at")')} AS "initiators_updated_at",
+            {linked(deputies, initiators, deputies_initiator, "COUNT(*)")}
+                AS "initiator_deputies_count",
+            {linked(deputies, initiators, deputies_initiator, f'SUM(l."{deputies_deputy}")')}
+                AS "initiator_deputies_sum",
+            {linked(deputies, initiators, deputies_initiator, pairs(deputies_initiator, deputies_deputy))}
+                AS "initiator_deputies_pairs",
+            {rows(consults, "COUNT(*)")} AS "consults_count",
+            {rows(consults, 'MAX(x."updated_at")')} AS "consults_updated_at",
+            {rows(summaries, "COUNT(*)")} AS "summaries_count",
+            {rows(summaries, 'MAX(x."updated_at")')} AS "summaries_updated_at",
+            {linked(categories, summaries, categories_summary, "COUNT(*)")}
+                AS "summary_categories_count",
+            {linked(categories, summaries, categories_summary, f'SUM(l."{categories_category}")')}
+                AS "summary_categories_sum",
+            {linked(categories, summaries, categories_summary, pairs(categories_summary, categories_category))}
+                AS "summary_categories_pairs",
+            {rows(procedures, "COUNT(*)")} AS "procedures_count",
+            {rows(procedures, 'MAX(x."updated_at")')} AS "procedures_updated_at",
+            {linked(documents, procedures, "legislative_procedure_id", "COUNT(*)")}
+                AS "documents_count",
+            {linked(documents, procedures, "legislative_procedure_id", 'MAX(l."updated_at")')}
+                AS "documents_updated_at"
+        FROM "{proposals}" p
+        WHERE p."id" IN ({",".join(placeholders(db, count))})
+    """
+
+
+async def load_watermarks(ids: List[int]) -> Dict[int, Dict[str, list]]:
+    """
+    Section watermarks of the given proposals, in one query.
+    Values are stored as strings so they compare equal across JSON round trips.
+    Proposals that do not exist are absent from the result.
+    """
+    if not ids:
+        return {}
+    db = LegislativeProposal._meta.db
+    records = await db.execute_query_dict(_watermark_sql(db, len(ids)), list(ids))
+    return {
+        record["proposal_id"]: {
+            section: [str(record[column]) for column in columns]
+            for section, columns in _WATERMARK_COLUMNS.items()
+        }
+        for record in records
+    }
+
+
+def has_required_rows(watermarks: Dict[str, list]) -> bool:
+    """Whether the proposal has at least one procedure and one consult."""
+    return watermarks["procedures"][0] != "0" and watermarks["consults"][0] != "0"
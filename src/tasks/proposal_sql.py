@@ -0,0 +1,352 @@
+"""
+Database-side assembly of proposal payloads.
+
+The five payload sections of every proposal are built by one query with
+``json_build_object`` / ``json_agg`` (Postgres) or ``json_object`` /
+``json_group_array`` (SQLite), so no procedure, document or initiator row
+is turned into a Tortoise model. Python only adds the top-level dates,
+encodes the payload canonically and hashes it; the result is the same
+payload the ORM path in denorm_proposal builds, byte for byte
+(``python cli.py check-sql-parity`` compares the two on live data).
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import structlog
+
+from tortoise.transactions import in_transaction
+
+from src import canonical_json, profiling
+from src.db import placeholders
+from src.models.proposal import (
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    ProcedureDocument,
+)
+from src.models.category import PolicyCategory
+from src.tasks.denorm_proposal import (
+    RESULT_MISSING_DATA,
+    RESULT_NOT_FOUND,
+    RESULT_OK,
+    ProposalResult,
+    serialize_proposals,
+)
+from src.tasks.payload_validation import validate_payload
+from src.tasks.proposal_sections import (
+    SECTIONS,
+    _through,
+    has_required_rows,
+    load_watermarks,
+    proposal_section,
+    section_checksum,
+)
+
+logger = structlog.get_logger()
+
+
+class _Dialect:
+    """JSON building blocks of one SQL dialect."""
+
+    def __init__(self, postgres: bool):
+        self.postgres = postgres
+
+    def object(self, *pairs) -> str:
+        function = "json_build_object" if self.postgres else "json_object"
+        arguments = ", ".join(f"'{key}', {value}" for key, value in pairs)
+        return f"{function}({arguments})"
+
+    def subquery(self, sql: str) -> str:
+        # SQLite drops the JSON subtype of subquery results; json() restores it
+        return f"({sql})" if self.postgres else f"json(({sql}))"
+
+    def array(self, value: str, source: str, order: str, objects: bool = True) -> str:
+        """JSON array of ``value`` over the rows of ``source``, in ``order``."""
+        if self.postgres:
+            return (
+                f"(SELECT COALESCE(json_agg({value} ORDER BY {order}), '[]'::json) "
+                f"{source})"
+            )
+        item = "json(v)" if objects else "v"
+        return (
+            f"json((SELECT json_group_array({item}) FROM "
+            f"(SELECT {value} AS v {source} ORDER BY {order})))"
+        )
+
+    def empty_array(self) -> str:
+        return "json_build_array()" if self.postgres else "json_array()"
+
+    def boolean(self, column: str) -> str:
+        if self.postgres:
+            return column
+        return f"json(CASE WHEN {column} THEN 'true' ELSE 'false' END)"
+
+    def date(self, column: str) -> str:
+        return f"to_char({column}, 'YYYY-MM-DD')" if self.postgres else column
+
+    def newest_first_nulls_first(self, column: str) -> str:
+        if self.postgres:
+            return f"{column} DESC NULLS FIRST"
+        return f"{column} IS NOT NULL, {column} DESC"
+
+
+def _proposal_columns():
+    """(payload key, column, is boolean) of the proposal section, from its builder."""
+    projection = LegislativeProposal._meta.fields_db_projection
+    booleans = {
+        name
+        for name, field in LegislativeProposal._meta.fields_map.items()
+        if field.field_type is bool
+    }
+    keys = proposal_section(LegislativeProposal()).keys()
+    return [(key, projection[key], key in booleans) for key in keys]
+
+
+def _payload_sql(db, count: int) -> str:
+    d = _Dialect(db.capabilities.dialect == "postgres")
+    proposals = LegislativeProposal._meta.db_table
+    procedures = LegislativeProcedure._meta.db_table
+    documents = ProcedureDocument._meta.db_table
+    initiators = LegislativeInitiator._meta.db_table
+    consults = LegislativeConsult._meta.db_table
+    summaries = LegislativeSummary._meta.db_table
+    categories = PolicyCategory._meta.db_table
+    deputies, deputies_initiator, deputies_deputy = _through(
+        LegislativeInitiator, "deputies"
+    )
+    summary_categories, categories_summary, categories_category = _through(
+        LegislativeSummary, "categories"
+    )
+
+    proposal = d.object(
+        *(
+            (key, d.boolean(f'p."{column}"') if boolean else f'p."{column}"')
+            for key, column, boolean in _proposal_columns()
+        )
+    )
+    initiator_list = d.array(
+        d.object(
+            ("id", 'i."id"'),
+            ("name", 'i."name"'),
+            ("position", 'i."position"'),
+            ("party", 'i."party"'),
+            ("is_main", d.boolean('i."is_main"')),
+            ("photo_url", 'i."photo_url"'),
+            (
+                "deputy_id",
+                d.array(
+                    f'l."{deputies_deputy}"',
+                    f'FROM "{deputies}" l WHERE l."{deputies_initiator}" = i."id"',
+                    f'l."{deputies_deputy}"',
+                    objects=False,
+                ),
+            ),
+        ),
+        f'FROM "{initiators}" i WHERE i."legislative_proposal_id" = p."id"',
+        'i."id"',
+    )
+    consult_list = d.array(
+        d.object(("id", 'c."id"'), ("name", 'c."name"'), ("link", 'c."link"')),
+        f'FROM "{consults}" c WHERE c."legislative_proposal_id" = p."id"',
+        'c."id"',
+    )
+    category_names = d.array(
+        'k."category_name"',
+        f'FROM "{summary_categories}" l JOIN "{categories}" k '
+        f'ON k."id" = l."{categories_category}" '
+        f'WHERE l."{categories_summary}" = s."id"',
+        'k."id"',
+        objects=False,
+    )
+    latest_overview = d.subquery(
+        f"""SELECT {d.object(
+                ("id", 's."id"'),
+                ("summary", 's."summary"'),
+                ("categories", category_names),
+            )}
+            FROM "{summaries}" s WHERE s."legislative_proposal_id" = p."id"
+            ORDER BY s."created_at" DESC, s."id" DESC LIMIT 1"""
+    )
+    no_overview = d.object(
+        ("id", "0"), ("summary", "''"), ("categories", d.empty_array())
+    )
+    overview = f"COALESCE({latest_overview}, {no_overview})"
+    procedure_list = d.array(
+        d.object(
+            ("id", 'r."id"'),
+            ("date", d.date('r."date"')),
+            ("action", 'r."action"'),
+            ("short_action", 'r."short_action"'),
+            ("chamber", 'r."chamber"'),
+            ("termen", d.date('r."termen"')),
+            (
+                "attachment",
+                d.array(
+                    d.object(
+                        ("id", 'a."id"'), ("name", 'a."name"'), ("url", 'a."link"')
+                    ),
+                    f'FROM "{documents}" a '
+                    f'WHERE a."legislative_procedure_id" = r."id"',
+                    'a."id"',
+                ),
+            ),
+        ),
+        f'FROM "{procedures}" r WHERE r."legislative_proposal_id" = p."id"',
+        d.newest_first_nulls_first('r."date"') + ', r."id"',
+    )
+
+    def procedure_date(aggregate: str) -> str:
+        value = d.date(f'{aggregate}(x."date")')
+        return (
+            f'(SELECT {value} FROM "{procedures}" x '
+            f'WHERE x."legislative_proposal_id" = p."id")'
+        )
+
+    sections = d.object(
+        ("proposal", proposal),
+        ("initiators", initiator_list),
+        ("consults", consult_list),
+        ("overview", overview),
+        ("procedures", procedure_list),
+    )
+    return f"""
+        SELECT p."id" AS "proposal_id",
+            p."created_at" AS "created_at",
+            {procedure_date("MIN")} AS "first_date",
+            {procedure_date("MAX")} AS "last_date",
+            {sections} AS "sections"
+        FROM "{proposals}" p
+        WHERE p."id" IN ({",".join(placeholders(db, count))})
+    """
+
+
+async def load_payload_sections(ids: List[int]) -> Dict[int, dict]:
+    """Query rows of proposal_id, created_at, first/last procedure date and sections."""
+    if not ids:
+        return {}
+    db = LegislativeProposal._meta.db
+    records = await db.execute_query_dict(_payload_sql(db, len(ids)), list(ids))
+    created_at = LegislativeProposal._meta.fields_map["created_at"]
+    rows = {}
+    for record in records:
+        sections = record["sections"]
+        if isinstance(sections, (str, bytes)):
+            sections = json.loads(sections)
+        rows[record["proposal_id"]] = {
+            **record,
+            "created_at": created_at.to_python_value(record["created_at"]),
+            "sections": sections,
+        }
+    return rows
+
+
+async def serialize_proposals_sql(ids: List[int]) -> Dict[int, ProposalResult]:
+    """
+    serialize_proposals() with the payloads assembled by the database.
+    Always builds every section (there is no incremental mode).
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+
+    async with in_transaction():
+        with profiling.stage("watermarks"):
+            watermarks = await load_watermarks(unique_ids)
+        buildable = [
+            proposal_id
+            for proposal_id, proposal_watermarks in watermarks.items()
+            if has_required_rows(proposal_watermarks)
+        ]
+        with profiling.stage("sql_assembly"):
+            rows = await load_payload_sections(buildable)
+
+    results: Dict[int, ProposalResult] = {}
+    for proposal_id in unique_ids:
+        if proposal_id not in watermarks:
+            results[proposal_id] = ProposalResult(proposal_id, RESULT_NOT_FOUND)
+            continue
+        if proposal_id not in rows:
+            results[proposal_id] = ProposalResult(proposal_id, RESULT_MISSING_DATA)
+            continue
+
+        row = rows[proposal_id]
+        sections = row["sections"]
+        payload = {
+            "proposal_id": proposal_id,
+            "created_at": row["first_date"] or row["created_at"].isoformat(),
+            "updated_at": row["last_date"],
+            **{name: sections[name] for name in SECTIONS},
+        }
+        with profiling.stage("encode"):
+            encoded = canonical_json.dumps(payload)
+            checksum = canonical_json.checksum(encoded)
+            meta = {
+                name: {
+                    "checksum": section_checksum(sections[name]),
+                    "watermark": watermarks[proposal_id][name],
+                }
+                for name in SECTIONS
+            }
+        with profiling.stage("validate"):
+            valid = validate_payload(proposal_id, encoded)
+        results[proposal_id] = ProposalResult(
+            proposal_id,
+            RESULT_OK,
+            payload=payload,
+            checksum=checksum,
+            sections=meta,
+            rebuilt_sections=list(SECTIONS),
+            encoded=encoded,
+            valid=valid,
+        )
+    return results
+
+
+async def check_sql_parity(ids: Optional[List[int]] = None, chunk_size: int = 200):
+    """
+    Serialize proposals with both backends and compare their canonical
+    bytes and section checksums. Walks every proposal unless ``ids`` is
+    given. Returns {"checked", "matched", "mismatched": [ids]}.
+    """
+    if ids is None:
+        ids = (
+            await LegislativeProposal.all().order_by("id").values_list("id", flat=True)
+        )
+    report = {"checked": 0, "matched": 0, "mismatched": []}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        orm_results = await serialize_proposals(chunk, backend="python")
+        sql_results = await serialize_proposals_sql(chunk)
+        for proposal_id, expected in orm_results.items():
+            actual = sql_results[proposal_id]
+            report["checked"] += 1
+            if (
+                actual.status == expected.status
+                and actual.encoded == expected.encoded
+                and actual.sections == expected.sections
+            ):
+                report["matched"] += 1
+                continue
+            report["mismatched"].append(proposal_id)
+            logger.warning(
+                "sql_parity_mismatch",
+                proposal_id=proposal_id,
+                python_status=expected.status,
+                sql_status=actual.status,
+                sections=[
+                    name
+                    for name in SECTIONS
+                    if (expected.payload or {}).get(name)
+                    != (actual.payload or {}).get(name)
+                ],
+            )
+    logger.info(
+        "sql_parity_checked",
+        checked=report["checked"],
+        matched=report["matched"],
+        mismatched=len(report["mismatched"]),
+    )
+    return report
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import structlog
+
+from src.models.proposal import LegislativeProposal
+from src.tasks.checkpoint import clear_checkpoint, load_checkpoint, save_checkpoint
+from src.tasks.denorm_proposal import (
+    RESULT_MISSING_DATA,
+    ProposalResult,
+    persist_proposals,
+    serialize_proposals,
+)
+from src.tasks.proposal_lease import run_exclusive
+
+logger = structlog.get_logger()
+
+CHECKPOINT_NAME = "rebuild_proposals"
+REBUILD_CHUNK_SIZE = int(os.getenv("REBUILD_CHUNK_SIZE", 200))
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", 4))
+
+
+class RebuildStats:
+    """Counters of a rebuild run, logged as progress events."""
+
+    def __init__(self, total: int, already_processed: int = 0):
+        self.total = total
+        self.already_processed = already_processed
+        self.processed = 0
+        self.persisted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        rate = self.rate
+        remaining = max(self.total - self.processed, 0)
+        return {
+            "processed": self.processed,
+            "total": self.total,
+            "persisted": self.persisted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "proposals_per_sec": round(rate, 2),
+            "eta_seconds": round(remaining / rate) if rate else None,
+            "elapsed_seconds": round(time.monotonic() - self.started, 2),
+        }
+
+
+async def _rebuild_chunk(ids: List[int], stats: RebuildStats, force: bool):
+    """
+    Serialize and persist one chunk of proposal IDs under their leases,
+    waiting for the replicas that hold some of them (see run_exclusive()).
+    """
+
+    async def rebuild(batch: List[int]) -> Dict[int, ProposalResult]:
+        results = await serialize_proposals(batch)
+        ready = [result for result in results.values() if result.ok]
+        await persist_proposals(ready, force=force)
+        stats.persisted += len(ready)
+        return results
+
+    results = await run_exclusive(ids, rebuild, wait=True)
+    for result in results.values():
+        if result.status == RESULT_MISSING_DATA:
+            stats.skipped += 1
+        elif not result.ok:
+            stats.failed += 1
+    stats.processed += len(ids)
+
+
+async def rebuild_proposals(
+    chunk_size: int = REBUILD_CHUNK_SIZE,
+    workers: int = REBUILD_WORKERS,
+    resume: bool = True,
+    force: bool = False,
+) -> dict:
+    """
+    Rebuild the denorm rows of every active proposal.
+
+    Proposals are walked by id in keyset-paginated chunks, so memory stays
+    bounded by ``chunk_size`` and every chunk runs in its own short
+    transaction. ``workers`` chunks are serialized concurrently. The highest
+    id below which every chunk has completed is checkpointed in Redis, so an
+    interrupted run resumes from there unless ``resume`` is False.
+    ``force`` rewrites payloads even when their cached checksum matches.
+    """
+    if resume:
+        state = await load_checkpoint(CHECKPOINT_NAME) or {}
+    else:
+        await clear_checkpoint(CHECKPOINT_NAME)
+        state = {}
+
+    start_id = state.get("last_id", 0)
+    already_processed = state.get("processed", 0)
+    proposals = LegislativeProposal.filter(active=True)
+    total = await proposals.filter(id__gt=start_id).count()
+    stats = RebuildStats(total, already_processed)
+    logger.info(
+        "rebuild_started",
+        resume_from_id=start_id,
+        total=total,
+        chunk_size=chunk_size,
+        workers=workers,
+        force=force,
+    )
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    dispatched: List[int] = []  # last id of every chunk, in keyset order
+    completed = set()
+    checkpoint_lock = asyncio.Lock()
+
+    async def advance_checkpoint(chunk_last_id: int):
+        async with checkpoint_lock:
+            completed.add(chunk_last_id)
+            last_id = None
+            while dispatched and dispatched[0] in completed:
+                last_id = dispatched.pop(0)
+                completed.discard(last_id)
+            if last_id is not None:
+                await save_checkpoint(
+                    CHECKPOINT_NAME,
+                    {
+                        "last_id": last_id,
+                        "processed": already_processed + stats.processed,
+                        "saved_at": datetime.now(timezone.utc).isoformat(),
+                    },
+                )
+            logger.info("rebuild_progress", checkpoint_id=last_id, **stats.as_dict())
+
+    async def produce():
+        cursor = start_id
+        while True:
+            ids = (
+                await proposals.filter(id__gt=cursor)
+                .order_by("id")
+                .limit(chunk_size)
+                .values_list("id", flat=True)
+            )
+            if not ids:
+                break
+            cursor = ids[-1]
+            dispatched.append(cursor)
+            await queue.put(ids)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            ids = await queue.get()
+            if ids is None:
+                return
+            await _rebuild_chunk(ids, stats, force)
+            await advance_checkpoint(ids[-1])
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(produce())
+        for _ in range(workers):
+            group.create_task(consume())
+
+    await clear_checkpoint(CHECKPOINT_NAME)
+    summary = stats.as_dict()
+    logger.info("rebuild_completed", **summary)
+    return summary
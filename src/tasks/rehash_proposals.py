@@ -0,0 +1,92 @@
+"""
+One-off backfill of the checksums of stored proposal payloads after a
+change of the canonical JSON encoding.
+
+A new encoding changes every checksum, so the first refresh of an
+unchanged proposal would rewrite its row and reset ``notified``, and its
+followers would be notified about nothing. rehash_proposals() re-encodes
+the stored payloads, writes the new checksums and re-caches the payloads
+in Redis without touching ``notified``. Run it right after deploying an
+encoding change:
+
+    python cli.py rehash-proposals
+"""
+
+import os
+import time
+from typing import Dict, List
+
+import structlog
+
+from src import canonical_json
+from src.db import update_column
+from src.models.proposal import LegislativeProposalDenorm
+from src.tasks.denorm_proposal import (
+    RESULT_OK,
+    ProposalResult,
+    save_proposals_to_redis,
+)
+from src.tasks.proposal_lease import run_exclusive
+
+logger = structlog.get_logger()
+
+REHASH_CHUNK_SIZE = int(os.getenv("REHASH_CHUNK_SIZE", 500))
+
+
+async def _rehash(ids: List[int], report: dict) -> Dict[int, ProposalResult]:
+    """Re-encode the stored payloads of ``ids`` and store their new checksums."""
+    rows = await LegislativeProposalDenorm.filter(proposal_id__in=ids).values_list(
+        "proposal_id", "payload", "checksum"
+    )
+    stale: List[ProposalResult] = []
+    for proposal_id, payload, checksum in rows:
+        encoded = canonical_json.dumps(payload)
+        result = ProposalResult(
+            proposal_id,
+            RESULT_OK,
+            payload=payload,
+            checksum=canonical_json.checksum(encoded),
+            encoded=encoded,
+        )
+        if result.checksum != checksum:
+            stale.append(result)
+
+    if stale:
+        await update_column(
+            LegislativeProposalDenorm,
+            "proposal_id",
+            "checksum",
+            {result.proposal_id: result.checksum for result in stale},
+        )
+        await save_proposals_to_redis(stale)
+    report["checked"] += len(rows)
+    report["rehashed"] += len(stale)
+    return {result.proposal_id: result for result in stale}
+
+
+async def rehash_proposals(chunk_size: int = REHASH_CHUNK_SIZE) -> dict:
+    """
+    Walk every denorm row by id and rewrite the checksums that differ from
+    the current encoding of the stored payload. Each chunk runs under the
+    proposal leases (see run_exclusive()), so a concurrent refresh cannot
+    be overwritten with the checksum of an older payload. Returns a report.
+    """
+    started = time.monotonic()
+    report = {"checked": 0, "rehashed": 0}
+    cursor = 0
+    while True:
+        ids = (
+            await LegislativeProposalDenorm.filter(proposal_id__gt=cursor)
+            .order_by("proposal_id")
+            .limit(chunk_size)
+            .values_list("proposal_id", flat=True)
+        )
+        if not ids:
+            break
+        cursor = ids[-1]
+        await run_exclusive(ids, lambda batch: _rehash(batch, report), wait=True)
+        logger.info("rehash_progress", last_id=cursor, **report)
+
+    report["duration_seconds"] = round(time.monotonic() - started, 3)
+    logger.info("rehash_completed", **report)
+    return report
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+import structlog
+from dotenv import load_dotenv
+from tortoise import timezone
+from tortoise.expressions import Q
+
+from src import metrics
+from src.models.proposal import (
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    ProcedureDocument,
+)
+from src.tasks.checkpoint import clear_checkpoint, load_checkpoint, save_checkpoint
+from src.tasks.denorm_proposal import RESULT_ERROR
+from src.tasks.proposal_lease import refresh_proposals_exclusive
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+CHANGE_CAPTURE_ENABLED = os.getenv("CHANGE_CAPTURE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+CHANGE_CAPTURE_INTERVAL_SECONDS = float(
+    os.getenv("CHANGE_CAPTURE_INTERVAL_SECONDS", 30)
+)
+# Rows newer than this are left for the next poll, so transactions that
+# stamped updated_at just before committing are not skipped.
+CHANGE_CAPTURE_LAG_SECONDS = float(os.getenv("CHANGE_CAPTURE_LAG_SECONDS", 5))
+CHANGE_CAPTURE_SCAN_LIMIT = int(os.getenv("CHANGE_CAPTURE_SCAN_LIMIT", 1000))
+CHANGE_CAPTURE_BATCH_SIZE = int(os.getenv("CHANGE_CAPTURE_BATCH_SIZE", 50))
+
+CHECKPOINT_PREFIX = "change_capture"
+# Proposals whose refresh failed, retried on the next pass
+RETRY_CHECKPOINT = f"{CHECKPOINT_PREFIX}:retry"
+
+# (watermark name, source model, path from a row to its proposal id)
+CAPTURE_SOURCES = (
+    ("proposals", LegislativeProposal, "id"),
+    ("procedures", LegislativeProcedure, "legislative_proposal_id"),
+    (
+        "documents",
+        ProcedureDocument,
+        "legislative_procedure__legislative_proposal_id",
+    ),
+    ("consults", LegislativeConsult, "legislative_proposal_id"),
+    ("initiators", LegislativeInitiator, "legislative_proposal_id"),
+    ("summaries", LegislativeSummary, "legislative_proposal_id"),
+)
+
+
+async def scan_source(
+    model, proposal_field: str, watermark: dict, until: datetime, limit: int
+) -> Tuple[Set[int], dict, bool]:
+    """
+    Read up to ``limit`` rows of ``model`` updated after ``watermark`` and at
+    or before ``until``, in (updated_at, id) keyset order, which an index on
+    (updated_at, id) serves as a range scan.
+
+    Returns the proposal IDs they belong to, the advanced watermark and
+    whether the scan reached ``until``.
+    """
+    query = model.filter(updated_at__lte=until)
+    since = datetime.fromisoformat(watermark["updated_at"])
+    query = query.filter(
+        Q(updated_at__gt=since) | Q(updated_at=since, id__gt=watermark["id"])
+    )
+    rows = (
+        await query.order_by("updated_at", "id")
+        .limit(limit)
+        .values_list("id", "updated_at", proposal_field)
+    )
+    if not rows:
+        return set(), watermark, True
+
+    last_id, last_updated_at, _ = rows[-1]
+    advanced = {"updated_at": last_updated_at.isoformat(), "id": last_id}
+    return {row[2] for row in rows if row[2]}, advanced, len(rows) < limit
+
+
+async def _refresh(
+    ids: Iterable[int], refreshed: Set[int], failed: Set[int], batch_size: int
+):
+    """
+    Refresh the proposals of ``ids`` not yet refreshed in this pass, in
+    batches, recording them in ``refreshed`` and their failures in ``failed``.
+    """
+    ordered: List[int] = sorted(set(ids) - refreshed)
+    refreshed.update(ordered)
+    for start in range(0, len(ordered), batch_size):
+        batch = ordered[start : start + batch_size]
+        failed.difference_update(batch)
+        results = await refresh_proposals_exclusive(batch)
+        failed.update(
+            proposal_id
+            for proposal_id, result in results.items()
+            if result.status == RESULT_ERROR
+        )
+
+
+async def _save_retry(failed: Set[int]):
+    if failed:
+        await save_checkpoint(RETRY_CHECKPOINT, {"proposal_ids": sorted(failed)})
+    else:
+        await clear_checkpoint(RETRY_CHECKPOINT)
+
+
+async def capture_changes(
+    limit: int = CHANGE_CAPTURE_SCAN_LIMIT,
+    batch_size: int = CHANGE_CAPTURE_BATCH_SIZE,
+) -> int:
+    """
+    One change-capture pass: walk every source table from its persisted
+    watermark in pages of ``limit`` rows, refresh the proposals touched by
+    each page in batches and persist the page's advanced watermark before
+    reading the next one. Returns how many proposals were refreshed.
+
+    Proposals whose refresh fails are saved under RETRY_CHECKPOINT before
+    the watermark advances past their changes, and refreshed again on the
+    next pass. A source seen for the first time starts at the current
+    time; use the rebuild CLI to backfill history.
+
+    Only rows whose ``updated_at`` moves are captured. Deleted rows, M2M
+    link edits (initiator deputies, summary categories) and bulk
+    ``QuerySet.update()`` writes leave no trace here; their writers must
+    send an SQS message for the proposal instead.
+    """
+    started = time.monotonic()
+    until = timezone.now() - timedelta(seconds=CHANGE_CAPTURE_LAG_SECONDS)
+
+    refreshed: Set[int] = set()
+    failed: Set[int] = set()
+    retry = await load_checkpoint(RETRY_CHECKPOINT)
+    retried = len(retry["proposal_ids"]) if retry else 0
+    if retry:
+        await _refresh(retry["proposal_ids"], refreshed, failed, batch_size)
+        await _save_retry(failed)
+
+    for name, model, proposal_field in CAPTURE_SOURCES:
+        checkpoint = f"{CHECKPOINT_PREFIX}:{name}"
+        watermark = await load_checkpoint(checkpoint)
+        if watermark is None:
+            await save_checkpoint(
+                checkpoint, {"updated_at": until.isoformat(), "id": 0}
+            )
+            continue
+
+        exhausted = False
+        while not exhausted:
+            ids, advanced, exhausted = await scan_source(
+                model, proposal_field, watermark, until, limit
+            )
+            if ids:
+                before = set(failed)
+                await _refresh(ids, refreshed, failed, batch_size)
+                if failed != before:
+                    await _save_retry(failed)
+            if advanced != watermark:
+                await save_checkpoint(checkpoint, advanced)
+                watermark = advanced
+
+    metrics.change_capture_proposals.inc(len(refreshed))
+    if refreshed or failed:
+        logger.info(
+            "change_capture_pass",
+            proposals=len(refreshed),
+            retried=retried,
+            failed=len(failed),
+            duration_ms=round((time.monotonic() - started) * 1000, 1),
+        )
+    return len(refreshed)
+
+
+async def missing_capture_indexes() -> List[str]:
+    """
+    Tables of CAPTURE_SOURCES without an index led by (updated_at, id),
+    which scan_source() needs to stay a range scan. The scraper owns most
+    of these tables, so the indexes are checked here rather than created.
+    """
+    missing = []
+    for _, model, _ in CAPTURE_SOURCES:
+        db = model._meta.db
+        table = model._meta.db_table
+        if db.capabilities.dialect == "postgres":
+            query = "SELECT indexdef AS definition FROM pg_indexes WHERE tablename = $1"
+        else:
+            query = (
+                "SELECT sql AS definition FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL"
+            )
+        rows = await db.execute_query_dict(query, [table])
+        definitions = [
+            row["definition"].replace('"', "").replace(" ", "") for row in rows
+        ]
+        if not any("(updated_at,id" in definition for definition in definitions):
+            missing.append(table)
+    return missing
+
+
+async def run_change_capture(
+    shutdown_event: asyncio.Event,
+    interval: Optional[float] = None,
+):
+    """Run capture_changes() every ``interval`` seconds until shutdown."""
+    interval = interval or CHANGE_CAPTURE_INTERVAL_SECONDS
+    try:
+        for table in await missing_capture_indexes():
+            logger.warning(
+                "change_capture_index_missing",
+                table=table,
+                create=f'CREATE INDEX ON "{table}" ("updated_at", "id")',
+            )
+    except Exception as e:
+        logger.warning("change_capture_index_check_failed", error=str(e))
+    while not shutdown_event.is_set():
+        try:
+            await capture_changes()
+        except Exception as e:
+            logger.exception("change_capture_error", error=str(e))
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
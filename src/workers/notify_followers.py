@@ -0,0 +1,328 @@
+import asyncio
+import json
+import os
+import time
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import structlog
+from dotenv import load_dotenv
+from tortoise import timezone
+from tortoise.expressions import Q
+
+from src.models import CustomUser, LegislativeProposalDenorm, PolicyCategory
+from src.redis import redis_client
+from src.tasks.checkpoint import load_checkpoint, save_checkpoint
+from src.workers.update_proposal import SQS_MAX_BATCH, sqs
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+NOTIFY_FOLLOWERS_ENABLED = os.getenv("NOTIFY_FOLLOWERS_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+NOTIFICATION_QUEUE_URL = os.getenv("NOTIFICATION_QUEUE_URL")
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 200))
+NOTIFY_INTERVAL_SECONDS = float(os.getenv("NOTIFY_INTERVAL_SECONDS", 60))
+NOTIFY_INDEX_REFRESH_SECONDS = float(os.getenv("NOTIFY_INDEX_REFRESH_SECONDS", 900))
+
+# Set once the rows that existed before the notifier was enabled are marked
+BASELINE_CHECKPOINT = "notify_followers:baseline"
+# Ids of users whose follows changed, queued by any worker process for the
+# single process that holds the follower index
+FOLLOWS_CHANGED_KEY = ":1:notify_followers:follows_changed"
+
+# notificationPreferences keys; a missing key means the user is opted in
+PREFERENCE_PROPOSALS = "legislativeProposals"
+PREFERENCE_CATEGORIES = "followedCategories"
+PREFERENCE_DEPUTIES = "followedDeputies"
+
+
+def wants(preferences, key: str) -> bool:
+    """Whether notificationPreferences allow notifications through ``key``."""
+    if not isinstance(preferences, dict):
+        return True
+    return (
+        preferences.get(PREFERENCE_PROPOSALS, True) is not False
+        and preferences.get(key, True) is not False
+    )
+
+
+def _deputy_ids(followed) -> Set[int]:
+    """Deputy ids of a followed_deputies value (ids, numeric strings or {"id"})."""
+    ids = set()
+    for item in followed or []:
+        if isinstance(item, dict):
+            item = item.get("id")
+        try:
+            ids.add(int(item))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+class FollowerIndex:
+    """
+    Inverted index of followed categories and deputies to the ids of the
+    users who follow them, filtered by their notificationPreferences.
+
+    rebuild() loads the whole index in three queries; update_user()
+    re-indexes a single user after their follows or preferences changed.
+    """
+
+    def __init__(self):
+        self.by_category: Dict[int, Set[int]] = {}
+        self.by_deputy: Dict[int, Set[int]] = {}
+        self.category_ids: Dict[str, int] = {}
+        self.built_at: Optional[float] = None
+        self._follows: Dict[int, Tuple[Set[int], Set[int]]] = {}
+
+    async def rebuild(self):
+        categories = await PolicyCategory.all().values_list("id", "category_name")
+        users = await CustomUser.all().values_list(
+            "id", "followed_deputies", "notificationPreferences"
+        )
+        followed = await CustomUser.filter(
+            followed_categories__id__isnull=False
+        ).values_list("id", "followed_categories__id")
+
+        by_user: Dict[int, Set[int]] = {}
+        for user_id, category_id in followed:
+            by_user.setdefault(user_id, set()).add(category_id)
+
+        self.by_category, self.by_deputy, self._follows = {}, {}, {}
+        self.category_ids = {name: category_id for category_id, name in categories}
+        for user_id, deputies, preferences in users:
+            self._index_user(
+                user_id, by_user.get(user_id, set()), deputies, preferences
+            )
+        self.built_at = time.monotonic()
+        logger.info(
+            "follower_index_rebuilt",
+            users=len(self._follows),
+            categories=len(self.by_category),
+            deputies=len(self.by_deputy),
+        )
+
+    async def update_user(self, user_id: int):
+        """Re-index one user; a deleted user is dropped from the index."""
+        self._unindex_user(user_id)
+        user = await CustomUser.get_or_none(id=user_id).prefetch_related(
+            "followed_categories"
+        )
+        if user is None:
+            return
+        self._index_user(
+            user.id,
+            {category.id for category in user.followed_categories},
+            user.followed_deputies,
+            user.notificationPreferences,
+        )
+
+    def _index_user(self, user_id: int, categories: Set[int], deputies, preferences):
+        categories = categories if wants(preferences, PREFERENCE_CATEGORIES) else set()
+        deputies = (
+            _deputy_ids(deputies) if wants(preferences, PREFERENCE_DEPUTIES) else set()
+        )
+        if not categories and not deputies:
+            return
+        self._follows[user_id] = (categories, deputies)
+        for category_id in categories:
+            self.by_category.setdefault(category_id, set()).add(user_id)
+        for deputy_id in deputies:
+            self.by_deputy.setdefault(deputy_id, set()).add(user_id)
+
+    def _unindex_user(self, user_id: int):
+        categories, deputies = self._follows.pop(user_id, (set(), set()))
+        for category_id in categories:
+            self.by_category.get(category_id, set()).discard(user_id)
+        for deputy_id in deputies:
+            self.by_deputy.get(deputy_id, set()).discard(user_id)
+
+    def recipients(self, payload: dict) -> Set[int]:
+        """Users following a category or an initiator deputy of the payload."""
+        users: Set[int] = set()
+        for name in (payload.get("overview") or {}).get("categories", []):
+            category_id = self.category_ids.get(name)
+            if category_id is not None:
+                users |= self.by_category.get(category_id, set())
+        for initiator in payload.get("initiators") or []:
+            for deputy_id in initiator.get("deputy_id") or []:
+                users |= self.by_deputy.get(deputy_id, set())
+        return users
+
+
+follower_index = FollowerIndex()
+
+
+async def queue_follows_change(user_id: int):
+    """
+    Queue a user for re-indexing. Any process may receive the user_follows
+    message, but only the notifier process holds an index to update.
+    """
+    await redis_client.sadd(FOLLOWS_CHANGED_KEY, user_id)
+
+
+async def apply_follows_changes(
+    index: FollowerIndex, batch_size: int = NOTIFY_BATCH_SIZE
+) -> int:
+    """
+    Re-index the users queued by queue_follows_change(). Users that could
+    not be re-indexed are queued again. Returns how many were re-indexed.
+    """
+    updated = 0
+    while True:
+        user_ids = await redis_client.spop(FOLLOWS_CHANGED_KEY, batch_size)
+        if not user_ids:
+            return updated
+        for position, user_id in enumerate(user_ids):
+            try:
+                await index.update_user(int(user_id))
+            except Exception:
+                await redis_client.sadd(FOLLOWS_CHANGED_KEY, *user_ids[position:])
+                raise
+            updated += 1
+
+
+async def send_notifications(notifications: List[Tuple[int, List[int]]]) -> Set[int]:
+    """
+    Queue one message per proposal on NOTIFICATION_QUEUE_URL.
+    Returns the proposal ids whose message SQS rejected.
+    """
+    failed: Set[int] = set()
+    for start in range(0, len(notifications), SQS_MAX_BATCH):
+        chunk = notifications[start : start + SQS_MAX_BATCH]
+        entries = [
+            {
+                "Id": str(proposal_id),
+                "MessageBody": json.dumps(
+                    {
+                        "type": "proposal_update",
+                        "proposal_id": proposal_id,
+                        "user_ids": user_ids,
+                    }
+                ),
+            }
+            for proposal_id, user_ids in chunk
+        ]
+        response = await asyncio.to_thread(
+            lambda: sqs.send_message_batch(
+                QueueUrl=NOTIFICATION_QUEUE_URL, Entries=entries
+            )
+        )
+        for failure in response.get("Failed", []):
+            logger.warning(
+                "notification_send_failed",
+                proposal_id=failure.get("Id"),
+                code=failure.get("Code"),
+            )
+            failed.add(int(failure["Id"]))
+    return failed
+
+
+async def mark_notified(rows: Iterable[dict]) -> int:
+    """
+    Flip ``notified`` on the given denorm rows in one statement. Each row is
+    guarded by the ``updated_at`` it was read with, so a payload rewritten
+    meanwhile stays un-notified for the next sweep.
+    """
+    guards = [Q(id=row["id"], updated_at=row["updated_at"]) for row in rows]
+    if not guards:
+        return 0
+    return await LegislativeProposalDenorm.filter(
+        reduce(or_, guards), notified=False
+    ).update(notified=True)
+
+
+async def establish_baseline() -> Optional[int]:
+    """
+    On the notifier's first run, mark every existing denorm row notified.
+    Until then nothing flipped ``notified``, so every row is still False
+    and the first sweep would notify the followers of every proposal.
+    Returns how many rows were marked, or None if the baseline was set on
+    an earlier run.
+    """
+    if await load_checkpoint(BASELINE_CHECKPOINT) is not None:
+        return None
+    now = timezone.now()
+    marked = await LegislativeProposalDenorm.filter(
+        notified=False, updated_at__lte=now
+    ).update(notified=True)
+    await save_checkpoint(
+        BASELINE_CHECKPOINT, {"updated_at": now.isoformat(), "marked": marked}
+    )
+    logger.info("notification_baseline", marked=marked)
+    return marked
+
+
+async def sweep_unnotified(
+    index: FollowerIndex, batch_size: int = NOTIFY_BATCH_SIZE
+) -> dict:
+    """
+    Walk un-notified denorm rows by id, queue one deduplicated recipient set
+    per proposal that has followers, and mark the batch notified.
+    """
+    started = time.monotonic()
+    report = {"proposals": 0, "notified": 0, "recipients": 0, "failed": 0}
+    cursor = 0
+    while True:
+        rows = (
+            await LegislativeProposalDenorm.filter(notified=False, id__gt=cursor)
+            .order_by("id")
+            .limit(batch_size)
+            .values("id", "proposal_id", "payload", "updated_at")
+        )
+        if not rows:
+            break
+        cursor = rows[-1]["id"]
+
+        notifications = []
+        for row in rows:
+            users = index.recipients(row["payload"] or {})
+            if users:
+                notifications.append((row["proposal_id"], sorted(users)))
+                report["recipients"] += len(users)
+        failed = await send_notifications(notifications)
+
+        report["proposals"] += len(rows)
+        report["failed"] += len(failed)
+        report["notified"] += await mark_notified(
+            row for row in rows if row["proposal_id"] not in failed
+        )
+
+    if report["proposals"]:
+        report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        logger.info("notification_sweep", **report)
+    return report
+
+
+async def run_notifier(shutdown_event: asyncio.Event, interval: Optional[float] = None):
+    """
+    Sweep un-notified proposals every ``interval`` seconds until shutdown,
+    starting from the baseline set by establish_baseline().
+    """
+    interval = interval or NOTIFY_INTERVAL_SECONDS
+    baseline = False
+    while not shutdown_event.is_set():
+        try:
+            if not baseline:
+                await establish_baseline()
+                baseline = True
+            if (
+                follower_index.built_at is None
+                or time.monotonic() - follower_index.built_at
+                > NOTIFY_INDEX_REFRESH_SECONDS
+            ):
+                await follower_index.rebuild()
+            await apply_follows_changes(follower_index)
+            await sweep_unnotified(follower_index)
+        except Exception as e:
+            logger.exception("notification_sweep_error", error=str(e))
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
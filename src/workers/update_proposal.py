@@ -1,11 +1,23 @@
 import os
 import asyncio
 import json
+import time
+from typing import Dict, List, Optional, Tuple
+
 import boto3
 import structlog
 from dotenv import load_dotenv
 
-from src.tasks.denorm_proposal import serialized_proposal
+from src import metrics, profiling
+from src.tasks.denorm_proposal import (
+    RESULT_MISSING_DATA,
+    RESULT_NOT_FOUND,
+    RESULT_OK,
+)
+from src.tasks.proposal_lease import RESULT_DEFERRED, refresh_proposals_exclusive
+from src.tasks.denorm_deputy import refresh_deputies
+from src.tasks.invalidate_dependents import DEPENDENCIES, invalidate_dependents
+from src.workers.visibility import VisibilityLeaseManager
 
 logger = structlog.get_logger()
 
@@ -14,7 +26,22 @@ load_dotenv()
 logger = structlog.get_logger()
 
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
-MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", 10))
+SQS_BATCH_SIZE = int(os.getenv("SQS_BATCH_SIZE", 50))
+# Micro-batches of up to SQS_BATCH_SIZE messages handled at once. Unset, it
+# is derived from the former per-message MAX_CONCURRENT_TASKS limit, so an
+# existing deployment keeps the same number of messages in flight.
+MAX_CONCURRENT_BATCHES = int(
+    os.getenv("MAX_CONCURRENT_BATCHES")
+    or max(1, -(-int(os.getenv("MAX_CONCURRENT_TASKS", 10)) // SQS_BATCH_SIZE))
+)
+# Invalidation messages run beside the micro-batches, this many at once
+MAX_CONCURRENT_INVALIDATIONS = int(os.getenv("MAX_CONCURRENT_INVALIDATIONS", 2))
+SQS_POLLERS = int(os.getenv("SQS_POLLERS", 1))
+SQS_DELETE_FLUSH_SECONDS = float(os.getenv("SQS_DELETE_FLUSH_SECONDS", 0.5))
+SQS_BATCH_WINDOW_SECONDS = float(os.getenv("SQS_BATCH_WINDOW_MS", 200)) / 1000
+SQS_VISIBILITY_TIMEOUT = int(os.getenv("SQS_VISIBILITY_TIMEOUT", 60))
+
+SQS_MAX_BATCH = 10  # receive_message / delete_message_batch hard limit
 
 
 sqs = boto3.client(
@@ -25,23 +52,275 @@ sqs = boto3.client(
 )
 
 
-async def handle_message(message):
-    """Process one message and return True if successful."""
+def parse_proposal_id(message) -> Optional[int]:
+    """
+    Return the proposal_id of a message as an int (numeric strings are
+    accepted), or None if the body is invalid.
+    """
+    try:
+        proposal_id = json.loads(message["Body"]).get("proposal_id")
+    except Exception as e:
+        logger.exception("message_processing_failed", error=str(e))
+        return None
+
+    try:
+        if isinstance(proposal_id, bool):
+            raise ValueError(proposal_id)
+        proposal_id = int(proposal_id)
+    except (TypeError, ValueError):
+        proposal_id = None
+    if not proposal_id:
+        logger.warning("invalid_message_body", message_id=message.get("MessageId"))
+        return None
+    return proposal_id
+
+
+def parse_invalidation(message) -> Optional[Tuple[str, List[int]]]:
+    """
+    Return (entity, ids) of an invalidation message, for example
+    ``{"type": "invalidate", "entity": "category", "ids": [3]}``, or None
+    if the message is not one.
+    """
     try:
         body = json.loads(message["Body"])
-        proposal_id = body.get("proposal_id")
+    except Exception:
+        return None
+    if not isinstance(body, dict) or body.get("type") != "invalidate":
+        return None
+    return body.get("entity"), body.get("ids") or []
+
+
+def parse_follows_change(message) -> Optional[int]:
+    """
+    Return the user id of a ``{"type": "user_follows", "user_id": 7}``
+    message, sent when a user's follows or preferences change, else None.
+    """
+    try:
+        body = json.loads(message["Body"])
+    except Exception:
+        return None
+    if not isinstance(body, dict) or body.get("type") != "user_follows":
+        return None
+    return body.get("user_id")
+
+
+def parse_deputy_id(message) -> Optional[int]:
+    """Return the deputy id of a ``{"type": "deputy", "deputy_id": 12}`` message."""
+    try:
+        body = json.loads(message["Body"])
+    except Exception:
+        return None
+    if not isinstance(body, dict) or body.get("type") != "deputy":
+        return None
+    return body.get("deputy_id")
+
+
+async def handle_deputies(by_deputy: Dict[int, List[dict]], deleter):
+    """Refresh the snapshots of a batch of deputies, acknowledging the built ones."""
+    try:
+        results = await refresh_deputies(by_deputy.keys())
+    except Exception as e:
+        logger.exception("message_processing_failed", error=str(e))
+        return
+
+    for deputy_id, result in results.items():
+        if result.status in (RESULT_OK, RESULT_NOT_FOUND):
+            for message in by_deputy[deputy_id]:
+                deleter.add(message)
+        else:
+            logger.error(
+                "message_processing_failed",
+                deputy_id=deputy_id,
+                status=result.status,
+                error=result.error,
+            )
+
+
+async def handle_invalidation(message, entity: str, ids: List[int], deleter):
+    """Rebuild the proposals that depend on the changed entity rows."""
+    if entity not in DEPENDENCIES:
+        # Redelivery cannot make it valid
+        logger.warning(
+            "invalid_message_body",
+            message_id=message.get("MessageId"),
+            entity=entity,
+        )
+        deleter.add(message)
+        return
+    try:
+        await invalidate_dependents(entity, ids)
+    except Exception as e:
+        logger.exception(
+            "message_processing_failed", entity=entity, ids=ids, error=str(e)
+        )
+        return
+    deleter.add(message)
+
+
+async def run_invalidation(
+    message,
+    invalidation: Tuple[str, List[int]],
+    deleter: "DeleteBatcher",
+    leases: VisibilityLeaseManager,
+    slots: asyncio.Semaphore,
+):
+    """
+    Handle one invalidation message as its own task. It may rebuild
+    thousands of proposals with pauses in between, so it takes one of the
+    MAX_CONCURRENT_INVALIDATIONS slots instead of a micro-batch slot and
+    never delays the proposals received with it.
+    """
+    acks = AckCounter(deleter)
+    try:
+        async with slots:
+            await handle_invalidation(message, *invalidation, acks)
+    finally:
+        metrics.messages_processed.inc(acks.acked, label_value="succeeded")
+        metrics.messages_processed.inc(1 - acks.acked, label_value="failed")
+        leases.release(message)
+
+
+async def handle_follows_change(message, user_id: int, deleter):
+    """
+    Hand a user whose follows changed to the notifier process, which holds
+    the follower index and re-indexes queued users before every sweep.
+    The notifier runs on a single replica, so every replica queues the
+    change whether or not it runs the notifier itself.
+    """
+    from src.workers.notify_followers import queue_follows_change
+
+    try:
+        await queue_follows_change(user_id)
+    except Exception as e:
+        logger.exception("message_processing_failed", user_id=user_id, error=str(e))
+        return
+    deleter.add(message)
+
+
+class AckCounter:
+    """Forwards acknowledged messages to a DeleteBatcher and counts them."""
+
+    __slots__ = ("deleter", "acked")
+
+    def __init__(self, deleter: "DeleteBatcher"):
+        self.deleter = deleter
+        self.acked = 0
 
-        if not proposal_id:
-            logger.warning("invalid_message_body", message_id=message.get("MessageId"))
-            return False
+    def add(self, message):
+        self.acked += 1
+        self.deleter.add(message)
 
-        logger.info(f"Received proposal_id: {proposal_id}")
-        await serialized_proposal(proposal_id)
-        return True
 
+async def handle_batch(
+    messages: List[dict], deleter: "DeleteBatcher", leases: VisibilityLeaseManager
+):
+    """
+    Serialize each unique proposal of a batch once and acknowledge every
+    message it covers. Messages of failed proposals are left on the queue.
+    """
+    started = time.perf_counter()
+    acks = AckCounter(deleter)
+    try:
+        with profiling.profile(
+            "message_batch_profile",
+            message_ids=[message.get("MessageId") for message in messages],
+        ):
+            await _handle_batch(messages, acks)
+    finally:
+        metrics.batch_seconds.observe(time.perf_counter() - started)
+        metrics.messages_processed.inc(acks.acked, label_value="succeeded")
+        metrics.messages_processed.inc(len(messages) - acks.acked, label_value="failed")
+        for message in messages:
+            leases.release(message)
+
+
+async def _handle_batch(messages: List[dict], deleter: AckCounter):
+    by_proposal: Dict[int, List[dict]] = {}
+    by_deputy: Dict[int, List[dict]] = {}
+    for message in messages:
+        deputy_id = parse_deputy_id(message)
+        if deputy_id:
+            by_deputy.setdefault(deputy_id, []).append(message)
+            continue
+        user_id = parse_follows_change(message)
+        if user_id:
+            await handle_follows_change(message, user_id, deleter)
+            continue
+        proposal_id = parse_proposal_id(message)
+        if proposal_id:
+            by_proposal.setdefault(proposal_id, []).append(message)
+
+    if by_deputy:
+        await handle_deputies(by_deputy, deleter)
+    if not by_proposal:
+        return
+
+    metrics.batched_messages.inc(sum(len(m) for m in by_proposal.values()))
+    metrics.batched_proposals.inc(len(by_proposal))
+    logger.info("received_proposals", proposal_ids=list(by_proposal))
+
+    started = time.perf_counter()
+    try:
+        # A message may announce a bulk QuerySet.update() write, which moves
+        # no section watermark, so the proposals are rebuilt in full
+        results = await refresh_proposals_exclusive(
+            by_proposal.keys(), incremental=False
+        )
     except Exception as e:
         logger.exception("message_processing_failed", error=str(e))
-        return False
+        return
+    finally:
+        metrics.refresh_seconds.observe(time.perf_counter() - started)
+
+    for proposal_id, result in results.items():
+        # Deferred proposals are re-run by the replica holding their lease;
+        # deleted proposals have nothing left to refresh
+        if result.status in (
+            RESULT_OK,
+            RESULT_MISSING_DATA,
+            RESULT_NOT_FOUND,
+            RESULT_DEFERRED,
+        ):
+            for message in by_proposal[proposal_id]:
+                deleter.add(message)
+        else:
+            logger.error(
+                "message_processing_failed",
+                proposal_id=proposal_id,
+                status=result.status,
+                error=result.error,
+            )
+
+    logger.info(
+        "proposal_batch_processed",
+        messages=len(messages),
+        unique_proposals=len(by_proposal),
+        dedup_ratio=round(metrics.dedup_ratio(), 3),
+    )
+
+
+async def collect(queue: asyncio.Queue, first, max_size: int, window: float) -> list:
+    """
+    Start a batch with ``first`` and keep taking items from ``queue`` until
+    it holds ``max_size`` items or ``window`` seconds have passed.
+    A None sentinel ends the batch early and is put back for the next call.
+    """
+    batch = [first]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + window
+    while len(batch) < max_size:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            break
+        if item is None:
+            queue.put_nowait(None)
+            break
+        batch.append(item)
+    return batch
 
 
 async def poll_sqs_messages():
@@ -49,9 +328,9 @@ async def poll_sqs_messages():
     return await asyncio.to_thread(
         lambda: sqs.receive_message(
             QueueUrl=SQS_QUEUE_URL,
-            MaxNumberOfMessages=MAX_CONCURRENT_TASKS,
+            MaxNumberOfMessages=SQS_MAX_BATCH,
             WaitTimeSeconds=10,
-            VisibilityTimeout=60,
+            VisibilityTimeout=SQS_VISIBILITY_TIMEOUT,
         )
     )
 
@@ -60,38 +339,185 @@ async def delete_sqs_messages(entries):
     """Delete processed messages."""
     if not entries:
         return
-    await asyncio.to_thread(
+    response = await asyncio.to_thread(
         lambda: sqs.delete_message_batch(QueueUrl=SQS_QUEUE_URL, Entries=entries)
     )
+    for failure in response.get("Failed", []):
+        logger.warning(
+            "sqs_delete_failed",
+            message_id=failure.get("Id"),
+            code=failure.get("Code"),
+        )
 
 
-async def process_messages(shutdown_event: asyncio.Event):
+class DeleteBatcher:
     """
-    Continuously poll SQS and process messages concurrently,
-    logging only failures.
+    Collects receipts of processed messages and deletes them in batches of
+    up to 10, flushing a partial batch once it is SQS_DELETE_FLUSH_SECONDS old.
     """
+
+    def __init__(self, flush_seconds: float = SQS_DELETE_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self.entries: asyncio.Queue = asyncio.Queue()
+
+    def add(self, message):
+        self.entries.put_nowait(
+            {"Id": message["MessageId"], "ReceiptHandle": message["ReceiptHandle"]}
+        )
+
+    async def run(self):
+        """Flush loop; runs until cancelled, then flushes what is left."""
+        try:
+            while True:
+                first = await self.entries.get()
+                batch = await collect(
+                    self.entries, first, SQS_MAX_BATCH, self.flush_seconds
+                )
+                await self._flush(batch)
+        finally:
+            await self.drain()
+
+    async def drain(self):
+        """Delete every pending receipt immediately."""
+        batch = []
+        while not self.entries.empty():
+            batch.append(self.entries.get_nowait())
+            if len(batch) == SQS_MAX_BATCH:
+                await self._flush(batch)
+                batch = []
+        await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            await delete_sqs_messages(batch)
+        except Exception as e:
+            logger.exception("sqs_delete_error", error=str(e), count=len(batch))
+
+
+async def poll_loop(
+    queue: asyncio.Queue,
+    shutdown_event: asyncio.Event,
+    leases: VisibilityLeaseManager,
+):
+    """Long-poll SQS and feed received messages into the bounded queue."""
     while not shutdown_event.is_set():
         try:
             response = await poll_sqs_messages()
-            messages = response.get("Messages", [])
+        except Exception as e:
+            logger.exception("sqs_loop_error", error=str(e))
+            await asyncio.sleep(1)
+            continue
+
+        messages = response.get("Messages", [])
+        metrics.last_poll_timestamp.set(time.time())
+        metrics.messages_received.inc(len(messages))
 
-            if not messages:
-                await asyncio.sleep(1)
+        # Blocks while the queue is full, so we never hold more than
+        # SQS_BATCH_SIZE received-but-unstarted messages. Readiness does not
+        # count that wait against the poll age (see metrics_server). The
+        # pollers share the gauge, so each one only adds and removes itself.
+        for message in messages:
+            leases.track(message)
+            if not queue.full():
+                queue.put_nowait(message)
                 continue
+            metrics.poll_blocked.inc()
+            try:
+                await queue.put(message)
+            finally:
+                metrics.poll_blocked.dec()
+
+
+async def batch_loop(
+    queue: asyncio.Queue, deleter: DeleteBatcher, leases: VisibilityLeaseManager
+):
+    """
+    Cut the message stream into micro-batches (SQS_BATCH_SIZE messages or
+    SQS_BATCH_WINDOW_MS) and run up to MAX_CONCURRENT_BATCHES of them at once.
+    Invalidation messages are taken out of the batches and run as their own
+    tasks (see run_invalidation). Returns after the None sentinel, once
+    running batches and invalidations have finished.
+    """
+    slots = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    invalidation_slots = asyncio.Semaphore(MAX_CONCURRENT_INVALIDATIONS)
+    running = set()
+    invalidations = set()
+    metrics.batch_capacity.set(MAX_CONCURRENT_BATCHES)
+
+    def release(task):
+        running.discard(task)
+        slots.release()
+        metrics.batches_in_flight.set(len(running))
 
-            # process concurrently
-            results = await asyncio.gather(
-                *[handle_message(m) for m in messages], return_exceptions=True
+    while True:
+        first = await queue.get()
+        if first is None:
+            break
+        batch = []
+        for message in await collect(
+            queue, first, SQS_BATCH_SIZE, SQS_BATCH_WINDOW_SECONDS
+        ):
+            invalidation = parse_invalidation(message)
+            if invalidation is None:
+                batch.append(message)
+                continue
+            task = asyncio.create_task(
+                run_invalidation(
+                    message, invalidation, deleter, leases, invalidation_slots
+                )
             )
+            invalidations.add(task)
+            task.add_done_callback(invalidations.discard)
+        if not batch:
+            continue
 
-            delete_entries = [
-                {"Id": m["MessageId"], "ReceiptHandle": m["ReceiptHandle"]}
-                for m, result in zip(messages, results)
-                if result is True
-            ]
+        await slots.acquire()
+        task = asyncio.create_task(handle_batch(batch, deleter, leases))
+        running.add(task)
+        metrics.batches_in_flight.set(len(running))
+        task.add_done_callback(release)
 
-            if delete_entries:
-                await delete_sqs_messages(delete_entries)
+    await asyncio.gather(*running, *invalidations, return_exceptions=True)
 
-        except Exception as e:
-            logger.exception("sqs_loop_error", error=str(e))
+
+async def process_messages(shutdown_event: asyncio.Event):
+    """
+    Continuously poll SQS and process messages concurrently,
+    logging only failures.
+
+    Pollers feed a bounded queue that is cut into micro-batches; duplicate
+    proposal IDs inside a batch are serialized once through the batched
+    serializer and all their receipts acknowledged. A per-proposal Redis
+    lease keeps replicas from serializing the same proposal at once. Up to
+    MAX_CONCURRENT_BATCHES batches run at once, and a new batch starts as soon
+    as a slot frees up. Successful receipts are deleted in batches by
+    DeleteBatcher. Received messages keep their visibility extended by
+    VisibilityLeaseManager until their batch finishes. On shutdown, pollers
+    stop receiving and in-flight batches finish.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SQS_BATCH_SIZE)
+    deleter = DeleteBatcher()
+    deleter_task = asyncio.create_task(deleter.run())
+    leases = VisibilityLeaseManager(sqs, SQS_QUEUE_URL, SQS_VISIBILITY_TIMEOUT)
+    leases_task = asyncio.create_task(leases.run())
+
+    pollers = [
+        asyncio.create_task(poll_loop(queue, shutdown_event, leases))
+        for _ in range(SQS_POLLERS)
+    ]
+    batcher = asyncio.create_task(batch_loop(queue, deleter, leases))
+
+    try:
+        await asyncio.gather(*pollers)
+        await queue.put(None)
+        await batcher
+    finally:
+        for task in pollers:
+            task.cancel()
+        batcher.cancel()
+        deleter_task.cancel()
+        leases_task.cancel()
+        leases.stop()
+        await asyncio.gather(
+            *pollers, batcher, deleter_task, leases_task, return_exceptions=True
+        )
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+SQS_MAX_BATCH = 10  # change_message_visibility_batch hard limit
+
+
+class VisibilityLeaseManager:
+    """
+    Keeps in-flight SQS messages invisible while they are being handled.
+
+    Every tracked receipt handle is extended back to ``visibility_timeout``
+    seconds with change_message_visibility_batch shortly before it expires,
+    until it is released (handler finished) or the manager is stopped.
+    """
+
+    def __init__(
+        self,
+        client,
+        queue_url: str,
+        visibility_timeout: int,
+        heartbeat_seconds: Optional[float] = None,
+    ):
+        self.client = client
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_seconds = heartbeat_seconds or visibility_timeout / 3
+        # receipt handle -> (message id, loop time the visibility expires)
+        self.leases: Dict[str, tuple] = {}
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def track(self, message):
+        """Start extending a message received with ``visibility_timeout``."""
+        self.leases[message["ReceiptHandle"]] = (
+            message["MessageId"],
+            self._now() + self.visibility_timeout,
+        )
+
+    def release(self, message):
+        """Stop extending a message; its handler has finished."""
+        self.leases.pop(message["ReceiptHandle"], None)
+
+    def due(self) -> List[str]:
+        """Receipt handles that would expire before the next heartbeat + margin."""
+        horizon = self._now() + 2 * self.heartbeat_seconds
+        return [
+            receipt
+            for receipt, (_, expires_at) in self.leases.items()
+            if expires_at <= horizon
+        ]
+
+    async def extend(self, receipts: List[str]):
+        """Extend the given receipts, 10 per change_message_visibility_batch."""
+        for start in range(0, len(receipts), SQS_MAX_BATCH):
+            chunk = [
+                r for r in receipts[start : start + SQS_MAX_BATCH] if r in self.leases
+            ]
+            if not chunk:
+                continue
+            entries = [
+                {
+                    "Id": str(index),
+                    "ReceiptHandle": receipt,
+                    "VisibilityTimeout": self.visibility_timeout,
+                }
+                for index, receipt in enumerate(chunk)
+            ]
+            requested_at = self._now()
+            try:
+                response = await asyncio.to_thread(
+                    lambda: self.client.change_message_visibility_batch(
+                        QueueUrl=self.queue_url, Entries=entries
+                    )
+                )
+            except Exception as e:
+                logger.exception("sqs_visibility_extend_error", error=str(e))
+                continue
+
+            for success in response.get("Successful", []):
+                receipt = chunk[int(success["Id"])]
+                if receipt in self.leases:
+                    message_id, _ = self.leases[receipt]
+                    self.leases[receipt] = (
+                        message_id,
+                        requested_at + self.visibility_timeout,
+                    )
+            for failure in response.get("Failed", []):
+                # Usually an expired or already deleted receipt: stop trying.
+                message_id, _ = self.leases.pop(chunk[int(failure["Id"])], (None, None))
+                logger.warning(
+                    "sqs_visibility_extend_failed",
+                    message_id=message_id,
+                    code=failure.get("Code"),
+                )
+
+    async def run(self):
+        """Heartbeat loop; runs until cancelled."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            receipts = self.due()
+            if receipts:
+                await self.extend(receipts)
+
+    def stop(self):
+        """Forget every lease; nothing is extended after shutdown."""
+        self.leases.clear()
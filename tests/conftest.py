@@ -0,0 +1,127 @@
+"""
+Shared fixtures: an in-memory SQLite database with the schema of
+src.models, a fakeredis server behind src.redis.redis_client, a factory
+for proposals with their source rows, and a query counter built on
+src.profiling.
+"""
+
+import os
+from datetime import date, timedelta
+from itertools import count
+
+import fakeredis
+import pytest
+from tortoise import Tortoise
+
+from src import profiling
+from src.models import (
+    Deputy,
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    PolicyCategory,
+    ProcedureDocument,
+)
+from src.redis import redis_client
+
+# The worker modules create their boto3 clients on import
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+
+
+@pytest.fixture
+async def db():
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["src.models"]})
+    await Tortoise.generate_schemas()
+    yield
+    await Tortoise.close_connections()
+
+
+@pytest.fixture
+def fake_redis():
+    """redis_client connected to a fresh in-process fakeredis server."""
+    server = fakeredis.FakeServer()
+    redis_client.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    redis_client.raw = fakeredis.FakeAsyncRedis(server=server)
+    redis_client._scripts = {}
+    yield redis_client
+    redis_client.redis = redis_client.raw = None
+    redis_client._scripts = {}
+
+
+@pytest.fixture
+def queries(db):
+    """
+    profiling, installed on the test database: ``with queries.profile("x")
+    as profile`` counts the statements of the block in ``profile.queries``.
+    """
+    profiling.install()
+    yield profiling
+    profiling.uninstall()
+
+
+@pytest.fixture
+async def deputies(db):
+    return [await Deputy.create(name=f"Deputat {i}") for i in range(1, 7)]
+
+
+@pytest.fixture
+async def categories(db):
+    return [
+        await PolicyCategory.create(category_name=f"Categoria {i}") for i in range(1, 7)
+    ]
+
+
+@pytest.fixture
+def make_proposal(deputies, categories):
+    """
+    Factory of a proposal with ``procedures`` procedures (two documents
+    each), two consults, two initiators with two deputies each and two
+    summaries with two categories each. Returns the proposal.
+    """
+    numbers = count(1)
+
+    async def make(procedures: int = 3, consults: int = 2, **fields):
+        number = next(numbers)
+        proposal = await LegislativeProposal.create(
+            **{
+                "title": f"Propunere legislativă {number}",
+                "idp": number,
+                "first_chamber": "Senat",
+                "initiative": "Parlamentari",
+                **fields,
+            }
+        )
+        for i in range(procedures):
+            procedure = await LegislativeProcedure.create(
+                legislative_proposal=proposal,
+                date=date(2024, 1, 1) + timedelta(days=(i * 7) % 300),
+                action=f"Acțiune {i}",
+                chamber="CD",
+            )
+            for j in range(2):
+                await ProcedureDocument.create(
+                    legislative_procedure=procedure,
+                    name=f"Document {j}",
+                    link=f"https://www.cdep.ro/docs/{procedure.id}/{j}.pdf",
+                )
+        for i in range(consults):
+            await LegislativeConsult.create(
+                legislative_proposal=proposal,
+                name=f"Aviz {i}",
+                link=f"https://www.senat.ro/consult/{i}.pdf",
+            )
+        for i in range(2):
+            initiator = await LegislativeInitiator.create(
+                legislative_proposal=proposal, name=f"Inițiator {i}", is_main=i == 0
+            )
+            await initiator.deputies.add(*deputies[2 * i : 2 * i + 2])
+        for i in range(2):
+            summary = await LegislativeSummary.create(
+                legislative_proposal=proposal, summary=f"Rezumat {i}"
+            )
+            await summary.categories.add(*categories[2 * i : 2 * i + 2])
+        return proposal
+
+    return make
@@ -0,0 +1,85 @@
+import pytest
+
+from src.tasks.checkpoint import load_checkpoint
+from src.tasks.denorm_proposal import RESULT_ERROR
+from src.workers import change_capture
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """
+    Records the proposal IDs every pass refreshes; refreshes of the IDs in
+    ``refreshed.failing`` are reported as RESULT_ERROR.
+    """
+    calls = []
+    failing = set()
+    refresh = change_capture.refresh_proposals_exclusive
+
+    async def refresh_failing(ids):
+        calls.append(list(ids))
+        results = await refresh(ids)
+        for proposal_id in failing & set(results):
+            results[proposal_id].status = RESULT_ERROR
+        return results
+
+    monkeypatch.setattr(change_capture, "CHANGE_CAPTURE_LAG_SECONDS", 0)
+    monkeypatch.setattr(change_capture, "refresh_proposals_exclusive", refresh_failing)
+    refresh_failing.calls = calls
+    refresh_failing.failing = failing
+    return refresh_failing
+
+
+async def test_failed_refreshes_are_retried_on_the_next_pass(
+    db, fake_redis, make_proposal, refreshed
+):
+    edited, failing = await make_proposal(), await make_proposal()
+    assert await change_capture.capture_changes() == 0  # sets the watermarks
+
+    for proposal in (edited, failing):
+        proposal.title = "Titlu modificat"
+        await proposal.save()
+    refreshed.failing.add(failing.id)
+
+    assert await change_capture.capture_changes() == 2
+    assert await load_checkpoint(change_capture.RETRY_CHECKPOINT) == {
+        "proposal_ids": [failing.id]
+    }
+
+    refreshed.failing.clear()
+    assert await change_capture.capture_changes() == 1
+    assert refreshed.calls[-1] == [failing.id]
+    assert await load_checkpoint(change_capture.RETRY_CHECKPOINT) is None
+
+    assert await change_capture.capture_changes() == 0
+
+
+async def test_watermarks_advance_page_by_page(
+    db, fake_redis, make_proposal, refreshed
+):
+    proposals = [await make_proposal() for _ in range(3)]
+    assert await change_capture.capture_changes() == 0  # sets the watermarks
+    for proposal in proposals:
+        proposal.title = "Titlu modificat"
+        await proposal.save()
+
+    async def crash_on_third_page(ids):
+        if len(refreshed.calls) == 2:
+            raise RuntimeError("worker stopped")
+        refreshed.calls.append(list(ids))
+        return {}
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(
+            change_capture, "refresh_proposals_exclusive", crash_on_third_page
+        )
+        with pytest.raises(RuntimeError):
+            await change_capture.capture_changes(limit=1)
+
+    # The pages refreshed before the crash are not read again
+    assert refreshed.calls == [[proposals[0].id], [proposals[1].id]]
+    assert await change_capture.capture_changes(limit=1) == 1
+    assert refreshed.calls[-1] == [proposals[2].id]
+
+
+async def test_capture_sources_have_keyset_indexes(db):
+    assert await change_capture.missing_capture_indexes() == []
@@ -0,0 +1,42 @@
+from src.db import update_column
+from src.models import PolicyCategory
+
+
+async def test_update_column_sets_a_value_per_row(queries):
+    categories = [
+        await PolicyCategory.create(category_name=f"Categoria {i}") for i in range(4)
+    ]
+
+    with queries.profile("test_update") as profile:
+        await update_column(
+            PolicyCategory,
+            "id",
+            "category_name",
+            {categories[0].id: "Educație", categories[2].id: "Sănătate"},
+        )
+
+    assert profile.queries == 1
+    names = (
+        await PolicyCategory.all()
+        .order_by("id")
+        .values_list("category_name", flat=True)
+    )
+    assert names == ["Educație", "Categoria 1", "Sănătate", "Categoria 3"]
+
+
+async def test_update_column_chunks_rows(queries):
+    categories = [
+        await PolicyCategory.create(category_name=f"Categoria {i}") for i in range(5)
+    ]
+
+    with queries.profile("test_update") as profile:
+        await update_column(
+            PolicyCategory,
+            "id",
+            "category_name",
+            {category.id: f"Nume {category.id}" for category in categories},
+            chunk_size=2,
+        )
+
+    assert profile.queries == 3
+    assert await PolicyCategory.filter(category_name__startswith="Nume").count() == 5
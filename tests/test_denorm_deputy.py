@@ -0,0 +1,172 @@
+import json
+from datetime import date
+
+from src import metrics
+from src.models import CdePCommittee, Deputy, LegislativeInitiator
+from src.models.committee import CommitteeMembership
+from src.models.deputy import DeputyDenorm
+from src.tasks import denorm_deputy
+from src.tasks.denorm_deputy import (
+    UNKNOWN,
+    build_deputy_payload,
+    deputy_cache_key,
+    deputy_checksum_key,
+    persist_deputies,
+    rebuild_deputies,
+    refresh_deputies,
+    serialize_deputies,
+)
+from src.tasks.denorm_proposal import (
+    DENORM_CREATED,
+    DENORM_UNCHANGED,
+    DENORM_UPDATED,
+    RESULT_NOT_FOUND,
+)
+
+
+def _membership(id, committee_id, position="membru"):
+    return {
+        "id": id,
+        "committee_id": committee_id,
+        "position": position,
+        "committee__committeeId": f"C{committee_id}",
+        "committee__name": f"Comisia {committee_id}",
+        "committee__chamber": "CD",
+        "committee__type": "permanentă",
+        "committee__legislature": "2020",
+    }
+
+
+async def _committee_seat(deputy, number, position):
+    committee = await CdePCommittee.create(
+        name=f"Comisia {number}", committeeId=f"C{number}", chamber="CD"
+    )
+    await CommitteeMembership.create(
+        deputy=deputy, committee=committee, position=position
+    )
+
+
+def test_build_deputy_payload_pages_and_counts_proposals(monkeypatch):
+    monkeypatch.setattr(denorm_deputy, "DEPUTY_PROPOSALS_PAGE_SIZE", 2)
+    deputy = Deputy(id=7, name="Ana Ionescu", birthday=date(1970, 5, 1))
+    proposals = [
+        {"proposal_id": 3, "status": "adoptată", "year_issue": 2023},
+        {"proposal_id": 9, "status": "adoptată", "year_issue": 2024},
+        {"proposal_id": 5, "status": None, "year_issue": None},
+    ]
+
+    payload = build_deputy_payload(
+        deputy, [_membership(2, 8), _membership(1, 4, "președinte")], proposals
+    )
+
+    assert payload["deputy_id"] == 7
+    assert payload["birthday"] == "1970-05-01"
+    assert payload["member_from"] is None
+    assert [c["id"] for c in payload["committees"]] == [4, 8]
+    assert payload["committees"][0]["position"] == "președinte"
+    assert payload["initiated_proposals"] == {
+        "total": 3,
+        "page_size": 2,
+        "pages": [[9, 5], [3]],
+        "by_status": {"adoptată": 2, UNKNOWN: 1},
+        "by_year": {"2023": 1, "2024": 1, UNKNOWN: 1},
+    }
+
+
+async def test_serialize_deputies_query_count_does_not_grow_with_batch_size(
+    queries, deputies, make_proposal
+):
+    for _ in range(3):
+        await make_proposal()
+    for i, deputy in enumerate(deputies):
+        await _committee_seat(deputy, i, "membru")
+
+    with queries.profile("test_single") as single:
+        await serialize_deputies([deputies[0].id])
+    with queries.profile("test_batch") as batch:
+        results = await serialize_deputies([deputy.id for deputy in deputies])
+
+    assert all(result.ok for result in results.values())
+    assert batch.queries == single.queries
+
+
+async def test_serialize_deputies_dedupes_proposals_and_reports_unknown(
+    db, deputies, make_proposal
+):
+    proposal = await make_proposal()
+    # The first deputy also sits on the second initiator of the proposal
+    second = await LegislativeInitiator.filter(legislative_proposal=proposal).order_by(
+        "-id"
+    )
+    await second[0].deputies.add(deputies[0])
+    await _committee_seat(deputies[0], 1, "secretar")
+
+    results = await serialize_deputies([deputies[0].id, 999, deputies[0].id])
+
+    assert list(results) == [deputies[0].id, 999]
+    assert results[999].status == RESULT_NOT_FOUND
+    payload = results[deputies[0].id].payload
+    assert payload["initiated_proposals"]["pages"] == [[proposal.id]]
+    assert [c["position"] for c in payload["committees"]] == ["secretar"]
+    assert json.loads(results[deputies[0].id].encoded) == payload
+
+
+async def test_refresh_deputies_creates_then_skips_unchanged_then_updates(
+    monkeypatch, fake_redis, deputies, make_proposal
+):
+    monkeypatch.setattr(metrics.deputy_denorm_outcomes, "values", {})
+    await make_proposal()
+    ids = [deputy.id for deputy in deputies[:3]]
+
+    first = await refresh_deputies(ids)
+    for deputy_id in ids:
+        stored = await DeputyDenorm.get(deputy_id=deputy_id)
+        assert stored.payload == first[deputy_id].payload
+        assert stored.checksum == first[deputy_id].checksum
+        assert await fake_redis.raw.get(deputy_cache_key(deputy_id)) == (
+            first[deputy_id].encoded
+        )
+        assert await fake_redis.redis.get(deputy_checksum_key(deputy_id)) == (
+            first[deputy_id].checksum
+        )
+
+    results = await serialize_deputies(ids)
+    assert await persist_deputies(list(results.values())) == {
+        deputy_id: DENORM_UNCHANGED for deputy_id in ids
+    }
+
+    await Deputy.filter(id=ids[1]).update(group="Independent")
+    results = await serialize_deputies(ids)
+    outcomes = await persist_deputies(list(results.values()))
+
+    assert outcomes == {
+        ids[0]: DENORM_UNCHANGED,
+        ids[1]: DENORM_UPDATED,
+        ids[2]: DENORM_UNCHANGED,
+    }
+    stored = await DeputyDenorm.get(deputy_id=ids[1])
+    assert stored.payload["group"] == "Independent"
+    assert metrics.deputy_denorm_outcomes.values == {
+        DENORM_CREATED: 3,
+        DENORM_UNCHANGED: 5,
+        DENORM_UPDATED: 1,
+    }
+
+
+async def test_force_skips_the_cache_check_but_not_the_stored_checksum(
+    fake_redis, deputies
+):
+    ids = [deputy.id for deputy in deputies[:2]]
+    await refresh_deputies(ids)
+
+    results = await serialize_deputies(ids)
+    outcomes = await persist_deputies(list(results.values()), force=True)
+
+    assert outcomes == {deputy_id: DENORM_UNCHANGED for deputy_id in ids}
+
+
+async def test_rebuild_deputies_walks_every_deputy_in_chunks(fake_redis, deputies):
+    summary = await rebuild_deputies(chunk_size=4)
+
+    assert summary == {"processed": len(deputies), "failed": 0}
+    assert await DeputyDenorm.all().count() == len(deputies)
@@ -0,0 +1,83 @@
+from src.models import (
+    LegislativeConsult,
+    LegislativeProposal,
+    LegislativeProposalDenorm,
+)
+from src.tasks.denorm_proposal import (
+    PROPOSAL_PREFETCH,
+    RESULT_MISSING_DATA,
+    RESULT_NOT_FOUND,
+    build_proposal_payload,
+    refresh_proposals,
+    serialize_proposals,
+)
+
+
+async def _count_queries(queries, ids):
+    with queries.profile("test_serialize") as profile:
+        results = await serialize_proposals(ids)
+    return profile.queries, results
+
+
+async def test_query_count_does_not_grow_with_procedures(queries, make_proposal):
+    small = await make_proposal(procedures=1)
+    large = await make_proposal(procedures=85)
+
+    small_queries, small_results = await _count_queries(queries, [small.id])
+    large_queries, large_results = await _count_queries(queries, [large.id])
+
+    assert small_results[small.id].ok
+    assert len(large_results[large.id].payload["procedures"]) == 85
+    assert small_queries == large_queries
+
+
+async def test_query_count_does_not_grow_with_batch_size(queries, make_proposal):
+    proposals = [await make_proposal(procedures=i % 5 + 1) for i in range(12)]
+
+    single_queries, _ = await _count_queries(queries, [proposals[0].id])
+    batch_queries, results = await _count_queries(queries, [p.id for p in proposals])
+
+    assert all(result.ok for result in results.values())
+    assert batch_queries == single_queries
+
+
+async def test_build_proposal_payload_runs_no_queries(queries, make_proposal):
+    proposal = await make_proposal(procedures=5)
+    prefetched = await LegislativeProposal.get(id=proposal.id).prefetch_related(
+        *PROPOSAL_PREFETCH
+    )
+
+    with queries.profile("test_build") as profile:
+        payload = build_proposal_payload(prefetched)
+
+    assert profile.queries == 0
+    assert payload == (await serialize_proposals([proposal.id]))[proposal.id].payload
+
+
+async def test_missing_and_unknown_proposals(db, make_proposal):
+    without_consults = await make_proposal(consults=0)
+
+    results = await serialize_proposals([without_consults.id, 999])
+
+    assert results[without_consults.id].status == RESULT_MISSING_DATA
+    assert results[999].status == RESULT_NOT_FOUND
+
+
+async def test_touched_rows_update_section_metadata_in_one_statement(
+    queries, fake_redis, make_proposal
+):
+    proposals = [await make_proposal() for _ in range(5)]
+    ids = [proposal.id for proposal in proposals]
+    await refresh_proposals(ids, force=True)
+    for consult in await LegislativeConsult.filter(legislative_proposal_id__in=ids):
+        await consult.save()
+
+    with queries.profile("test_refresh") as profile:
+        results = await refresh_proposals(ids)
+
+    assert all(result.sections_dirty for result in results.values())
+    assert profile.stage_queries["db_upsert"] == 1
+    for denorm in await LegislativeProposalDenorm.filter(proposal_id__in=ids):
+        assert denorm.sections == results[denorm.proposal_id].sections
+    rerun = await serialize_proposals(ids, incremental=True)
+    assert all(result.rebuilt_sections == [] for result in rerun.values())
@@ -0,0 +1,91 @@
+import logging
+import queue
+import threading
+import time
+
+import pytest
+import structlog
+
+from src import metrics
+from src.middleware.logging import BoundedQueueHandler, EventSampler
+
+
+@pytest.fixture(autouse=True)
+def dropped(monkeypatch):
+    monkeypatch.setattr(metrics.dropped_log_events, "values", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def _kept(sampler, method_name, event, times=1):
+    kept = 0
+    for _ in range(times):
+        try:
+            sampler(None, method_name, {"event": event})
+            kept += 1
+        except structlog.DropEvent:
+            pass
+    return kept
+
+
+def _record(level):
+    return logging.LogRecord("atlas", level, __file__, 1, "message", None, None)
+
+
+def test_sampler_keeps_the_configured_share_of_an_event(monkeypatch):
+    draws = iter([0.05, 0.5, 0.09, 0.99])
+    monkeypatch.setattr("random.random", lambda: next(draws))
+    sampler = EventSampler({"cached_proposal_redis": 0.1}, per_second=0)
+
+    assert _kept(sampler, "info", "cached_proposal_redis", times=4) == 2
+    assert _kept(sampler, "info", "other_event", times=10) == 10
+    assert metrics.dropped_log_events.get("cached_proposal_redis") == 2
+
+
+def test_sampler_rate_limits_each_event_type(clock):
+    sampler = EventSampler({}, per_second=3)
+
+    assert _kept(sampler, "info", "no_change_detected", times=5) == 3
+    assert _kept(sampler, "debug", "proposal_saved", times=5) == 3
+    assert metrics.dropped_log_events.get("no_change_detected") == 2
+
+    # The bucket refills at per_second tokens a second, up to one second's worth
+    clock[0] += 0.5
+    assert _kept(sampler, "info", "no_change_detected", times=5) == 1
+    clock[0] += 10
+    assert _kept(sampler, "info", "no_change_detected", times=5) == 3
+
+
+@pytest.mark.parametrize("method_name", ["warning", "error", "exception", "critical"])
+def test_sampler_never_drops_warnings_or_errors(clock, method_name):
+    sampler = EventSampler({"sqs_loop_error": 0.0}, per_second=1)
+
+    assert _kept(sampler, method_name, "sqs_loop_error", times=50) == 50
+    assert metrics.dropped_log_events.value == 0
+
+
+def test_full_log_queue_drops_info_and_keeps_warnings():
+    records = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(records)
+
+    for _ in range(3):
+        handler.handle(_record(logging.INFO))
+    handler.handle(_record(logging.DEBUG))
+    assert records.qsize() == 2
+    assert metrics.dropped_log_events.get("queue_full") == 2
+
+    # A warning waits for the writer thread to make room
+    writer = threading.Thread(target=handler.handle, args=(_record(logging.WARNING),))
+    writer.start()
+    writer.join(0.05)
+    assert writer.is_alive()
+    records.get_nowait()
+    writer.join(1)
+    assert not writer.is_alive()
+    assert [r.levelno for r in list(records.queue)] == [logging.INFO, logging.WARNING]
+    assert metrics.dropped_log_events.get("queue_full") == 2
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+from src import metrics, metrics_server
+from src.workers import update_proposal
+from src.workers.visibility import VisibilityLeaseManager
+
+
+@pytest.fixture
+def poll_gauges(monkeypatch):
+    monkeypatch.setattr(metrics.last_poll_timestamp, "values", {})
+    monkeypatch.setattr(metrics.poll_blocked, "values", {})
+
+
+async def _poll_check():
+    checks = await metrics_server.readiness(asyncio.Event())
+    assert checks["database"] is None and checks["redis"] is None
+    return checks["sqs_poll"]
+
+
+async def test_readiness_fails_on_a_stale_poll(db, fake_redis, poll_gauges):
+    metrics.last_poll_timestamp.set(time.time())
+    assert await _poll_check() is None
+
+    metrics.last_poll_timestamp.set(time.time() - 120)
+    assert "last successful poll" in await _poll_check()
+
+
+async def test_poller_waiting_on_a_full_queue_stays_ready(
+    monkeypatch, db, fake_redis, poll_gauges
+):
+    received = asyncio.Event()
+
+    async def poll_sqs_messages():
+        if received.is_set():
+            await asyncio.sleep(3600)
+        received.set()
+        return {
+            "Messages": [
+                {"MessageId": str(i), "ReceiptHandle": f"receipt-{i}", "Body": "{}"}
+                for i in range(3)
+            ]
+        }
+
+    monkeypatch.setattr(update_proposal, "poll_sqs_messages", poll_sqs_messages)
+    queue = asyncio.Queue(maxsize=1)
+    shutdown = asyncio.Event()
+    leases = VisibilityLeaseManager(None, "queue-url", 60)
+    poller = asyncio.create_task(update_proposal.poll_loop(queue, shutdown, leases))
+    try:
+        await received.wait()
+        await asyncio.sleep(0.01)
+        assert queue.full() and metrics.poll_blocked.get() == 1
+
+        # The last receive is long ago, but the poller is held up by the batches
+        metrics.last_poll_timestamp.set(time.time() - 120)
+        assert await _poll_check() is None
+
+        for _ in range(3):
+            queue.get_nowait()
+            await asyncio.sleep(0.01)
+        assert metrics.poll_blocked.get() == 0
+        assert "last successful poll" in await _poll_check()
+    finally:
+        shutdown.set()
+        poller.cancel()
+
+
+async def test_one_poller_does_not_clear_another_pollers_wait(
+    monkeypatch, db, fake_redis, poll_gauges
+):
+    polls = 0
+
+    async def poll_sqs_messages():
+        nonlocal polls
+        polls += 1
+        if polls > 2:
+            await asyncio.sleep(3600)
+        return {
+            "Messages": [
+                {"MessageId": f"{polls}-{i}", "ReceiptHandle": "r", "Body": "{}"}
+                for i in range(2)
+            ]
+        }
+
+    monkeypatch.setattr(update_proposal, "poll_sqs_messages", poll_sqs_messages)
+    queue = asyncio.Queue(maxsize=1)
+    shutdown = asyncio.Event()
+    leases = VisibilityLeaseManager(None, "queue-url", 60)
+    pollers = [
+        asyncio.create_task(update_proposal.poll_loop(queue, shutdown, leases))
+        for _ in range(2)
+    ]
+    try:
+        await asyncio.sleep(0.01)
+        assert metrics.poll_blocked.get() == 2
+
+        # One poller gets its messages in and goes back to SQS; the other
+        # still waits, so the process stays ready
+        queue.get_nowait()
+        await asyncio.sleep(0.01)
+        queue.get_nowait()
+        await asyncio.sleep(0.01)
+        assert metrics.poll_blocked.get() == 1
+        metrics.last_poll_timestamp.set(time.time() - 120)
+        assert await _poll_check() is None
+
+        queue.get_nowait()
+        await asyncio.sleep(0.01)
+        assert metrics.poll_blocked.get() == 0
+        assert "last successful poll" in await _poll_check()
+    finally:
+        shutdown.set()
+        for poller in pollers:
+            poller.cancel()
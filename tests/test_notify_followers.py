@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from src.models import CustomUser, LegislativeProposal, LegislativeProposalDenorm
+from src.tasks.denorm_proposal import refresh_proposals
+from src.workers import notify_followers, update_proposal
+
+
+class FakeSQS:
+    def __init__(self):
+        self.sent = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.sent.extend(json.loads(entry["MessageBody"]) for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+class Acks:
+    def __init__(self):
+        self.messages = []
+
+    def add(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    sqs = FakeSQS()
+    monkeypatch.setattr(notify_followers, "sqs", sqs)
+    monkeypatch.setattr(notify_followers, "NOTIFICATION_QUEUE_URL", "queue-url")
+    return sqs.sent
+
+
+@pytest.fixture
+async def follower(db, deputies):
+    return await CustomUser.create(
+        email="ana@example.com",
+        first_name="Ana",
+        last_name="Popescu",
+        followed_deputies=[deputies[0].id],
+    )
+
+
+@pytest.fixture
+async def index(follower):
+    index = notify_followers.FollowerIndex()
+    await index.rebuild()
+    return index
+
+
+async def test_first_sweep_skips_rows_from_before_the_baseline(
+    fake_redis, make_proposal, follower, index, notifications
+):
+    proposals = [await make_proposal() for _ in range(3)]
+    await refresh_proposals([proposal.id for proposal in proposals], force=True)
+
+    assert await notify_followers.establish_baseline() == 3
+    assert await notify_followers.establish_baseline() is None
+    report = await notify_followers.sweep_unnotified(index)
+
+    assert report["proposals"] == 0
+    assert notifications == []
+
+    # A payload changed after the baseline is notified
+    proposal = await LegislativeProposal.get(id=proposals[1].id)
+    proposal.title = "Titlu modificat"
+    await proposal.save()
+    await refresh_proposals([proposal.id])
+    await notify_followers.sweep_unnotified(index)
+
+    assert notifications == [
+        {
+            "type": "proposal_update",
+            "proposal_id": proposal.id,
+            "user_ids": [follower.id],
+        }
+    ]
+    assert not await LegislativeProposalDenorm.filter(notified=False).exists()
+
+
+@pytest.mark.parametrize("notifier_enabled", [True, False])
+async def test_follows_changes_reach_the_notifier_process(
+    monkeypatch, fake_redis, deputies, follower, index, notifier_enabled
+):
+    # The receiving replica need not run the notifier itself
+    monkeypatch.setattr(notify_followers, "NOTIFY_FOLLOWERS_ENABLED", notifier_enabled)
+    deleter = Acks()
+    follower.followed_deputies = [deputies[1].id]
+    await follower.save()
+
+    # The receiving process has no index; the message is acked once queued
+    await update_proposal.handle_follows_change("message", follower.id, deleter)
+    assert deleter.messages == ["message"]
+
+    assert await notify_followers.apply_follows_changes(index) == 1
+    assert await notify_followers.apply_follows_changes(index) == 0
+    assert index.by_deputy[deputies[0].id] == set()
+    assert index.by_deputy[deputies[1].id] == {follower.id}
+
+
+async def test_follows_changes_are_requeued_when_reindexing_fails(
+    monkeypatch, fake_redis, follower, index
+):
+    async def fail(user_id):
+        raise RuntimeError("database unavailable")
+
+    await notify_followers.queue_follows_change(follower.id)
+    monkeypatch.setattr(index, "update_user", fail)
+    with pytest.raises(RuntimeError):
+        await notify_followers.apply_follows_changes(index)
+
+    monkeypatch.undo()
+    assert await notify_followers.apply_follows_changes(index) == 1
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from src.tasks import proposal_lease
+from src.tasks.denorm_proposal import RESULT_OK, ProposalResult
+from src.tasks.proposal_lease import RESULT_DEFERRED, run_exclusive
+
+TTL_MS = 150
+
+
+def _work(calls, delay: float = 0.0):
+    """Work that records the IDs it runs on and takes ``delay`` seconds."""
+
+    async def work(ids):
+        calls.append(list(ids))
+        await asyncio.sleep(delay)
+        return {pid: ProposalResult(pid, RESULT_OK) for pid in ids}
+
+    return work
+
+
+async def _hold(ids, token: str = "crashed"):
+    acquired = await proposal_lease.redis_client.acquire_leases(
+        proposal_lease._lease_keys(ids), token, TTL_MS
+    )
+    assert all(acquired)
+
+
+async def test_leases_of_a_crashed_holder_expire(fake_redis):
+    calls = []
+    await _hold([1, 2])
+
+    results = await run_exclusive([1, 2], _work(calls), TTL_MS)
+    assert {r.status for r in results.values()} == {RESULT_DEFERRED}
+    assert calls == []
+
+    await asyncio.sleep(TTL_MS * 2 / 1000)
+    results = await run_exclusive([1, 2], _work(calls), TTL_MS)
+    assert {r.status for r in results.values()} == {RESULT_OK}
+    assert calls == [[1, 2]]
+
+
+async def test_leases_are_renewed_while_a_batch_runs(fake_redis):
+    calls = []
+    holder = asyncio.create_task(
+        run_exclusive([1], _work(calls, delay=TTL_MS * 4 / 1000), TTL_MS)
+    )
+    await asyncio.sleep(TTL_MS * 3 / 1000)
+
+    # Past the TTL, the lease is still held: the second call is deferred and
+    # the holder re-runs the proposal once it is done
+    results = await run_exclusive([1], _work(calls), TTL_MS)
+    assert results[1].status == RESULT_DEFERRED
+
+    assert (await holder)[1].status == RESULT_OK
+    assert calls == [[1], [1]]
+    assert not await fake_redis.redis.exists(proposal_lease.proposal_lease_key(1))
+
+
+async def test_waiting_callers_run_after_the_holder(monkeypatch, fake_redis):
+    monkeypatch.setattr(proposal_lease, "PROPOSAL_LEASE_RETRY_SECONDS", 0.01)
+    holder_calls, waiter_calls = [], []
+    holder = asyncio.create_task(
+        run_exclusive([1], _work(holder_calls, delay=0.1), TTL_MS)
+    )
+    await asyncio.sleep(0.02)
+
+    results = await run_exclusive([1, 2], _work(waiter_calls), TTL_MS, wait=True)
+    await holder
+
+    assert {r.status for r in results.values()} == {RESULT_OK}
+    assert waiter_calls == [[2], [1]]
+    # A waiting caller does not ask the holder for a re-run
+    assert holder_calls == [[1]]
+
+
+@pytest.mark.parametrize("wait", [False, True])
+async def test_leases_are_released_when_the_work_fails(fake_redis, wait):
+    async def fail(ids):
+        raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError):
+        await run_exclusive([1], fail, TTL_MS, wait=wait)
+    assert not await fake_redis.redis.exists(proposal_lease.proposal_lease_key(1))
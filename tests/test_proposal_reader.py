@@ -0,0 +1,204 @@
+import asyncio
+import time
+
+import pytest
+
+from src import metrics
+from src.models import LegislativeProposalDenorm
+from src.proposal_reader import (
+    _MISSING,
+    TIER_COALESCED,
+    TIER_DB,
+    TIER_MEMORY,
+    TIER_MISS,
+    TIER_REDIS,
+    TIER_SERIALIZED,
+    LRUCache,
+    ProposalReader,
+)
+from src.tasks.denorm_proposal import proposal_cache_key, refresh_proposals
+
+
+@pytest.fixture(autouse=True)
+def lookups(monkeypatch):
+    monkeypatch.setattr(metrics.reader_lookups, "values", {})
+    return metrics.reader_lookups
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def _gated_load(monkeypatch, reader, fail=None):
+    """Make ``reader._load`` wait for the returned event; record its calls."""
+    gate = asyncio.Event()
+    calls = []
+    load = reader._load
+
+    async def gated(ids):
+        calls.append(list(ids))
+        await gate.wait()
+        if fail:
+            raise fail
+        return await load(ids)
+
+    monkeypatch.setattr(reader, "_load", gated)
+    return gate, calls
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    assert cache.get(1) == {"id": 1}
+
+    cache.set(3, {"id": 3})
+
+    assert cache.get(2) is _MISSING
+    assert list(cache.entries) == [1, 3]
+
+
+def test_lru_entries_expire_after_their_ttl(clock):
+    cache = LRUCache(max_size=10, ttl=60)
+    cache.set(1, {"id": 1})
+    cache.set(2, None, ttl=5)
+
+    clock[0] += 10
+    assert cache.get(1) == {"id": 1}
+    assert cache.get(2) is _MISSING
+
+    clock[0] += 60
+    assert cache.get(1) is _MISSING
+    assert not cache.entries
+
+
+async def test_lookups_fall_back_from_redis_to_db_to_serialize(
+    fake_redis, make_proposal, lookups
+):
+    cached, stored, fresh = [await make_proposal() for _ in range(3)]
+    expected = await refresh_proposals([cached.id, stored.id, fresh.id], force=True)
+    await fake_redis.raw.delete(
+        proposal_cache_key(stored.id), proposal_cache_key(fresh.id)
+    )
+    await LegislativeProposalDenorm.filter(proposal_id=fresh.id).delete()
+    unknown = fresh.id + 1000
+    reader = ProposalReader()
+
+    found = await reader.get_proposals([cached.id, stored.id, fresh.id, unknown])
+
+    assert found == {
+        cached.id: expected[cached.id].payload,
+        stored.id: expected[stored.id].payload,
+        fresh.id: expected[fresh.id].payload,
+        unknown: None,
+    }
+    assert lookups.values == {
+        TIER_REDIS: 1,
+        TIER_DB: 1,
+        TIER_SERIALIZED: 1,
+        TIER_MISS: 1,
+    }
+    # The DB row was copied back into Redis, the serialized one persisted
+    assert await fake_redis.raw.get(proposal_cache_key(stored.id))
+    assert await LegislativeProposalDenorm.filter(proposal_id=fresh.id).exists()
+
+    assert await reader.get_proposals([cached.id, unknown]) == {
+        cached.id: expected[cached.id].payload,
+        unknown: None,
+    }
+    assert lookups.get(TIER_MEMORY) == 2
+
+
+async def test_concurrent_misses_share_one_load(
+    monkeypatch, fake_redis, make_proposal, lookups
+):
+    first, second = [await make_proposal() for _ in range(2)]
+    await refresh_proposals([first.id, second.id], force=True)
+    reader = ProposalReader()
+    gate, calls = _gated_load(monkeypatch, reader)
+
+    leader = asyncio.create_task(reader.get_proposals([first.id, second.id]))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(reader.get_proposal(first.id)),
+        asyncio.create_task(reader.get_proposals([second.id, first.id])),
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    found, one, both = await asyncio.gather(leader, *waiters)
+
+    assert calls == [[first.id, second.id]]
+    assert one == found[first.id]
+    assert both == found
+    assert lookups.get(TIER_COALESCED) == 3
+    assert not reader._inflight
+
+
+async def test_failed_load_fails_its_waiters_and_is_not_cached(
+    monkeypatch, fake_redis, make_proposal
+):
+    proposal = await make_proposal()
+    reader = ProposalReader()
+    gate, calls = _gated_load(monkeypatch, reader, fail=ConnectionError("down"))
+
+    leader = asyncio.create_task(reader.get_proposal(proposal.id))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(reader.get_proposal(proposal.id))
+    await asyncio.sleep(0)
+    gate.set()
+
+    for task in (leader, waiter):
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(task, 1)
+    assert calls == [[proposal.id]]
+    assert not reader._inflight
+
+    monkeypatch.undo()
+    assert (await reader.get_proposal(proposal.id))["proposal"]["title"]
+
+
+async def test_cancelled_leader_hands_the_load_to_its_waiters(
+    monkeypatch, fake_redis, make_proposal
+):
+    proposal = await make_proposal()
+    reader = ProposalReader()
+    gate, calls = _gated_load(monkeypatch, reader)
+
+    leader = asyncio.create_task(reader.get_proposal(proposal.id))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(reader.get_proposal(proposal.id))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    gate.set()
+
+    payload = await asyncio.wait_for(waiter, 1)
+
+    assert leader.cancelled()
+    assert payload["proposal"]["title"]
+    assert calls == [[proposal.id], [proposal.id]]
+
+
+async def test_cancelled_waiter_does_not_cancel_the_shared_load(
+    monkeypatch, fake_redis, make_proposal
+):
+    proposal = await make_proposal()
+    reader = ProposalReader()
+    gate, calls = _gated_load(monkeypatch, reader)
+
+    leader = asyncio.create_task(reader.get_proposal(proposal.id))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(reader.get_proposal(proposal.id)) for _ in range(2)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    gate.set()
+
+    payload = await asyncio.wait_for(leader, 1)
+
+    assert await asyncio.wait_for(waiters[1], 1) == payload
+    assert waiters[0].cancelled()
+    assert calls == [[proposal.id]]
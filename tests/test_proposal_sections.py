@@ -0,0 +1,142 @@
+from datetime import date
+
+import pytest
+
+from src.models import (
+    Deputy,
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    PolicyCategory,
+    ProcedureDocument,
+)
+from src.tasks.denorm_proposal import save_proposals_to_db, serialize_proposals
+
+
+async def _edit_title(proposal):
+    proposal.title = "Titlu modificat"
+    await proposal.save()
+
+
+async def _add_procedure(proposal):
+    await LegislativeProcedure.create(
+        legislative_proposal=proposal,
+        date=date(2025, 3, 1),
+        action="Adoptată de Senat",
+        chamber="S",
+    )
+
+
+async def _delete_document(proposal):
+    procedure = await LegislativeProcedure.filter(legislative_proposal=proposal).first()
+    document = await ProcedureDocument.filter(legislative_procedure=procedure).first()
+    await document.delete()
+
+
+async def _delete_consult(proposal):
+    consult = await LegislativeConsult.filter(legislative_proposal=proposal).first()
+    await consult.delete()
+
+
+async def _add_initiator_deputy(proposal):
+    initiator = await LegislativeInitiator.filter(legislative_proposal=proposal).first()
+    await initiator.deputies.add(await Deputy.create(name="Deputat nou"))
+
+
+async def _swap_initiator_deputies(proposal):
+    first, second = await LegislativeInitiator.filter(
+        legislative_proposal=proposal
+    ).order_by("id")
+    first_deputies = list(await first.deputies.all())
+    second_deputies = list(await second.deputies.all())
+    await first.deputies.clear()
+    await second.deputies.clear()
+    await first.deputies.add(*second_deputies)
+    await second.deputies.add(*first_deputies)
+
+
+async def _move_category_to_latest_summary(proposal):
+    older, latest = await LegislativeSummary.filter(
+        legislative_proposal=proposal
+    ).order_by("id")
+    category = (await older.categories.all().order_by("id"))[0]
+    await older.categories.remove(category)
+    await latest.categories.add(category)
+
+
+async def _swap_summary_categories(proposal):
+    older, latest = await LegislativeSummary.filter(
+        legislative_proposal=proposal
+    ).order_by("id")
+    older_categories = list(await older.categories.all())
+    latest_categories = list(await latest.categories.all())
+    await older.categories.clear()
+    await latest.categories.clear()
+    await older.categories.add(*latest_categories)
+    await latest.categories.add(*older_categories)
+
+
+async def _add_summary_category(proposal):
+    latest = (
+        await LegislativeSummary.filter(legislative_proposal=proposal)
+        .order_by("-id")
+        .first()
+    )
+    await latest.categories.add(
+        await PolicyCategory.create(category_name="Categorie nouă")
+    )
+
+
+async def _touch_rows(proposal):
+    # updated_at moves, content does not
+    await (
+        await LegislativeConsult.filter(legislative_proposal=proposal).first()
+    ).save()
+
+
+CHANGES = [
+    _edit_title,
+    _add_procedure,
+    _delete_document,
+    _delete_consult,
+    _add_initiator_deputy,
+    _swap_initiator_deputies,
+    _move_category_to_latest_summary,
+    _swap_summary_categories,
+    _add_summary_category,
+    _touch_rows,
+]
+
+
+@pytest.mark.parametrize("change", CHANGES, ids=lambda change: change.__name__[1:])
+async def test_incremental_build_matches_full_build(db, make_proposal, change):
+    proposals = [await make_proposal(procedures=4) for _ in range(3)]
+    ids = [proposal.id for proposal in proposals]
+    await save_proposals_to_db(list((await serialize_proposals(ids)).values()))
+
+    await change(await LegislativeProposal.get(id=ids[1]))
+
+    full = await serialize_proposals(ids)
+    incremental = await serialize_proposals(ids, incremental=True)
+    for proposal_id in ids:
+        assert incremental[proposal_id].ok
+        assert incremental[proposal_id].checksum == full[proposal_id].checksum
+        assert (
+            incremental[proposal_id].encoded_payload()
+            == full[proposal_id].encoded_payload()
+        )
+        assert incremental[proposal_id].sections == full[proposal_id].sections
+
+
+async def test_unchanged_proposals_rebuild_no_section(db, make_proposal):
+    proposal = await make_proposal()
+    await save_proposals_to_db(
+        list((await serialize_proposals([proposal.id])).values())
+    )
+
+    result = (await serialize_proposals([proposal.id], incremental=True))[proposal.id]
+
+    assert result.rebuilt_sections == []
+    assert not result.sections_dirty
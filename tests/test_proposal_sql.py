@@ -0,0 +1,111 @@
+import pytest
+
+from src.models import (
+    LegislativeConsult,
+    LegislativeInitiator,
+    LegislativeProcedure,
+    LegislativeProposal,
+    LegislativeSummary,
+    ProcedureDocument,
+)
+from src.tasks.denorm_proposal import (
+    RESULT_MISSING_DATA,
+    RESULT_NOT_FOUND,
+    RESULT_OK,
+    serialize_proposals,
+)
+from src.tasks.proposal_sql import check_sql_parity, serialize_proposals_sql
+
+QUOTED = 'Lege "privind" l\'apă \\ taxe\n🇷🇴 — ășțîâ'
+
+
+async def _null_dates(proposal):
+    await LegislativeProcedure.filter(legislative_proposal=proposal).update(
+        date=None, termen=None
+    )
+
+
+async def _missing_summary(proposal):
+    await LegislativeSummary.filter(legislative_proposal=proposal).delete()
+
+
+async def _empty_summary(proposal):
+    await LegislativeSummary.filter(legislative_proposal=proposal).update(summary=None)
+
+
+async def _unicode_and_quotes(proposal):
+    await LegislativeProposal.filter(id=proposal.id).update(
+        title=QUOTED, status=QUOTED, deadline='termen: "30" de zile'
+    )
+    procedure = await LegislativeProcedure.filter(legislative_proposal=proposal).first()
+    await ProcedureDocument.filter(legislative_procedure=procedure).update(name=QUOTED)
+    await LegislativeConsult.filter(legislative_proposal=proposal).update(name=QUOTED)
+    await LegislativeInitiator.filter(legislative_proposal=proposal).update(
+        name=QUOTED, party="PSD'\"", photo_url=None
+    )
+
+
+async def _booleans(proposal):
+    await LegislativeProposal.filter(id=proposal.id).update(
+        active=False, published=True, senate_active=False, cdep_active=True
+    )
+    await LegislativeInitiator.filter(legislative_proposal=proposal).update(
+        is_main=True
+    )
+
+
+async def _null_fields(proposal):
+    await LegislativeProposal.filter(id=proposal.id).update(
+        idp=None, opinion=None, year_issue=None, status=None
+    )
+    procedures = LegislativeProcedure.filter(legislative_proposal=proposal)
+    await ProcedureDocument.filter(
+        legislative_procedure_id__in=await procedures.values_list("id", flat=True)
+    ).update(name=None, link=None)
+
+
+EDITS = {
+    "unchanged": None,
+    "null_dates": _null_dates,
+    "missing_summary": _missing_summary,
+    "empty_summary": _empty_summary,
+    "unicode_and_quotes": _unicode_and_quotes,
+    "booleans": _booleans,
+    "null_fields": _null_fields,
+}
+
+
+@pytest.mark.parametrize("edit", list(EDITS))
+async def test_sql_backend_matches_the_python_backend(make_proposal, edit):
+    proposal = await make_proposal()
+    if EDITS[edit]:
+        await EDITS[edit](proposal)
+
+    expected = (await serialize_proposals([proposal.id], backend="python"))[proposal.id]
+    actual = (await serialize_proposals_sql([proposal.id]))[proposal.id]
+
+    assert expected.status == actual.status == RESULT_OK
+    assert actual.payload == expected.payload
+    assert actual.encoded == expected.encoded
+    assert actual.checksum == expected.checksum
+    assert actual.sections == expected.sections
+
+
+async def test_sql_backend_reports_missing_and_unknown_proposals(make_proposal):
+    proposal = await make_proposal()
+    await LegislativeConsult.filter(legislative_proposal=proposal).delete()
+    unknown = proposal.id + 1000
+
+    results = await serialize_proposals_sql([proposal.id, unknown])
+
+    assert results[proposal.id].status == RESULT_MISSING_DATA
+    assert results[unknown].status == RESULT_NOT_FOUND
+
+
+async def test_check_sql_parity_walks_every_proposal(make_proposal):
+    proposals = [await make_proposal(procedures=i + 1) for i in range(3)]
+    await _null_dates(proposals[1])
+
+    report = await check_sql_parity(chunk_size=2)
+
+    assert report == {"checked": 3, "matched": 3, "mismatched": []}
@@ -0,0 +1,23 @@
+import pytest
+
+from src import redis as redis_module
+from src.redis import RedisClient
+from src.supervisor import REDIS_POOL_BUDGET, pool_share
+
+
+@pytest.mark.parametrize(
+    "max_connections", [1, 2, 10, pool_share(REDIS_POOL_BUDGET, 4)]
+)
+async def test_connect_splits_max_connections_between_the_pools(
+    monkeypatch, max_connections
+):
+    # from_url does not connect until the first command
+    monkeypatch.setattr(redis_module, "REDIS_URL", "redis://localhost:6379/0")
+    client = RedisClient()
+    await client.connect(max_connections=max_connections)
+    try:
+        pools = [client.redis.connection_pool, client.raw.connection_pool]
+        assert all(pool.max_connections >= 1 for pool in pools)
+        assert client.pool_stats()["max"] == max(2, max_connections)
+    finally:
+        await client.close()
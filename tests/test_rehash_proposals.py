@@ -0,0 +1,45 @@
+import hashlib
+import json
+
+from src.models import LegislativeProposal, LegislativeProposalDenorm
+from src.tasks.denorm_proposal import (
+    DENORM_UNCHANGED,
+    DENORM_UPDATED,
+    persist_proposals,
+    refresh_proposals,
+    serialize_proposals,
+)
+from src.tasks.rehash_proposals import rehash_proposals
+
+
+async def test_rehash_keeps_notified_across_an_encoding_change(
+    fake_redis, make_proposal
+):
+    reencoded, edited = await make_proposal(), await make_proposal()
+    ids = [reencoded.id, edited.id]
+    await refresh_proposals(ids)
+
+    # Rows written before the canonical encoding: spaced, ASCII-escaped JSON
+    for denorm in await LegislativeProposalDenorm.filter(proposal_id__in=ids):
+        legacy = json.dumps(denorm.payload, sort_keys=True)
+        denorm.checksum = hashlib.sha256(legacy.encode()).hexdigest()
+        denorm.notified = True
+        await denorm.save()
+    await fake_redis.redis.flushall()
+
+    report = await rehash_proposals(chunk_size=1)
+    assert (report["checked"], report["rehashed"]) == (2, 2)
+    assert (await rehash_proposals())["rehashed"] == 0
+
+    await LegislativeProposal.filter(id=edited.id).update(title="Titlu modificat")
+
+    results = await serialize_proposals(ids)
+    outcomes = await persist_proposals(list(results.values()))
+
+    assert outcomes == {reencoded.id: DENORM_UNCHANGED, edited.id: DENORM_UPDATED}
+    rows = {
+        row.proposal_id: row
+        for row in await LegislativeProposalDenorm.filter(proposal_id__in=ids)
+    }
+    assert rows[reencoded.id].notified
+    assert not rows[edited.id].notified
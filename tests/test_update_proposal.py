@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from src.models import LegislativeProposal, LegislativeProposalDenorm
+from src.tasks.denorm_proposal import RESULT_OK, ProposalResult
+from src.workers import update_proposal
+from src.workers.visibility import VisibilityLeaseManager
+
+
+class Acks:
+    def __init__(self):
+        self.message_ids = []
+
+    def add(self, message):
+        self.message_ids.append(message["MessageId"])
+
+
+def _message(message_id: str, body: dict) -> dict:
+    return {
+        "MessageId": message_id,
+        "ReceiptHandle": f"receipt-{message_id}",
+        "Body": json.dumps(body),
+    }
+
+
+async def _until(condition, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """batch_loop with one batch slot, a blocking invalidation and a fake refresh."""
+    invalidation_done = asyncio.Event()
+
+    async def invalidate_dependents(entity, ids):
+        await invalidation_done.wait()
+
+    async def refresh_proposals_exclusive(ids, **kwargs):
+        return {pid: ProposalResult(pid, RESULT_OK) for pid in ids}
+
+    monkeypatch.setattr(update_proposal, "MAX_CONCURRENT_BATCHES", 1)
+    monkeypatch.setattr(update_proposal, "SQS_BATCH_WINDOW_SECONDS", 0.01)
+    monkeypatch.setattr(update_proposal, "invalidate_dependents", invalidate_dependents)
+    monkeypatch.setattr(
+        update_proposal, "refresh_proposals_exclusive", refresh_proposals_exclusive
+    )
+    return invalidation_done
+
+
+async def test_invalidations_do_not_hold_up_proposal_batches(worker):
+    queue = asyncio.Queue()
+    acks = Acks()
+    leases = VisibilityLeaseManager(None, "queue-url", 60)
+    messages = [
+        _message(
+            "invalidate", {"type": "invalidate", "entity": "category", "ids": [3]}
+        ),
+        _message("proposal-1", {"proposal_id": 1}),
+    ]
+    for message in messages:
+        leases.track(message)
+        queue.put_nowait(message)
+    batcher = asyncio.create_task(update_proposal.batch_loop(queue, acks, leases))
+
+    await _until(lambda: "proposal-1" in acks.message_ids)
+    # The only batch slot is free again while the invalidation still runs
+    queue.put_nowait(_message("proposal-2", {"proposal_id": 2}))
+    await _until(lambda: "proposal-2" in acks.message_ids)
+    assert "invalidate" not in acks.message_ids
+    assert list(leases.leases) == ["receipt-invalidate"]
+
+    worker.set()
+    queue.put_nowait(None)
+    await asyncio.wait_for(batcher, 2)
+    assert "invalidate" in acks.message_ids
+    assert leases.leases == {}
+
+
+async def test_numeric_string_and_deleted_proposal_ids_are_acked(
+    fake_redis, make_proposal
+):
+    proposal = await make_proposal()
+    acks = Acks()
+    messages = [
+        _message("string-id", {"proposal_id": str(proposal.id)}),
+        _message("deleted", {"proposal_id": proposal.id + 1000}),
+        _message("not-a-number", {"proposal_id": "abc"}),
+    ]
+
+    await update_proposal._handle_batch(messages, acks)
+
+    assert acks.message_ids == ["string-id", "deleted"]
+    assert await LegislativeProposalDenorm.exists(proposal_id=proposal.id)
+
+
+@pytest.mark.parametrize(
+    "proposal_id, expected",
+    [(12, 12), ("12", 12), ("abc", None), (True, None), (0, None)],
+)
+def test_parse_proposal_id(proposal_id, expected):
+    message = _message("m", {"proposal_id": proposal_id})
+    assert update_proposal.parse_proposal_id(message) == expected
+
+
+async def test_messages_pick_up_bulk_updates(fake_redis, make_proposal):
+    proposal = await make_proposal()
+    await update_proposal._handle_batch(
+        [_message("first", {"proposal_id": proposal.id})], Acks()
+    )
+    # QuerySet.update() does not move updated_at
+    await LegislativeProposal.filter(id=proposal.id).update(title="Titlu modificat")
+
+    acks = Acks()
+    await update_proposal._handle_batch(
+        [_message("second", {"proposal_id": proposal.id})], acks
+    )
+
+    denorm = await LegislativeProposalDenorm.get(proposal_id=proposal.id)
+    assert acks.message_ids == ["second"]
+    assert denorm.payload["proposal"]["title"] == "Titlu modificat"
+
+
+@pytest.mark.parametrize("entity", ["committee", "deputy", None])
+async def test_invalidations_of_unknown_entities_are_acked(monkeypatch, entity):
+    async def invalidate_dependents(entity, ids):
+        raise AssertionError("must not run")
+
+    monkeypatch.setattr(update_proposal, "invalidate_dependents", invalidate_dependents)
+    acks = Acks()
+    message = _message("invalid", {"type": "invalidate", "entity": entity, "ids": [1]})
+
+    await update_proposal.handle_invalidation(message, entity, [1], acks)
+
+    assert acks.message_ids == ["invalid"]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from src.workers.visibility import VisibilityLeaseManager
+
+VISIBILITY_TIMEOUT = 0.3
+HEARTBEAT_SECONDS = 0.05
+
+
+class FakeSQS:
+    """
+    change_message_visibility_batch of a local queue: every receipt has a
+    visibility deadline, and a receipt extended after its deadline (or
+    deleted) fails as it does on SQS.
+    """
+
+    def __init__(self):
+        self.deadlines = {}
+        self.calls = []
+
+    def receive(self, number: int) -> dict:
+        receipt = f"receipt-{number}"
+        self.deadlines[receipt] = time.monotonic() + VISIBILITY_TIMEOUT
+        return {"MessageId": f"message-{number}", "ReceiptHandle": receipt}
+
+    def delete(self, message):
+        self.deadlines.pop(message["ReceiptHandle"])
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        now = time.monotonic()
+        self.calls.append([entry["ReceiptHandle"] for entry in Entries])
+        response = {"Successful": [], "Failed": []}
+        for entry in Entries:
+            deadline = self.deadlines.get(entry["ReceiptHandle"])
+            if deadline is None or deadline < now:
+                response["Failed"].append(
+                    {"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid"}
+                )
+                continue
+            self.deadlines[entry["ReceiptHandle"]] = now + entry["VisibilityTimeout"]
+            response["Successful"].append({"Id": entry["Id"]})
+        return response
+
+    def extended(self, receipt: str) -> int:
+        return sum(receipt in call for call in self.calls)
+
+
+async def _run_for(leases: VisibilityLeaseManager, seconds: float):
+    heartbeat = asyncio.create_task(leases.run())
+    await asyncio.sleep(seconds)
+    heartbeat.cancel()
+    try:
+        await heartbeat
+    except asyncio.CancelledError:
+        pass
+
+
+def _manager(sqs: FakeSQS) -> VisibilityLeaseManager:
+    return VisibilityLeaseManager(
+        sqs, "queue-url", VISIBILITY_TIMEOUT, heartbeat_seconds=HEARTBEAT_SECONDS
+    )
+
+
+async def test_extends_messages_before_they_expire():
+    sqs = FakeSQS()
+    leases = _manager(sqs)
+    messages = [sqs.receive(number) for number in range(12)]
+    for message in messages:
+        leases.track(message)
+
+    await _run_for(leases, 4 * VISIBILITY_TIMEOUT)
+
+    now = time.monotonic()
+    assert all(deadline > now for deadline in sqs.deadlines.values())
+    assert len(leases.leases) == 12
+    # 10 receipts per change_message_visibility_batch
+    assert max(len(call) for call in sqs.calls) == 10
+
+
+async def test_released_messages_are_no_longer_extended():
+    sqs = FakeSQS()
+    leases = _manager(sqs)
+    handled, pending = sqs.receive(1), sqs.receive(2)
+    leases.track(handled)
+    leases.track(pending)
+
+    leases.release(handled)
+    sqs.delete(handled)
+    await _run_for(leases, 3 * VISIBILITY_TIMEOUT)
+
+    assert sqs.extended(handled["ReceiptHandle"]) == 0
+    assert sqs.extended(pending["ReceiptHandle"]) > 0
+
+
+async def test_nothing_is_extended_after_stop():
+    sqs = FakeSQS()
+    leases = _manager(sqs)
+    leases.track(sqs.receive(1))
+
+    leases.stop()
+    await _run_for(leases, 3 * VISIBILITY_TIMEOUT)
+
+    assert sqs.calls == []
+
+
+async def test_failed_receipts_are_dropped():
+    sqs = FakeSQS()
+    leases = _manager(sqs)
+    kept, deleted = sqs.receive(1), sqs.receive(2)
+    leases.track(kept)
+    leases.track(deleted)
+    # Deleted by another consumer: its next extension fails
+    sqs.delete(deleted)
+
+    await _run_for(leases, 3 * VISIBILITY_TIMEOUT)
+
+    assert deleted["ReceiptHandle"] not in leases.leases
+    assert sqs.extended(deleted["ReceiptHandle"]) == 1
+    assert kept["ReceiptHandle"] in leases.leases